@@ -0,0 +1,84 @@
+"""
+Non-blocking logging: request threads only put records on an in-process
+queue; a QueueListener thread formats them as JSON lines and writes them to a
+size-rotated file and/or the console.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# Attributes every LogRecord has; anything else was passed via ``extra=``
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class AsyncQueueHandler(QueueHandler):
+    """
+    Built from settings.LOGGING via ``'()'``. Owns its target handlers and the
+    listener thread, restarting the listener if the process has forked (e.g.
+    gunicorn --preload) so each worker drains its own queue.
+    """
+
+    def __init__(self, filename=None, max_bytes=10 * 1024 * 1024, backup_count=5, console=True):
+        super().__init__(queue.SimpleQueue())
+        formatter = JsonFormatter()
+        self.targets = []
+        if filename:
+            file_handler = RotatingFileHandler(filename, maxBytes=max_bytes, backupCount=backup_count, delay=True)
+            file_handler.setFormatter(formatter)
+            self.targets.append(file_handler)
+        if console:
+            console_handler = logging.StreamHandler(sys.stderr)
+            console_handler.setFormatter(formatter)
+            self.targets.append(console_handler)
+        self.start_lock = threading.Lock()
+        self.listening = False
+        self.start_listener()
+        atexit.register(self.stop_listener)
+
+    def start_listener(self):
+        self.pid = os.getpid()
+        self.listener = QueueListener(self.queue, *self.targets, respect_handler_level=True)
+        self.listener.start()
+        self.listening = True
+
+    def stop_listener(self):
+        """Drains the queue and joins the listener thread; safe to call twice."""
+        # A forked child that never logged has no listener thread of its own
+        if self.listening and self.pid == os.getpid():
+            self.listening = False
+            self.listener.stop()
+
+    def prepare(self, record):
+        # The queue never leaves the process, so skip QueueHandler's eager
+        # formatting and leave %-interpolation to the listener thread
+        return record
+
+    def enqueue(self, record):
+        if self.pid != os.getpid():
+            with self.start_lock:
+                if self.pid != os.getpid():
+                    self.queue = queue.SimpleQueue()
+                    self.start_listener()
+        self.queue.put_nowait(record)
@@ -0,0 +1,77 @@
+"""
+Sends catalog reads to read replicas (DATABASE_REPLICAS) and everything else
+to ``default``.
+
+Once a request writes, or while ``default`` is inside a transaction, reads stay
+on the primary so the request sees its own writes. PrimaryPinningMiddleware
+scopes that to one request (``unpinned()``); ``use_primary()`` pins a block
+explicitly.
+
+Outside a scope the pin lasts for the rest of the thread (or task): a
+management command reads from the primary after its first write. Long-running
+workers (the email worker loop, webhook and reconcile batches) open an
+``unpinned()`` scope per unit of work so they return to the replicas.
+"""
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# (app_label, model_name) pairs that may be read from a replica
+REPLICA_MODELS = {
+    ('templates', 'category'),
+    ('templates', 'template'),
+    ('templates', 'review'),
+    ('templates', 'templatemanifest'),
+}
+
+_pinned = contextvars.ContextVar('primary_pinned', default=False)
+
+
+def pin_primary():
+    """Pins the current scope to the primary; unscoped, until the thread ends."""
+    _pinned.set(True)
+
+
+@contextmanager
+def use_primary():
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+@contextmanager
+def unpinned():
+    token = _pinned.set(False)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (model._meta.app_label, model._meta.model_name) not in REPLICA_MODELS:
+            return DEFAULT_DB_ALIAS
+        if _pinned.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block or not settings.DATABASE_REPLICAS:
+            return DEFAULT_DB_ALIAS
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # Related lookups follow the object they start from
+            return instance._state.db
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        pin_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
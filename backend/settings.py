@@ -2,8 +2,6 @@ import environ
 import os
 import dj_database_url
 from pathlib import Path
-import cloudinary  # Add this import
-import logging
 
 # Define BASE_DIR
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -37,18 +35,30 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'templates.instrumentation.TimedJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
         'rest_framework.parsers.MultiPartParser',
         'rest_framework.parsers.FormParser',
     ],
+    # Proxies in front of the app that append to X-Forwarded-For (Heroku's router is one).
+    # Throttles key on the address the nearest proxy saw, not on what the client sent.
+    'NUM_PROXIES': env.int('NUM_PROXIES', default=1),
+    # Token buckets (templates/throttling.py): N/period allows a burst of N, refilled at N per period
+    'DEFAULT_THROTTLE_RATES': {
+        'payment_ip': env('THROTTLE_PAYMENT_IP', default='10/min'),
+        'payment_email': env('THROTTLE_PAYMENT_EMAIL', default='5/min'),
+        'support_ip': env('THROTTLE_SUPPORT_IP', default='5/min'),
+        'support_email': env('THROTTLE_SUPPORT_EMAIL', default='3/min'),
+    },
 }
 
 MIDDLEWARE = [
+    'templates.instrumentation.RequestMetricsMiddleware',
+    'backend.middleware.PrimaryPinningMiddleware',
     'corsheaders.middleware.CorsMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'backend.middleware.AsyncWhiteNoiseMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -58,6 +68,11 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Request instrumentation (templates/instrumentation.py): Server-Timing header,
+# and a warning for requests running more queries than this (0 disables)
+SERVER_TIMING_HEADER = env.bool('SERVER_TIMING_HEADER', default=True)
+REQUEST_QUERY_WARNING_THRESHOLD = env.int('REQUEST_QUERY_WARNING_THRESHOLD', default=20)
+
 ROOT_URLCONF = 'backend.urls'
 
 TEMPLATES = [
@@ -85,6 +100,50 @@ DATABASES = {
     )
 }
 
+# Read replicas (comma-separated URLs) serve catalog reads; see backend/routers.py.
+# Test runs point them at the test primary.
+DATABASE_REPLICAS = []
+for index, replica_url in enumerate(env.list('DATABASE_REPLICA_URLS', default=[])):
+    DATABASES[f'replica_{index}'] = {
+        **dj_database_url.parse(replica_url, conn_max_age=600),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{index}')
+DATABASE_ROUTERS = ['backend.routers.ReplicaRouter'] if DATABASE_REPLICAS else []
+
+# Cursor pagination for the slim template list endpoint
+LIST_PAGE_SIZE = env.int('LIST_PAGE_SIZE', default=20)
+LIST_MAX_PAGE_SIZE = env.int('LIST_MAX_PAGE_SIZE', default=100)
+# Template detail embeds the newest few reviews; the rest page through /templates/<id>/reviews/
+EMBEDDED_REVIEWS = env.int('EMBEDDED_REVIEWS', default=5)
+REVIEW_PAGE_SIZE = env.int('REVIEW_PAGE_SIZE', default=20)
+# Longest window the sales analytics endpoint will report
+SALES_ANALYTICS_MAX_DAYS = env.int('SALES_ANALYTICS_MAX_DAYS', default=366)
+
+# Template search engine (dotted path); empty picks one for the database vendor:
+# Postgres tsvector/GIN, SQLite FTS5, or icontains as a last resort
+TEMPLATE_SEARCH_BACKEND = env('TEMPLATE_SEARCH_BACKEND', default='')
+
+# Cache (local memory by default; set CACHE_URL, e.g. redis:// or memcache://, to share it)
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+CATALOG_CACHE_ALIAS = 'default'
+CATALOG_CACHE_TIMEOUT = env.int('CATALOG_CACHE_TIMEOUT', default=300)
+# Payment status polling: cached status lifetime, how often waiters re-check the
+# cache (picks up changes made by other workers), longest long-poll and SSE stream cap
+# (waiting is served only by the /api/async/ views)
+PAYMENT_STATUS_CACHE_TIMEOUT = env.int('PAYMENT_STATUS_CACHE_TIMEOUT', default=5)
+PAYMENT_STATUS_POLL_INTERVAL = env.float('PAYMENT_STATUS_POLL_INTERVAL', default=1.0)
+PAYMENT_STATUS_MAX_WAIT = env.float('PAYMENT_STATUS_MAX_WAIT', default=25.0)
+PAYMENT_EVENTS_MAX_DURATION = env.float('PAYMENT_EVENTS_MAX_DURATION', default=120.0)
+# Worker number (0-1023) embedded in order and inquiry IDs; unset hashes the host name and PID
+ID_WORKER_ID = env.int('ID_WORKER_ID', default=None)
+# Cache holding throttle buckets; limits hold across workers when it is shared (CACHE_URL
+# on Redis). Empty keeps buckets in each process's memory: faster, but every worker
+# allows the full rate, so the effective limit is the rate times the number of workers.
+THROTTLE_CACHE_ALIAS = env('THROTTLE_CACHE_ALIAS', default='default')
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -123,56 +182,49 @@ EMAIL_HOST_USER = env('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = env('EMAIL_HOST_PASSWORD', default='')
 DEFAULT_FROM_EMAIL = env('DEFAULT_FROM_EMAIL', default='support@yourtemplatehub.com')
 FRONTEND_URL = env('FRONTEND_URL', default='https://yourtemplatehub.com')
+# Public base URL of this API, for links in emails
+BACKEND_URL = env('BACKEND_URL', default='https://template-backend-4i5o.onrender.com')
 
-# Cashfree settings
-CASHFREE_APP_ID = env('CASHFREE_APP_ID')
-CASHFREE_SECRET_KEY = env('CASHFREE_SECRET_KEY')
-CASHFREE_ENV = env('CASHFREE_ENV', default='sandbox')
+# Purchased archives (templates/downloads.py). Links are valid for DOWNLOAD_TOKEN_MAX_AGE
+# seconds. Set DOWNLOAD_SENDFILE_HEADER to X-Accel-Redirect (nginx, internal location
+# DOWNLOAD_ACCEL_PREFIX aliased to TEMPLATE_FILES_ROOT) or X-Sendfile to let the proxy
+# send the file.
+TEMPLATE_FILES_ROOT = env('TEMPLATE_FILES_ROOT', default=os.path.join(BASE_DIR, 'template_files'))
+DOWNLOAD_TOKEN_MAX_AGE = env.int('DOWNLOAD_TOKEN_MAX_AGE', default=7 * 24 * 3600)
+DOWNLOAD_CHUNK_SIZE = env.int('DOWNLOAD_CHUNK_SIZE', default=64 * 1024)
+DOWNLOAD_SENDFILE_HEADER = env('DOWNLOAD_SENDFILE_HEADER', default='')
+DOWNLOAD_ACCEL_PREFIX = env('DOWNLOAD_ACCEL_PREFIX', default='/protected-downloads/')
 
-# Debug Cashfree settings
-print("CASHFREE_ENV (raw):", repr(CASHFREE_ENV))
-print("CASHFREE_ENV (length):", len(CASHFREE_ENV))
-print("CASHFREE_ENV (lowercase):", CASHFREE_ENV.lower())
-if CASHFREE_ENV.lower().strip() == 'sandbox':
-    CASHFREE_BASE_URL = 'https://sandbox.cashfree.com'
-    print("Setting CASHFREE_BASE_URL to sandbox")
-else:
-    CASHFREE_BASE_URL = 'https://api.cashfree.com'
-    print("Setting CASHFREE_BASE_URL to production")
-print("CASHFREE_APP_ID:", CASHFREE_APP_ID)
-print("CASHFREE_SECRET_KEY:", CASHFREE_SECRET_KEY)
-print("CASHFREE_ENV:", CASHFREE_ENV)
-print("CASHFREE_BASE_URL:", CASHFREE_BASE_URL)
-
-
-
-# Set up logging
-logger = logging.getLogger(__name__)
-# Cloudinary settings
+# Cashfree settings (missing credentials are reported when a payment is attempted)
+CASHFREE_APP_ID = env('CASHFREE_APP_ID', default='')
+CASHFREE_SECRET_KEY = env('CASHFREE_SECRET_KEY', default='')
+CASHFREE_ENV = env('CASHFREE_ENV', default='sandbox')
+# Empty resolves from CASHFREE_ENV when the client is first built (templates/cashfree.py)
+CASHFREE_BASE_URL = env('CASHFREE_BASE_URL', default='')
+# Cashfree client: timeouts in seconds, retries for idempotent failures, circuit breaker
+CASHFREE_CONNECT_TIMEOUT = env.float('CASHFREE_CONNECT_TIMEOUT', default=3.05)
+CASHFREE_READ_TIMEOUT = env.float('CASHFREE_READ_TIMEOUT', default=10.0)
+CASHFREE_MAX_RETRIES = env.int('CASHFREE_MAX_RETRIES', default=2)
+CASHFREE_BREAKER_THRESHOLD = env.int('CASHFREE_BREAKER_THRESHOLD', default=5)
+CASHFREE_BREAKER_RESET = env.float('CASHFREE_BREAKER_RESET', default=30.0)
+# Connections per event loop for the async client used by the ASGI views
+CASHFREE_ASYNC_POOL_SIZE = env.int('CASHFREE_ASYNC_POOL_SIZE', default=100)
+# Webhooks: max signature age in seconds (0 disables), and whether accepted
+# events are processed on a background thread (process_webhook_events sweeps the rest)
+CASHFREE_WEBHOOK_TOLERANCE = env.int('CASHFREE_WEBHOOK_TOLERANCE', default=300)
+WEBHOOK_PROCESS_IN_BACKGROUND = env.bool('WEBHOOK_PROCESS_IN_BACKGROUND', default=True)
+# Failed events are retried after base * 2^(attempt-1) seconds (capped), then marked FAILED
+WEBHOOK_MAX_ATTEMPTS = env.int('WEBHOOK_MAX_ATTEMPTS', default=5)
+WEBHOOK_RETRY_BASE_DELAY = env.int('WEBHOOK_RETRY_BASE_DELAY', default=30)
+WEBHOOK_RETRY_MAX_DELAY = env.int('WEBHOOK_RETRY_MAX_DELAY', default=3600)
+# Cloudinary settings. The SDK is configured on first use (cloudinary_storage on
+# first storage access, templates/uploads.py before an upload), not at import.
 CLOUDINARY_STORAGE = {
-    'CLOUD_NAME': os.getenv('CLOUDINARY_CLOUD_NAME'),
-    'API_KEY': os.getenv('CLOUDINARY_API_KEY'),
-    'API_SECRET': os.getenv('CLOUDINARY_API_SECRET'),
+    'CLOUD_NAME': env('CLOUDINARY_CLOUD_NAME', default=''),
+    'API_KEY': env('CLOUDINARY_API_KEY', default=''),
+    'API_SECRET': env('CLOUDINARY_API_SECRET', default=''),
 }
 
-# Validate and initialize Cloudinary SDK
-try:
-    if not all(CLOUDINARY_STORAGE.values()):
-        missing_vars = [key for key, value in CLOUDINARY_STORAGE.items() if not value]
-        logger.error(f"Missing Cloudinary environment variables: {missing_vars}")
-        raise Exception(f"Missing Cloudinary environment variables: {missing_vars}")
-
-    cloudinary.config(
-        cloud_name=CLOUDINARY_STORAGE['CLOUD_NAME'],
-        api_key=CLOUDINARY_STORAGE['API_KEY'],
-        api_secret=CLOUDINARY_STORAGE['API_SECRET'],
-        secure=True
-    )
-    logger.info("Cloudinary SDK initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize Cloudinary SDK: {str(e)}")
-    raise Exception(f"Failed to initialize Cloudinary SDK: {str(e)}")
-
 # Optionally, define these for easier access in code
 CLOUDINARY_CLOUD_NAME = CLOUDINARY_STORAGE['CLOUD_NAME']
 CLOUDINARY_API_KEY = CLOUDINARY_STORAGE['API_KEY']
@@ -180,33 +232,39 @@ CLOUDINARY_API_SECRET = CLOUDINARY_STORAGE['API_SECRET']
 
 DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
 
-# Logging
+# Admin image uploads: concurrent uploads per form and per-file timeout (seconds)
+CLOUDINARY_UPLOAD_WORKERS = env.int('CLOUDINARY_UPLOAD_WORKERS', default=4)
+CLOUDINARY_UPLOAD_TIMEOUT = env.float('CLOUDINARY_UPLOAD_TIMEOUT', default=60.0)
+# Upload API origin; empty uses Cloudinary's. Points uploads at a local stub in benchmarks.
+CLOUDINARY_UPLOAD_PREFIX = env('CLOUDINARY_UPLOAD_PREFIX', default='')
+
+# Widths (px, 4:3 crop) precomputed into each template image's srcset
+TEMPLATE_IMAGE_WIDTHS = env.list('TEMPLATE_IMAGE_WIDTHS', cast=int, default=[400, 800, 1200, 1600])
+
+# Logging: JSON lines through a queue (see backend/logconfig.py).
+# LOG_LEVELS sets per-module levels, e.g. LOG_LEVELS=templates.views=DEBUG,django.db.backends=WARNING
+LOG_LEVEL = env('LOG_LEVEL', default='INFO')
+LOG_LEVELS = env.dict('LOG_LEVELS', default={})
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
     'handlers': {
-        'file': {
-            'level': 'DEBUG',
-            'class': 'logging.FileHandler',
-            'filename': os.path.join(BASE_DIR, 'debug.log'),
-        },
-        'console': {
-            'level': 'DEBUG',
-            'class': 'logging.StreamHandler',
+        'async': {
+            '()': 'backend.logconfig.AsyncQueueHandler',
+            'filename': env('LOG_FILE', default=os.path.join(BASE_DIR, 'debug.log')),
+            'max_bytes': env.int('LOG_FILE_MAX_BYTES', default=10 * 1024 * 1024),
+            'backup_count': env.int('LOG_FILE_BACKUP_COUNT', default=5),
+            'console': env.bool('LOG_CONSOLE', default=True),
         },
     },
+    'root': {
+        'handlers': ['async'],
+        'level': LOG_LEVEL,
+    },
     'loggers': {
-        '': {
-            'handlers': ['file', 'console'],
-            'level': 'DEBUG',
-            'propagate': True,
-        },
+        name: {'level': level.upper()} for name, level in LOG_LEVELS.items()
     },
 }
+# Mutes the root handlers while the test suite runs
+TEST_RUNNER = 'backend.testrunner.QuietLoggingTestRunner'
 
-
-
-print("CLOUDINARY_CLOUD_NAME:", os.getenv('CLOUDINARY_CLOUD_NAME'))
-print("CLOUDINARY_API_KEY:", os.getenv('CLOUDINARY_API_KEY'))
-print("CLOUDINARY_API_SECRET:", os.getenv('CLOUDINARY_API_SECRET'))
-print("DEFAULT_FILE_STORAGE:", DEFAULT_FILE_STORAGE)
\ No newline at end of file
@@ -0,0 +1,27 @@
+"""
+Test runner (settings.TEST_RUNNER) that keeps the suite's output readable:
+the root logger's handlers are swapped for a NullHandler for the run, so
+nothing is written to the console or LOG_FILE. Tests that check log output
+use assertLogs, which attaches its own handler.
+"""
+import logging
+
+from django.test.runner import DiscoverRunner
+
+
+class QuietLoggingTestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        root = logging.getLogger()
+        self.root_handlers = root.handlers[:]
+        for handler in self.root_handlers:
+            root.removeHandler(handler)
+        root.addHandler(logging.NullHandler())
+
+    def teardown_test_environment(self, **kwargs):
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        for handler in self.root_handlers:
+            root.addHandler(handler)
+        super().teardown_test_environment(**kwargs)
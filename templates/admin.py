@@ -1,7 +1,7 @@
 from django.contrib import admin
 
 # Register your models here.
-from .models import Category, Template, Review, Payment, SupportInquiry
+from .models import Category, Template, Review, Payment, SupportInquiry, OutboundEmail, WebhookEvent
 from .forms import TemplateAdminForm
 
 
@@ -15,11 +15,11 @@ class TemplateAdmin(admin.ModelAdmin):
         'title', 'description', 'category', 'price',
         'image_upload', 'image',  # Added image_upload
         'additional_images_upload', 'additional_images', 'features',
-        'tech_stack', 'live_preview_url', 'zip_file_url'
+        'tech_stack', 'live_preview_url', 'zip_file', 'zip_file_url'
     ]
 
     def get_readonly_fields(self, request, obj=None):
-        return ['average_rating', 'additional_images']
+        return ['average_rating', 'review_count', 'additional_images']
     
 
 admin.site.site_header = "Template Admin"
@@ -50,4 +50,20 @@ class SupportInquiryAdmin(admin.ModelAdmin):
         if change and 'response' in form.changed_data or 'status' in form.changed_data:
             from .views import send_response_email
             send_response_email(obj)
-        super().save_model(request, obj, form, change)
\ No newline at end of file
+        super().save_model(request, obj, form, change)
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'to', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status']
+    search_fields = ['subject', 'to']
+    readonly_fields = ['created_at', 'sent_at', 'last_error']
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ['event_type', 'order_id', 'status', 'attempts', 'received_at', 'processed_at']
+    list_filter = ['status', 'event_type']
+    search_fields = ['event_id', 'order_id']
+    readonly_fields = ['received_at', 'processed_at', 'last_error']
@@ -0,0 +1,189 @@
+"""
+Async twins of the gateway-bound views, for running under an ASGI server
+(backend.asgi). While a worker awaits Cashfree its event loop keeps serving
+other requests, instead of a WSGI worker blocking on each call.
+"""
+import asyncio
+import json
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+
+from .cashfree import CashfreeAPIError, CashfreeUnavailable, get_async_cashfree_client
+from .ids import new_order_id
+from .models import Payment, Template
+from .payment_status import FINAL_STATUSES, aget_payment_status, await_status_change, wait_seconds
+from .serializers import PaymentSerializer, latest_reviews
+from .throttling import PAYMENT_THROTTLES, athrottled_response
+from .views import order_payload
+from .webhooks import WebhookRejected, dispatch, parse_webhook, record_event
+
+logger = logging.getLogger(__name__)
+
+
+def request_data(request):
+    """The request's form or JSON fields; None for malformed JSON or a JSON body that isn't an object."""
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST
+
+
+@csrf_exempt
+@require_POST
+async def initiate_payment(request, pk):
+    logger.info("Starting async initiate_payment for pk=%s", pk)
+    data = request_data(request)
+    if data is None:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    throttled = await athrottled_response(request, data, PAYMENT_THROTTLES)
+    if throttled is not None:
+        return throttled
+    try:
+        template = await Template.objects.aget(pk=pk)
+    except Template.DoesNotExist:
+        logger.error("Template with id=%s not found", pk)
+        return JsonResponse({'error': 'Template not found.'}, status=404)
+
+    user_email = data.get('email')
+    user_phone = data.get('phone', '')
+    if not user_email or '@' not in user_email:
+        logger.warning("Invalid email provided: %s", user_email)
+        return JsonResponse({'error': 'A valid email is required.'}, status=400)
+    if not template.price or template.price <= 0:
+        logger.error("Invalid template price for template_id=%s: %s", pk, template.price)
+        return JsonResponse({'error': 'Template price is invalid.'}, status=400)
+
+    order_id = new_order_id()
+    payment = await Payment.objects.acreate(
+        template=template,
+        order_id=order_id,
+        user_email=user_email,
+        user_phone=user_phone,
+        amount=template.price,
+        status='PENDING',
+    )
+    logger.info("Payment created: payment_id=%s, order_id=%s, amount=%s", payment.id, order_id, template.price)
+
+    if not settings.CASHFREE_APP_ID or not settings.CASHFREE_SECRET_KEY:
+        logger.error("Cashfree credentials missing")
+        return JsonResponse({'error': 'Payment gateway misconfigured.'}, status=500)
+
+    try:
+        payment_data = await get_async_cashfree_client().create_order(
+            order_payload(order_id, template, user_email, user_phone)
+        )
+    except CashfreeAPIError as e:
+        payment.status = 'FAILED'
+        await payment.asave(update_fields=['status', 'updated_at'])
+        logger.error("Cashfree API error: %s", e.data)
+        return JsonResponse({
+            'error': 'Failed to initiate payment.',
+            'cashfree_error': e.data.get('message', 'Unknown error'),
+        }, status=e.status_code)
+    except CashfreeUnavailable as e:
+        # The order may or may not exist at Cashfree; leave it PENDING
+        logger.error("Cashfree unavailable for order %s: %s", order_id, e)
+        return JsonResponse({'error': 'Payment gateway is temporarily unavailable. Please try again.'}, status=503)
+
+    payment_session_id = payment_data.get('payment_session_id')
+    if not payment_session_id:
+        logger.error("No payment_session_id in Cashfree response: %s", payment_data)
+        payment.status = 'FAILED'
+        await payment.asave(update_fields=['status', 'updated_at'])
+        return JsonResponse({'error': 'Failed to generate payment session'}, status=500)
+    logger.info("Payment session created: session_id=%s", payment_session_id)
+    return JsonResponse({'payment_session_id': payment_session_id, 'order_id': order_id})
+
+
+@sync_to_async
+def accept_event(event_id, event, order_id, payload):
+    # record_event needs a transaction, which the async ORM can't open
+    webhook_event, created = record_event(event_id, event, order_id, payload)
+    if created:
+        dispatch(webhook_event.pk)
+    return created
+
+
+@csrf_exempt
+@require_POST
+async def payment_webhook(request):
+    try:
+        event_id, event, order_id, payload = parse_webhook(request.body, request.headers)
+    except WebhookRejected as e:
+        return JsonResponse({'error': e.message}, status=e.status_code)
+
+    if not await accept_event(event_id, event, order_id, payload):
+        logger.info("Duplicate webhook %s for order %s", event, order_id)
+        return JsonResponse({'status': 'duplicate'})
+    logger.info("Accepted webhook %s for order %s", event, order_id)
+    return JsonResponse({'status': 'received'})
+
+
+@require_GET
+async def payment_detail(request, order_id):
+    try:
+        payment = await (
+            Payment.objects.select_related('template__category')
+            .prefetch_related(latest_reviews('template__reviews'))
+            .aget(order_id=order_id)
+        )
+    except Payment.DoesNotExist:
+        return JsonResponse({'error': 'Payment not found'}, status=404)
+    # Everything the serializer touches is loaded above, so this runs no queries
+    return JsonResponse(PaymentSerializer(payment).data)
+
+
+@require_GET
+async def payment_status(request, order_id):
+    wait = wait_seconds(request.GET.get('wait'))
+    known = request.GET.get('known')
+    if wait and known:
+        data = await await_status_change(order_id, known, wait)
+    else:
+        data = await aget_payment_status(order_id)
+    if data is None:
+        return JsonResponse({'error': 'Payment not found'}, status=404)
+    return JsonResponse(data)
+
+
+def sse_message(data):
+    return f'event: status\ndata: {json.dumps(data)}\n\n'
+
+
+async def status_events(order_id, data):
+    """Yields ``data`` and then every change, until a final status or PAYMENT_EVENTS_MAX_DURATION."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.PAYMENT_EVENTS_MAX_DURATION
+    yield sse_message(data)
+    while data['status'] not in FINAL_STATUSES:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            return
+        latest = await await_status_change(order_id, data['status'], min(remaining, settings.PAYMENT_STATUS_MAX_WAIT))
+        if latest is None:
+            return
+        if latest['status'] == data['status']:
+            # Comment line; keeps proxies from closing an idle stream
+            yield ': keepalive\n\n'
+        else:
+            data = latest
+            yield sse_message(data)
+
+
+@require_GET
+async def payment_events(request, order_id):
+    data = await aget_payment_status(order_id)
+    if data is None:
+        return JsonResponse({'error': 'Payment not found'}, status=404)
+    response = StreamingHttpResponse(status_events(order_id, data), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
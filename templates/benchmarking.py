@@ -0,0 +1,31 @@
+"""Latency summaries and synthetic-catalog vocabulary shared by the benchmark and load-test commands."""
+import math
+import statistics
+
+# Words synthetic titles and descriptions are drawn from, and that search benchmarks query
+WORDS = [
+    'landing', 'portfolio', 'dashboard', 'ecommerce', 'restaurant', 'agency', 'blog',
+    'responsive', 'minimal', 'dark', 'saas', 'startup', 'photography', 'fitness',
+    'analytics', 'booking', 'travel', 'education', 'medical', 'finance', 'react',
+    'tailwind', 'animated', 'creative', 'corporate', 'wedding', 'music', 'podcast',
+]
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted, non-empty list."""
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(latencies, wall):
+    """Latencies (seconds) of one run of ``wall`` seconds -> JSON-ready stats in milliseconds."""
+    ordered = sorted(latencies)
+    return {
+        'requests': len(ordered),
+        'wall_s': round(wall, 3),
+        'throughput_rps': round(len(ordered) / wall, 2) if wall else 0.0,
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 2),
+        'p50_ms': round(percentile(ordered, 50) * 1000, 2),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 2),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 2),
+    }
@@ -0,0 +1,104 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+# Namespaces for cached catalog responses. Every cached key embeds the current
+# generation of each namespace it depends on, so invalidating a namespace is a
+# single counter bump and stale entries simply age out.
+TEMPLATE_LIST = 'template-list'
+TEMPLATE_DETAIL = 'template-detail'
+CATEGORY_LIST = 'category-list'
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def get_cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def template_detail(template_id):
+    return f'{TEMPLATE_DETAIL}:{template_id}'
+
+
+def _generation_key(namespace):
+    return f'catalog:gen:{namespace}'
+
+
+def _generations(cache, namespaces):
+    keys = [_generation_key(namespace) for namespace in namespaces]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # Seed from the clock so an evicted counter never reuses an old generation
+            cache.add(key, time.time_ns(), timeout=None)
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+def _record(endpoint, outcome):
+    with _stats_lock:
+        _stats[endpoint, outcome] += 1
+
+
+def cached_response(request, endpoint, namespaces, render):
+    """
+    Returns the cached response data for this request if present, otherwise
+    calls ``render()`` and caches a successful result. ``namespaces`` are the
+    invalidation namespaces the payload depends on.
+    """
+    cache = get_cache()
+    params = hashlib.md5(
+        f'{request.get_host()}?{sorted(request.query_params.lists())}'.encode()
+    ).hexdigest()
+    generations = '.'.join(str(generation) for generation in _generations(cache, namespaces))
+    key = f'catalog:{endpoint}:{generations}:{params}'
+
+    data = cache.get(key)
+    if data is not None:
+        _record(endpoint, 'hits')
+        response = Response(data)
+        response['X-Cache'] = 'HIT'
+        return response
+
+    _record(endpoint, 'misses')
+    response = render()
+    if response.status_code == 200:
+        cache.set(key, response.data, timeout=settings.CATALOG_CACHE_TIMEOUT)
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+def _bump(namespaces):
+    cache = get_cache()
+    for namespace in namespaces:
+        key = _generation_key(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+
+def invalidate(*namespaces):
+    # Bump now so the writing request reads its own change, and again after
+    # commit so a concurrent reader can't keep a pre-commit snapshot cached.
+    _bump(namespaces)
+    transaction.on_commit(lambda: _bump(namespaces))
+
+
+def cache_stats():
+    # Per-process counters; each worker reports its own
+    with _stats_lock:
+        stats = {}
+        for (endpoint, outcome), count in _stats.items():
+            stats.setdefault(endpoint, {'hits': 0, 'misses': 0})[outcome] = count
+    for counts in stats.values():
+        total = counts['hits'] + counts['misses']
+        counts['hit_rate'] = round(counts['hits'] / total, 3) if total else 0
+    return stats
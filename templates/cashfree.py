@@ -0,0 +1,330 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import logging
+import threading
+import time
+import weakref
+from collections import defaultdict
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .instrumentation import record_http
+
+logger = logging.getLogger(__name__)
+
+API_VERSION = '2023-08-01'
+
+# Gateway answers retried for idempotent (GET) calls
+RETRY_STATUSES = (502, 503, 504)
+
+BASE_URLS = {
+    'sandbox': 'https://sandbox.cashfree.com',
+    'production': 'https://api.cashfree.com',
+}
+
+
+class CashfreeError(Exception):
+    pass
+
+
+class CashfreeUnavailable(CashfreeError):
+    """The gateway could not be reached, timed out, or the circuit is open."""
+
+
+class CashfreeAPIError(CashfreeError):
+    """The gateway answered with a non-2xx status."""
+
+    def __init__(self, status_code, data):
+        self.status_code = status_code
+        self.data = data
+        super().__init__(f"Cashfree returned {status_code}: {data.get('message', 'Unknown error')}")
+
+
+class CircuitBreaker:
+    """
+    Opens after ``failure_threshold`` consecutive failures and rejects calls
+    for ``reset_timeout`` seconds, then lets a single trial call through.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.clock() - self.opened_at >= self.reset_timeout and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+
+
+class LatencyStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = defaultdict(lambda: {'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+
+    def record(self, endpoint, duration_ms, ok):
+        with self.lock:
+            stats = self.calls[endpoint]
+            stats['count'] += 1
+            stats['errors'] += 0 if ok else 1
+            stats['total_ms'] += duration_ms
+            stats['max_ms'] = max(stats['max_ms'], duration_ms)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                endpoint: {**stats, 'avg_ms': round(stats['total_ms'] / stats['count'], 2)}
+                for endpoint, stats in self.calls.items()
+            }
+
+
+def auth_headers(app_id, secret_key):
+    return {
+        'x-api-version': API_VERSION,
+        'x-client-id': app_id,
+        'x-client-secret': secret_key,
+        'Content-Type': 'application/json',
+    }
+
+
+class BaseCashfreeClient:
+    """Breaker, latency and error handling shared by the sync and async clients."""
+
+    def __init__(self, breaker=None):
+        self.breaker = breaker or CircuitBreaker()
+        self.stats = LatencyStats()
+
+    def check_breaker(self, name):
+        if not self.breaker.allow():
+            self.stats.record(name, 0.0, False)
+            raise CashfreeUnavailable('Cashfree circuit is open; failing fast')
+
+    def transport_failed(self, name, start, error):
+        duration_ms = (time.perf_counter() - start) * 1000
+        self.breaker.record_failure()
+        self.stats.record(name, duration_ms, False)
+        record_http(duration_ms)
+        logger.warning("cashfree call %s failed: %s", name, error)
+        return CashfreeUnavailable(f'Cashfree request failed: {error}')
+
+    def handle_response(self, name, start, response):
+        """Records the outcome and returns the JSON body, or raises CashfreeAPIError."""
+        duration_ms = (time.perf_counter() - start) * 1000
+        ok = response.status_code < 400
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        self.stats.record(name, duration_ms, ok)
+        record_http(duration_ms)
+        logger.info("cashfree call %s status=%s duration_ms=%.1f", name, response.status_code, duration_ms)
+
+        try:
+            data = response.json()
+        except ValueError:
+            data = {'message': response.text[:200]}
+        if not ok:
+            raise CashfreeAPIError(response.status_code, data)
+        return data
+
+
+class CashfreeClient(BaseCashfreeClient):
+    """
+    Thin Cashfree PG client over one keep-alive ``requests.Session``.
+
+    Connect failures are retried for every method (the request never left the
+    process); read failures and 502/503/504 only for GETs. 5xx answers and
+    transport errors count against the circuit breaker, 4xx answers don't.
+    """
+
+    def __init__(self, base_url, app_id, secret_key, connect_timeout=3.05, read_timeout=10.0,
+                 max_retries=2, breaker=None, pool_size=10):
+        super().__init__(breaker)
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        self.session.headers.update(auth_headers(app_id, secret_key))
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            allowed_methods=frozenset(['GET']),
+            status_forcelist=RETRY_STATUSES,
+            backoff_factor=0.2,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def create_order(self, payload):
+        return self.request('create_order', 'POST', '/pg/orders', json=payload)
+
+    def get_order(self, order_id):
+        return self.request('get_order', 'GET', f'/pg/orders/{order_id}')
+
+    def request(self, name, method, path, **kwargs):
+        self.check_breaker(name)
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, f'{self.base_url}{path}', timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            raise self.transport_failed(name, start, e) from e
+        return self.handle_response(name, start, response)
+
+
+class AsyncCashfreeClient(BaseCashfreeClient):
+    """
+    ``CashfreeClient`` for async views, over an ``httpx.AsyncClient`` pool, so
+    one event loop can keep many gateway calls in flight. Same retry rules.
+    """
+
+    def __init__(self, base_url, app_id, secret_key, connect_timeout=3.05, read_timeout=10.0,
+                 max_retries=2, breaker=None, pool_size=100):
+        super().__init__(breaker)
+        self.max_retries = max_retries
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        self.http = httpx.AsyncClient(
+            base_url=base_url.rstrip('/'),
+            headers=auth_headers(app_id, secret_key),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            # The transport retries connect failures only, which is safe for every method
+            transport=httpx.AsyncHTTPTransport(retries=max_retries, limits=limits),
+        )
+
+    async def create_order(self, payload):
+        return await self.request('create_order', 'POST', '/pg/orders', json=payload)
+
+    async def get_order(self, order_id):
+        return await self.request('get_order', 'GET', f'/pg/orders/{order_id}')
+
+    async def request(self, name, method, path, **kwargs):
+        self.check_breaker(name)
+        start = time.perf_counter()
+        retries = self.max_retries if method == 'GET' else 0
+        for attempt in range(retries + 1):
+            if attempt:
+                await asyncio.sleep(0.2 * 2 ** (attempt - 1))
+            try:
+                response = await self.http.request(method, path, **kwargs)
+            except httpx.TransportError as e:
+                if attempt < retries:
+                    continue
+                raise self.transport_failed(name, start, e) from e
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                return self.handle_response(name, start, response)
+
+    async def aclose(self):
+        await self.http.aclose()
+
+
+_client = None
+_client_lock = threading.Lock()
+_breaker = None
+# httpx pools are bound to the event loop that created them
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def resolve_base_url():
+    # An explicit CASHFREE_BASE_URL wins; anything but "sandbox" means production
+    if settings.CASHFREE_BASE_URL:
+        return settings.CASHFREE_BASE_URL
+    if settings.CASHFREE_ENV.lower().strip() == 'sandbox':
+        return BASE_URLS['sandbox']
+    return BASE_URLS['production']
+
+
+def client_options():
+    global _breaker
+    with _client_lock:
+        # Sync and async clients share one breaker: it tracks the gateway, not the pool
+        if _breaker is None:
+            _breaker = CircuitBreaker(settings.CASHFREE_BREAKER_THRESHOLD, settings.CASHFREE_BREAKER_RESET)
+    return {
+        'base_url': resolve_base_url(),
+        'app_id': settings.CASHFREE_APP_ID,
+        'secret_key': settings.CASHFREE_SECRET_KEY,
+        'connect_timeout': settings.CASHFREE_CONNECT_TIMEOUT,
+        'read_timeout': settings.CASHFREE_READ_TIMEOUT,
+        'max_retries': settings.CASHFREE_MAX_RETRIES,
+        'breaker': _breaker,
+    }
+
+
+def get_cashfree_client():
+    # One client (and so one connection pool) per worker process
+    global _client
+    if _client is None:
+        options = client_options()
+        with _client_lock:
+            if _client is None:
+                _client = CashfreeClient(**options)
+    return _client
+
+
+def reset_clients():
+    """Drops the per-process clients so the next call picks up changed settings."""
+    global _client, _breaker
+    with _client_lock:
+        _client = None
+        _breaker = None
+        _async_clients.clear()
+
+
+def get_async_cashfree_client():
+    """The ``AsyncCashfreeClient`` for the running event loop (one per ASGI worker)."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _async_clients[loop] = AsyncCashfreeClient(**client_options(), pool_size=settings.CASHFREE_ASYNC_POOL_SIZE)
+    return client
+
+
+def verify_webhook_signature(raw_body, timestamp, signature, secret_key, tolerance=300, now=None):
+    """
+    Checks Cashfree's ``x-webhook-signature``: base64(HMAC-SHA256(secret,
+    timestamp + raw body)). ``timestamp`` is in milliseconds; deliveries older
+    than ``tolerance`` seconds are rejected (0 disables the age check).
+    """
+    if not (timestamp and signature and secret_key):
+        return False
+    message = timestamp.encode() + raw_body
+    expected = base64.b64encode(hmac.new(secret_key.encode(), message, hashlib.sha256).digest()).decode()
+    if not hmac.compare_digest(expected, signature):
+        return False
+    if tolerance:
+        try:
+            sent_at = int(timestamp) / 1000
+        except ValueError:
+            return False
+        if abs((now or time.time()) - sent_at) > tolerance:
+            return False
+    return True
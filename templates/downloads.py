@@ -0,0 +1,163 @@
+"""
+Paid template archives, served only against a signed, expiring token that
+names a SUCCESS payment.
+
+Files live under TEMPLATE_FILES_ROOT (``Template.zip_file`` is the relative
+path). They are streamed in DOWNLOAD_CHUNK_SIZE pieces with ETag and single
+byte-range support, or, with DOWNLOAD_SENDFILE_HEADER set, handed to the
+proxy via X-Accel-Redirect / X-Sendfile so no worker streams the bytes at all.
+"""
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core import signing
+from django.http import HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.http import http_date
+
+from .models import Payment
+
+SALT = 'templates.downloads'
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class DownloadDenied(Exception):
+    def __init__(self, message, status_code):
+        self.message = message
+        self.status_code = status_code
+        super().__init__(message)
+
+
+def make_download_token(payment):
+    return signing.TimestampSigner(salt=SALT).sign(payment.order_id)
+
+
+def download_url(payment):
+    """Absolute signed download link for a paid ``payment``; None when its template has no archive."""
+    template = payment.template
+    if not template.zip_file and not template.zip_file_url:
+        return None
+    path = reverse('template-download', args=[make_download_token(payment)])
+    return f"{settings.BACKEND_URL.rstrip('/')}{path}"
+
+
+def payment_for_token(token):
+    try:
+        order_id = signing.TimestampSigner(salt=SALT).unsign(token, max_age=settings.DOWNLOAD_TOKEN_MAX_AGE)
+    except signing.SignatureExpired:
+        raise DownloadDenied('This download link has expired.', 410)
+    except signing.BadSignature:
+        raise DownloadDenied('Invalid download link.', 403)
+    payment = Payment.objects.select_related('template').filter(order_id=order_id).first()
+    if payment is None or payment.status != 'SUCCESS':
+        raise DownloadDenied('This order has not been paid.', 403)
+    return payment
+
+
+def archive_path(template):
+    """Absolute path of the template's archive, refusing anything outside TEMPLATE_FILES_ROOT."""
+    root = os.path.realpath(settings.TEMPLATE_FILES_ROOT)
+    path = os.path.realpath(os.path.join(root, template.zip_file))
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        raise DownloadDenied('File not found.', 404)
+    return path
+
+
+def parse_range(header, size):
+    """
+    ``(start, end)`` (inclusive) for a single ``bytes=`` range, None to serve the
+    whole file (no header, or a form we don't handle, such as multiple ranges),
+    or ``'unsatisfiable'``.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return 'unsatisfiable'
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return 'unsatisfiable'
+    return start, end
+
+
+def read_chunks(path, start, length, chunk_size):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(chunk_size, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_archive(request, template):
+    path = archive_path(template)
+    stat = os.stat(path)
+    size = stat.st_size
+    etag = f'"{stat.st_mtime_ns:x}-{size:x}"'
+    filename = os.path.basename(path)
+    headers = {
+        'Content-Type': mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+        'Content-Disposition': f'attachment; filename="{filename}"',
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': 'private, no-transform',
+    }
+
+    sendfile_header = settings.DOWNLOAD_SENDFILE_HEADER
+    if sendfile_header:
+        # The proxy answers ranges and conditionals from the file itself
+        response = HttpResponse(headers=headers)
+        if sendfile_header.lower() == 'x-accel-redirect':
+            relative = os.path.relpath(path, os.path.realpath(settings.TEMPLATE_FILES_ROOT))
+            response['X-Accel-Redirect'] = settings.DOWNLOAD_ACCEL_PREFIX.rstrip('/') + '/' + relative
+        else:
+            response[sendfile_header] = path
+        return response
+
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        return HttpResponse(status=304, headers={'ETag': etag})
+
+    byte_range = parse_range(request.headers.get('Range'), size)
+    if_range = request.headers.get('If-Range')
+    if if_range and if_range != etag:
+        # The file changed since the client's partial download: send all of it
+        byte_range = None
+    if byte_range == 'unsatisfiable':
+        return HttpResponse(status=416, headers={'Content-Range': f'bytes */{size}'})
+
+    start, end, status = 0, size - 1, 200
+    if byte_range is not None:
+        start, end = byte_range
+        status = 206
+        headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+    length = end - start + 1
+    headers['Content-Length'] = str(length)
+    if request.method == 'HEAD':
+        return HttpResponse(status=status, headers=headers)
+    return StreamingHttpResponse(
+        read_chunks(path, start, length, settings.DOWNLOAD_CHUNK_SIZE), status=status, headers=headers,
+    )
+
+
+def download_response(request, token):
+    payment = payment_for_token(token)
+    template = payment.template
+    if not template.zip_file:
+        if template.zip_file_url:
+            # Archives not yet moved under TEMPLATE_FILES_ROOT are still hosted elsewhere
+            return HttpResponseRedirect(template.zip_file_url)
+        raise DownloadDenied('File not found.', 404)
+    return serve_archive(request, template)
@@ -0,0 +1,82 @@
+import logging
+
+from django.template.loader import render_to_string
+
+from .downloads import download_url
+from .outbox import enqueue_email
+
+logger = logging.getLogger(__name__)
+
+
+# Queue the purchase email with the download link; run_email_worker delivers it
+def send_template_email(payment):
+    template = payment.template
+    user_email = payment.user_email
+
+    # Prepare email content using a template
+    context = {
+        'user_email': user_email,
+        'template_title': template.title,
+        'amount': payment.amount,
+        'order_id': payment.order_id,
+        'company_name': 'TemplateHub',  # Replace with your company name
+        'support_email': 'support@templatehub.com',  # Replace with your support email
+        'download_url': download_url(payment),
+    }
+    enqueue_email(
+        subject=f'Your Template Purchase - {template.title}',
+        body=render_to_string('email_template.html', context),
+        to=[user_email],
+    )
+    logger.info("Queued purchase email to %s for template %s", user_email, template.title)
+
+
+def send_support_email(inquiry):
+    # User confirmation email
+    user_context = {
+        'inquiry_id': inquiry.inquiry_id,
+        'email': inquiry.email,
+        'inquiry_type': inquiry.get_inquiry_type_display(),
+        'description': inquiry.description,
+        'order_id': inquiry.order_id or 'N/A',
+        'company_name': 'TemplateHub',
+        'support_email': 'support@templatehub.com',
+    }
+    enqueue_email(
+        subject=f'Your Support Inquiry - {inquiry.inquiry_id}',
+        body=render_to_string('support_confirmation.html', user_context),
+        to=[inquiry.email],
+    )
+
+    # Support team alert
+    support_context = {
+        'inquiry_id': inquiry.inquiry_id,
+        'email': inquiry.email,
+        'inquiry_type': inquiry.get_inquiry_type_display(),
+        'description': inquiry.description,
+        'order_id': inquiry.order_id or 'N/A',
+        'company_name': 'TemplateHub',
+    }
+    enqueue_email(
+        subject=f'New Support Inquiry - {inquiry.inquiry_id}',
+        body=render_to_string('support_alert.html', support_context),
+        to=['support@templatehub.com'],  # Configure in settings.py
+    )
+    logger.info("Queued confirmation and support alert emails for inquiry %s", inquiry.inquiry_id)
+
+
+def send_response_email(inquiry):
+    context = {
+        'inquiry_id': inquiry.inquiry_id,
+        'email': inquiry.email,
+        'inquiry_type': inquiry.get_inquiry_type_display(),
+        'response': inquiry.response,
+        'company_name': 'TemplateHub',
+        'support_email': 'support@templatehub.com',
+    }
+    enqueue_email(
+        subject=f'Update on Your Support Inquiry - {inquiry.inquiry_id}',
+        body=render_to_string('support_response.html', context),
+        to=[inquiry.email],
+    )
+    logger.info("Queued response email to %s for inquiry %s", inquiry.email, inquiry.inquiry_id)
@@ -1,7 +1,7 @@
 from django import forms
 from .models import Template
 from .fields import MultipleFileField  
-import cloudinary.uploader
+from .uploads import delete_images, upload_images
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,41 +21,46 @@ class TemplateAdminForm(forms.ModelForm):
         model = Template
         fields = '__all__'
 
+    def clean_additional_images_upload(self):
+        # Uploaded together with image_upload in clean()
+        return self.files.getlist('additional_images_upload')
+
     def clean(self):
         cleaned_data = super().clean()
         image_upload = cleaned_data.get('image_upload')
+        additional_files = cleaned_data.get('additional_images_upload') or []
+        files = ([image_upload] if image_upload else []) + list(additional_files)
+        if not files:
+            return cleaned_data
+
+        # Main and additional images share one bounded pool of concurrent uploads
+        results = upload_images(files)
+        failed = [error for _, error in results if error]
+        if failed:
+            # The form is rejected, so nothing would reference the uploads that succeeded
+            delete_images([public_id for public_id, error in results if not error])
+            logger.error("Failed to upload %s of %s images to Cloudinary: %s", len(failed), len(results), failed)
+            if image_upload:
+                _, error = results.pop(0)
+                if error:
+                    self.add_error('image_upload', f"Failed to upload image to Cloudinary: {error}")
+            additional_errors = [error for _, error in results if error]
+            if additional_errors:
+                self.add_error('additional_images_upload', [
+                    f"{len(additional_errors)} of {len(results)} additional images failed to upload.",
+                    *additional_errors,
+                ])
+            raise forms.ValidationError(
+                f"{len(failed)} of {len(files)} images failed to upload, so none were kept; "
+                f"please re-submit all of them."
+            )
+
         if image_upload:
-            try:
-                result = cloudinary.uploader.upload(
-                    image_upload,
-                    folder="templates/",
-                    resource_type="image"
-                )
-                cleaned_data['image'] = result['public_id']
-                logger.info(f"Successfully uploaded image to Cloudinary: {result['public_id']}")
-            except Exception as e:
-                logger.error(f"Failed to upload image to Cloudinary: {str(e)}")
-                raise forms.ValidationError(f"Failed to upload image to Cloudinary: {str(e)}")
+            cleaned_data['image'] = results.pop(0)[0]
+            logger.info("Successfully uploaded image to Cloudinary: %s", cleaned_data['image'])
+        cleaned_data['additional_images_upload'] = [public_id for public_id, _ in results]
         return cleaned_data
 
-    def clean_additional_images_upload(self):
-        files = self.files.getlist('additional_images_upload')
-        uploaded_urls = []
-        if files:
-            for file in files:
-                try:
-                    result = cloudinary.uploader.upload(
-                        file,
-                        folder="templates/",
-                        resource_type="image"
-                    )
-                    uploaded_urls.append(result['public_id'])
-                    logger.info(f"Successfully uploaded additional image to Cloudinary: {result['public_id']}")
-                except Exception as e:
-                    logger.error(f"Failed to upload additional image to Cloudinary: {str(e)}")
-                    raise forms.ValidationError(f"Failed to upload additional image to Cloudinary: {str(e)}")
-        return uploaded_urls
-
     def save(self, commit=True):
         instance = super().save(commit=False)
         additional_images = self.cleaned_data.get('additional_images_upload', [])
@@ -63,4 +68,4 @@ class TemplateAdminForm(forms.ModelForm):
             instance.additional_images = additional_images
         if commit:
             instance.save()
-        return instance
\ No newline at end of file
+        return instance
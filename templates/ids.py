@@ -0,0 +1,99 @@
+"""
+Time-ordered unique IDs for orders and support inquiries.
+
+Each ID packs 41 bits of milliseconds since ID_EPOCH, a 10-bit worker number and
+a 12-bit per-millisecond sequence (the Snowflake layout), written as 13
+Crockford base32 characters. Fixed width keeps string order equal to creation
+order, so new rows append to the end of the unique index.
+
+Two processes only collide if they share a worker number: set ID_WORKER_ID per
+process (0-1023) where that must be guaranteed. By default it is a hash of the
+host name and PID, so workers on different hosts or containers (which often all
+run as PID 1) still get different numbers, but only with high probability.
+"""
+import os
+import socket
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+ID_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+LENGTH = 13
+
+
+def default_worker(pid):
+    return zlib.crc32(f'{socket.gethostname()}:{pid}'.encode()) % (MAX_WORKER + 1)
+
+
+def encode(number):
+    chars = []
+    for _ in range(LENGTH):
+        number, remainder = divmod(number, 32)
+        chars.append(ALPHABET[remainder])
+    return ''.join(reversed(chars))
+
+
+class IdGenerator:
+    def __init__(self, worker_id=None):
+        self.worker_id = worker_id
+        self.lock = threading.Lock()
+        self.pid = None
+        self.default_worker = None
+        self.last_ms = -1
+        self.sequence = 0
+
+    def current_worker(self):
+        if self.worker_id is not None:
+            worker = self.worker_id
+        elif settings.ID_WORKER_ID is not None:
+            worker = settings.ID_WORKER_ID
+        else:
+            return self.default_worker
+        if not 0 <= worker <= MAX_WORKER:
+            raise ValueError(f'ID worker must be between 0 and {MAX_WORKER}, got {worker}')
+        return worker
+
+    def next_int(self):
+        with self.lock:
+            pid = os.getpid()
+            if pid != self.pid:
+                # Forked: a child must not continue its parent's sequence
+                self.pid, self.last_ms, self.sequence = pid, -1, 0
+                self.default_worker = default_worker(pid)
+            now_ms = int((time.time() - ID_EPOCH.timestamp()) * 1000)
+            if now_ms > self.last_ms:
+                self.last_ms, self.sequence = now_ms, 0
+            elif self.sequence < MAX_SEQUENCE:
+                # Same millisecond, or the clock stepped back: stay on last_ms
+                self.sequence += 1
+            else:
+                # Sequence exhausted; borrow the next millisecond instead of sleeping
+                self.last_ms, self.sequence = self.last_ms + 1, 0
+            worker = self.current_worker()
+            return (self.last_ms << (WORKER_BITS + SEQUENCE_BITS)) | (worker << SEQUENCE_BITS) | self.sequence
+
+    def next_id(self):
+        return encode(self.next_int())
+
+
+_generator = IdGenerator()
+
+
+def new_id(prefix=''):
+    return f'{prefix}{_generator.next_id()}'
+
+
+def new_order_id():
+    return new_id('order_')
+
+
+def new_inquiry_id():
+    return new_id('SUPP-')
@@ -0,0 +1,49 @@
+import logging
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Width of the variant used as the plain ``src``; matches the old fixed 800x600 URL
+DEFAULT_WIDTH = 800
+
+_warned = False
+
+
+def image_urls_enabled():
+    """
+    Stored URLs embed CLOUDINARY_CLOUD_NAME; without it they would point at
+    ``res.cloudinary.com//``, so callers leave stored URL sets as they are.
+    """
+    global _warned
+    if settings.CLOUDINARY_CLOUD_NAME:
+        return True
+    if not _warned:
+        # Once per process, not once per template saved or imported
+        logger.warning("CLOUDINARY_CLOUD_NAME is not set; not building image URLs")
+        _warned = True
+    return False
+
+
+def variant_url(public_id, width):
+    height = width * 3 // 4
+    return (
+        f"https://res.cloudinary.com/{settings.CLOUDINARY_CLOUD_NAME}/image/upload/"
+        f"q_auto,f_auto,w_{width},h_{height},c_fill/v1/{public_id}"
+    )
+
+
+def build_image_urls(public_id):
+    """
+    Returns ``{'src': ..., 'srcset': ...}`` for a Cloudinary public id, or
+    None when the id is not one of ours (must start with 'templates/').
+    """
+    if not public_id or not public_id.startswith('templates/'):
+        if public_id:
+            logger.warning("Invalid public_id format for image: %s. Expected to start with 'templates/'.", public_id)
+        return None
+    widths = sorted(settings.TEMPLATE_IMAGE_WIDTHS)
+    return {
+        'src': variant_url(public_id, DEFAULT_WIDTH),
+        'srcset': ', '.join(f'{variant_url(public_id, width)} {width}w' for width in widths),
+    }
@@ -0,0 +1,165 @@
+"""
+Per-request timings: SQL (count and time), serializer and renderer time, and
+outbound HTTP, reported in a ``Server-Timing`` header and one structured log
+line per request. Metrics live in a context variable, so DB calls made through
+sync_to_async in async views are counted too.
+"""
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+
+logger = logging.getLogger(__name__)
+
+_metrics = contextvars.ContextVar('request_metrics', default=None)
+
+# Server-Timing metric -> (RequestMetrics attribute, description)
+TIMINGS = (
+    ('db', 'db_ms', 'SQL'),
+    ('serialize', 'serialize_ms', 'Serializers'),
+    ('render', 'render_ms', 'JSON rendering'),
+    ('http', 'http_ms', 'Outbound HTTP'),
+)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_queries = 0
+        self.db_ms = 0.0
+        self.serialize_ms = 0.0
+        self.render_ms = 0.0
+        self.http_calls = 0
+        self.http_ms = 0.0
+        self.serialize_depth = 0
+
+
+def record_http(duration_ms, calls=1):
+    metrics = _metrics.get()
+    if metrics is not None:
+        metrics.http_calls += calls
+        metrics.http_ms += duration_ms
+
+
+@contextmanager
+def timed(attribute):
+    """Adds the block's duration to ``attribute`` of the current request's metrics."""
+    metrics = _metrics.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(metrics, attribute, getattr(metrics, attribute) + (time.perf_counter() - started) * 1000)
+
+
+def instrument_query(execute, sql, params, many, context):
+    metrics = _metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_queries += 1
+        metrics.db_ms += (time.perf_counter() - started) * 1000
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    # connection_created fires on every (re)connect of the same wrapper object
+    if instrument_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(instrument_query)
+
+
+class TimedSerializerMixin:
+    """Times ``to_representation`` of the outermost instrumented serializer only."""
+
+    def to_representation(self, instance):
+        metrics = _metrics.get()
+        if metrics is None or metrics.serialize_depth:
+            return super().to_representation(instance)
+        metrics.serialize_depth += 1
+        try:
+            with timed('serialize_ms'):
+                return super().to_representation(instance)
+        finally:
+            metrics.serialize_depth -= 1
+
+
+class TimedJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed('render_ms'):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class RequestMetricsMiddleware:
+    """
+    Outermost middleware. Adds ``Server-Timing`` (when SERVER_TIMING_HEADER is
+    on), logs one line per request and warns above REQUEST_QUERY_WARNING_THRESHOLD
+    queries, which is usually an N+1.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _metrics.reset(token)
+        return self.report(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _metrics.reset(token)
+        return self.report(request, response, metrics)
+
+    def report(self, request, response, metrics):
+        total_ms = (time.perf_counter() - metrics.started) * 1000
+        if settings.SERVER_TIMING_HEADER:
+            entries = [
+                f'{name};dur={getattr(metrics, attribute):.1f};desc="{description}"'
+                for name, attribute, description in TIMINGS
+            ]
+            entries.append(f'total;dur={total_ms:.1f}')
+            response['Server-Timing'] = ', '.join(entries)
+
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(total_ms, 1),
+            'db_queries': metrics.db_queries,
+            'db_ms': round(metrics.db_ms, 1),
+            'serialize_ms': round(metrics.serialize_ms, 1),
+            'render_ms': round(metrics.render_ms, 1),
+            'http_calls': metrics.http_calls,
+            'http_ms': round(metrics.http_ms, 1),
+        }
+        threshold = settings.REQUEST_QUERY_WARNING_THRESHOLD
+        if threshold and metrics.db_queries > threshold:
+            logger.warning("%s %s ran %s queries (threshold %s); possible N+1",
+                           request.method, request.path, metrics.db_queries, threshold, extra=fields)
+        else:
+            logger.info("%s %s %s in %.1f ms (%s queries)", request.method, request.path, response.status_code,
+                        total_ms, metrics.db_queries, extra=fields)
+        return response
@@ -0,0 +1,79 @@
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from templates.benchmarking import WORDS
+from templates.models import Category, Template
+from templates.search import IContainsSearchBackend, SEARCH_RANK, get_search_backend
+
+# Broad terms match a large share of the catalog; needles match a handful of rows,
+# which is where an unindexed scan has to read the whole table
+QUERIES = {
+    'broad': ['portfolio', 'dark dashboard', 'saas landing', 'restaurant booking', 'wedding podcast'],
+    'needle': ['glassmorphism', 'neumorphic', 'brutalist', 'vaporwave', 'skeuomorphic'],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares the configured search backend with the icontains path on N synthetic '
+        'templates. Everything runs in a transaction that is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000])
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        baseline = IContainsSearchBackend()
+        for size in options['sizes']:
+            with transaction.atomic():
+                self.seed(size)
+                backend.rebuild()
+                timings = {
+                    kind: (self.time_queries(backend, queries, options['repeat']),
+                           self.time_queries(baseline, queries, options['repeat']))
+                    for kind, queries in QUERIES.items()
+                }
+                transaction.set_rollback(True)
+            for kind, (indexed, icontains) in timings.items():
+                self.stdout.write(
+                    f'{size:>7} templates  {kind:<6}  {type(backend).__name__}: {indexed * 1000:8.2f} ms/query  '
+                    f'icontains: {icontains * 1000:8.2f} ms/query  speedup: {icontains / indexed:6.1f}x'
+                )
+
+    def seed(self, size):
+        rng = random.Random(size)
+        # Filler vocabulary keeps the catalog words selective, like real copy
+        filler = [''.join(rng.choices('abcdefghijklmnopqrstuvwxyz', k=rng.randint(4, 9))) for _ in range(5000)]
+        category = Category.objects.create(name='Benchmark')
+        needle_step = max(size // 10, 1)
+        batch = []
+        for i in range(size):
+            batch.append(Template(
+                title=' '.join(rng.sample(WORDS, 3)).title(),
+                description=' '.join(rng.choices(filler, k=40) + rng.sample(WORDS, 2)
+                                     + (QUERIES['needle'] if i % needle_step == 0 else [])),
+                category=category,
+                price=Decimal('499.00'),
+            ))
+            if len(batch) == 5000:
+                Template.objects.bulk_create(batch)
+                batch = []
+        Template.objects.bulk_create(batch)
+
+    def time_queries(self, backend, queries, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for query in queries:
+                queryset = backend.search(Template.objects.all(), query)
+                if SEARCH_RANK in queryset.query.annotations:
+                    queryset = queryset.order_by('-' + SEARCH_RANK, '-id')
+                else:
+                    queryset = queryset.order_by('-id')
+                list(queryset.values_list('id', flat=True)[:20])
+        return (time.perf_counter() - start) / (repeat * len(queries))
@@ -0,0 +1,96 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# target -> (code run in a fresh interpreter, top-level module whose cumulative time is reported)
+TARGETS = {
+    'settings': ('import backend.settings', 'backend.settings'),
+    'setup': ('import django; django.setup()', None),
+}
+
+
+def parse_importtime(stderr):
+    """Returns ``[(module, self_us, cumulative_us)]`` from ``python -X importtime`` output."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # Keep the indentation: it encodes nesting, top-level imports have none
+        modules.append((name[1:].rstrip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+def subtree(modules, module):
+    """The imports made by top-level ``module`` (printed just before it), plus itself."""
+    if module is None:
+        return modules
+    end = next((i for i, entry in enumerate(modules) if entry[0] == module), None)
+    if end is None:
+        return []
+    start = end
+    while start > 0 and modules[start - 1][0].startswith(' '):
+        start -= 1
+    return modules[start:end + 1]
+
+
+def measure(code):
+    """Runs ``code`` in a fresh interpreter; returns ``(wall_ms, modules, stdout)``."""
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'backend.settings'}
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if result.returncode:
+        raise CommandError(f'`{code}` failed:\n{result.stderr[-2000:]}')
+    return wall_ms, parse_importtime(result.stderr), result.stdout
+
+
+class Command(BaseCommand):
+    help = 'Measures cold import time of backend.settings and django.setup() in fresh interpreters'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help='Fresh interpreters per target; the median is reported')
+        parser.add_argument('--top', type=int, default=10, help='Slowest modules (self time) to list per target')
+        parser.add_argument('--budget-ms', type=float, default=50.0,
+                            help='Fail if importing backend.settings takes longer (cumulative, median)')
+        parser.add_argument('--setup-budget-ms', type=float, default=0,
+                            help='Fail if django.setup() takes longer (wall clock, median); 0 disables')
+
+    def handle(self, *args, **options):
+        results = {}
+        for target, (code, module) in TARGETS.items():
+            runs = [measure(code) for _ in range(options['repeat'])]
+            wall_ms = statistics.median(run[0] for run in runs)
+            # Without a named module, sum every top-level import (includes interpreter startup)
+            module_ms = statistics.median(
+                sum(cumulative for name, _, cumulative in run[1] if name == module or
+                    (module is None and not name.startswith(' '))) / 1000
+                for run in runs
+            )
+            results[target] = (wall_ms, module_ms)
+
+            self.stdout.write(f'{target}: {module_ms:.1f} ms importing, {wall_ms:.1f} ms wall (median of {len(runs)})')
+            slowest = sorted(subtree(runs[-1][1], module), key=lambda module: module[1], reverse=True)[:options['top']]
+            for name, self_us, cumulative_us in slowest:
+                self.stdout.write(f'  {self_us / 1000:8.2f} ms self {cumulative_us / 1000:8.2f} ms cumulative  {name.strip()}')
+            if any(run[2] for run in runs):
+                raise CommandError(f'{target} wrote to stdout during import: {runs[-1][2][:200]!r}')
+
+        failures = []
+        settings_ms = results['settings'][1]
+        if settings_ms > options['budget_ms']:
+            failures.append(f'backend.settings import took {settings_ms:.1f} ms (budget {options["budget_ms"]} ms)')
+        setup_ms = results['setup'][0]
+        if options['setup_budget_ms'] and setup_ms > options['setup_budget_ms']:
+            failures.append(f'django.setup() took {setup_ms:.1f} ms (budget {options["setup_budget_ms"]} ms)')
+        if failures:
+            raise CommandError('; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Startup within budget.'))
@@ -0,0 +1,38 @@
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from templates.manifests import ManifestError, build_manifest
+from templates.models import Template
+
+
+class Command(BaseCommand):
+    help = (
+        'Builds the stored manifest (entries, sizes, CRCs, SHA-256) of each template archive, '
+        'skipping archives whose contents have not changed since the last run'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('template_ids', nargs='*', type=int, help='Only these templates (default: all)')
+        parser.add_argument('--force', action='store_true', help='Rehash every archive, even untouched ones')
+
+    def handle(self, *args, **options):
+        templates = Template.objects.filter(
+            ~Q(zip_file='') | (Q(zip_file_url__isnull=False) & ~Q(zip_file_url='')) | Q(manifest__isnull=False)
+        ).only('id', 'zip_file', 'zip_file_url').order_by('id')
+        if options['template_ids']:
+            templates = templates.filter(id__in=options['template_ids'])
+        stats = Counter()
+        for template in templates.iterator():
+            try:
+                outcome = build_manifest(template, force=options['force'])
+            except ManifestError as e:
+                self.stderr.write(f'Template {template.pk}: {e}')
+                outcome = 'errors'
+            if outcome:
+                stats[outcome] += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"Manifests: {stats['built']} built, {stats['rehashed'] + stats['unchanged']} unchanged, "
+            f"{stats['removed']} removed, {stats['errors']} errors."
+        ))
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+
+from templates.models import Category, Template
+
+# Template columns written per line; image fields are Cloudinary public ids
+TEMPLATE_FIELDS = (
+    'id', 'title', 'description', 'price', 'image', 'additional_images', 'features', 'tech_stack',
+    'live_preview_url', 'zip_file', 'zip_file_url',
+)
+
+
+def export_catalog(stream, chunk_size=2000):
+    """
+    Writes one JSON object per line: every category first, then every template
+    (with its category name). Rows are streamed, so memory does not grow with
+    the catalog. Returns ``(categories, templates)`` written.
+    """
+    encoder = DjangoJSONEncoder()
+    categories = templates = 0
+    for row in Category.objects.order_by('id').values('id', 'name').iterator(chunk_size=chunk_size):
+        stream.write(encoder.encode({'type': 'category', **row}) + '\n')
+        categories += 1
+    rows = Template.objects.order_by('id').values(*TEMPLATE_FIELDS, category_name=F('category__name'))
+    for row in rows.iterator(chunk_size=chunk_size):
+        row['category'] = row.pop('category_name')
+        stream.write(encoder.encode({'type': 'template', **row}) + '\n')
+        templates += 1
+    return categories, templates
+
+
+class Command(BaseCommand):
+    help = 'Streams the catalog (categories and templates) to a JSONL file, or stdout with "-"'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Output file, or - for stdout')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if options['path'] == '-':
+            export_catalog(self.stdout, options['chunk_size'])
+            return
+        with open(options['path'], 'w', encoding='utf-8') as stream:
+            categories, templates = export_catalog(stream, options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {categories} categories and {templates} templates to {options['path']}."
+        ))
@@ -0,0 +1,124 @@
+import json
+import sys
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from templates.cache import CATEGORY_LIST, TEMPLATE_DETAIL, TEMPLATE_LIST, invalidate
+from templates.models import Category, Template
+from templates.search import get_search_backend
+
+# Columns an import may set; review aggregates and image URL sets are derived
+UPDATE_FIELDS = [
+    'title', 'description', 'category', 'price', 'image', 'additional_images', 'features', 'tech_stack',
+    'live_preview_url', 'zip_file', 'zip_file_url', 'image_urls', 'additional_image_urls',
+]
+
+
+class CatalogImporter:
+    """
+    Buffers templates and writes them ``batch_size`` at a time: rows whose id
+    already exists are bulk-updated, the rest bulk-created. Category names are
+    resolved through an in-memory map, creating categories on first sight.
+    """
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.category_ids = dict(Category.objects.values_list('name', 'id'))
+        self.pending = []
+        self.created = self.updated = 0
+        self.explicit_ids = False
+
+    def category_id(self, name):
+        if name not in self.category_ids:
+            self.category_ids[name] = Category.objects.create(name=name).id
+        return self.category_ids[name]
+
+    def add(self, row):
+        price = Decimal(str(row['price']))
+        if price <= 0:
+            raise ValueError(f'price must be greater than 0, got {price}')
+        template = Template(
+            id=row.get('id'),
+            title=row['title'],
+            description=row.get('description', ''),
+            category_id=self.category_id(row['category']),
+            price=price,
+            image=row.get('image'),
+            additional_images=row.get('additional_images') or [],
+            features=row.get('features') or [],
+            tech_stack=row.get('tech_stack') or [],
+            live_preview_url=row.get('live_preview_url'),
+            zip_file=row.get('zip_file') or '',
+            zip_file_url=row.get('zip_file_url'),
+        )
+        template.refresh_image_urls()
+        self.pending.append(template)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        ids = [template.pk for template in self.pending if template.pk]
+        existing = set(Template.objects.filter(pk__in=ids).values_list('pk', flat=True))
+        updates = [template for template in self.pending if template.pk in existing]
+        creates = [template for template in self.pending if template.pk not in existing]
+        self.explicit_ids = self.explicit_ids or any(template.pk for template in creates)
+        Template.objects.bulk_create(creates)
+        fields = UPDATE_FIELDS
+        if not settings.CLOUDINARY_CLOUD_NAME:
+            # refresh_image_urls left these empty; keep the stored ones
+            fields = [field for field in UPDATE_FIELDS if field not in ('image_urls', 'additional_image_urls')]
+        Template.objects.bulk_update(updates, fields)
+        self.created += len(creates)
+        self.updated += len(updates)
+        self.pending = []
+
+
+class Command(BaseCommand):
+    help = (
+        'Imports a JSONL catalog as written by export_catalog (or "-" for stdin). Templates '
+        'with an existing id are updated, others created; categories are matched by name.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Input file, or - for stdin')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['path'] == '-':
+            created, updated = self.run_import(sys.stdin, options['batch_size'])
+        else:
+            with open(options['path'], encoding='utf-8') as stream:
+                created, updated = self.run_import(stream, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Imported templates: {created} created, {updated} updated.'))
+
+    def run_import(self, stream, batch_size):
+        with transaction.atomic():
+            importer = CatalogImporter(batch_size)
+            for number, line in enumerate(stream, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                    if row.get('type') == 'category':
+                        importer.category_id(row['name'])
+                    elif row.get('type', 'template') == 'template':
+                        importer.add(row)
+                    else:
+                        raise ValueError(f"unknown record type {row['type']!r}")
+                except (ValueError, KeyError, TypeError, InvalidOperation) as e:
+                    raise CommandError(f'Line {number}: {e!r}')
+            importer.flush()
+
+            if importer.explicit_ids:
+                # Rows inserted with their own ids leave Postgres sequences behind
+                with connection.cursor() as cursor:
+                    for sql in connection.ops.sequence_reset_sql(no_style(), [Template, Category]):
+                        cursor.execute(sql)
+            # Bulk writes skip the save signals that maintain these
+            get_search_backend().rebuild()
+            invalidate(CATEGORY_LIST, TEMPLATE_LIST, TEMPLATE_DETAIL)
+        return importer.created, importer.updated
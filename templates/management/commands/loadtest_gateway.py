@@ -0,0 +1,112 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient, Client, override_settings
+
+from templates.benchmarking import summarize
+from templates.cashfree import reset_clients
+from templates.models import Category, Template
+from templates.stubs import CashfreeStubHandler, start_stub_server, stop_stub_server
+from templates.throttling import load_test_rates
+
+
+def summarize_run(outcomes, wall, stub):
+    statuses = [status_code for _, status_code in outcomes]
+    return {
+        **summarize([latency for latency, _ in outcomes], wall),
+        'statuses': {str(code): statuses.count(code) for code in sorted(set(statuses))},
+        # Most gateway calls waiting at the same time during this run
+        'peak_in_flight': stub.peak_in_flight,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Fires N initiate-payment requests at a local Cashfree stub that answers after --delay '
+        'seconds, through the sync view on --wsgi-workers blocking workers (the Procfile setup) '
+        'and through the async view on one event loop, and compares them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--delay', type=float, default=0.5, help='Stub gateway latency in seconds')
+        parser.add_argument('--wsgi-workers', type=int, default=1,
+                            help='Concurrent sync workers; gunicorn runs one sync worker unless told otherwise')
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+
+    def handle(self, *args, **options):
+        stub = start_stub_server(CashfreeStubHandler, delay=options['delay'])
+        category = Category.objects.create(name='Load test')
+        count = options['requests']
+        templates = Template.objects.bulk_create([
+            Template(category=category, title=f'Load test {i}', description='', price=Decimal('499.00'),
+                     features=['x'], tech_stack=['x'])
+            for i in range(count * 2)
+        ])
+        try:
+            with override_settings(CASHFREE_BASE_URL=stub.url, CASHFREE_APP_ID='load', CASHFREE_SECRET_KEY='load',
+                                   REST_FRAMEWORK={**settings.REST_FRAMEWORK,
+                                                   'DEFAULT_THROTTLE_RATES': load_test_rates()}):
+                reset_clients()
+                results = {
+                    'wsgi': self.run_sync(stub, templates[:count], options['wsgi_workers']),
+                    'asgi': asyncio.run(self.run_async(stub, templates[count:])),
+                }
+        finally:
+            reset_clients()
+            category.delete()
+            stop_stub_server(stub)
+
+        results['speedup'] = round(results['wsgi']['wall_s'] / results['asgi']['wall_s'], 1)
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for mode in ('wsgi', 'asgi'):
+            stats = results[mode]
+            self.stdout.write(
+                f"{mode}: {stats['requests']} requests in {stats['wall_s']:.2f}s  {stats['throughput_rps']:.1f} req/s  "
+                f"p50 {stats['p50_ms']:.0f} ms  p95 {stats['p95_ms']:.0f} ms  peak in flight {stats['peak_in_flight']}  "
+                f"statuses {stats['statuses']}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"async throughput gain: {results['speedup']}x"))
+
+    def post(self, client, template):
+        started = time.perf_counter()
+        response = client.post(f'/api/templates/{template.pk}/initiate-payment/', {'email': 'load@example.com'},
+                               content_type='application/json')
+        return time.perf_counter() - started, response.status_code
+
+    def run_sync(self, stub, templates, workers):
+        stub.peak_in_flight = 0
+        def worker(assigned):
+            client = Client()
+            try:
+                return [self.post(client, template) for template in assigned]
+            finally:
+                connections.close_all()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            chunks = pool.map(worker, [templates[i::workers] for i in range(workers)])
+            outcomes = [outcome for chunk in chunks for outcome in chunk]
+        return summarize_run(outcomes, time.perf_counter() - started, stub)
+
+    async def run_async(self, stub, templates):
+        stub.peak_in_flight = 0
+        client = AsyncClient()
+
+        async def post(template):
+            started = time.perf_counter()
+            response = await client.post(f'/api/async/templates/{template.pk}/initiate-payment/',
+                                         {'email': 'load@example.com'}, content_type='application/json')
+            return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        outcomes = await asyncio.gather(*(post(template) for template in templates))
+        return summarize_run(outcomes, time.perf_counter() - started, stub)
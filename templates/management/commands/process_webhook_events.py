@@ -0,0 +1,37 @@
+import signal
+import threading
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from templates.webhooks import process_pending_events
+
+
+class Command(BaseCommand):
+    help = 'Processes recorded payment webhook events that the background dispatcher has not handled'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace', type=float, default=30.0,
+                            help='Only pick up events at least this many seconds old')
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--poll-interval', type=float, default=10.0)
+        parser.add_argument('--once', action='store_true', help='Exit once nothing is pending instead of polling')
+
+    def handle(self, *args, **options):
+        stopping = threading.Event()
+        previous_handlers = {
+            signum: signal.signal(signum, lambda *args: stopping.set()) for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        processed = 0
+        try:
+            while not stopping.is_set():
+                count = process_pending_events(timedelta(seconds=options['grace']), options['batch_size'])
+                processed += count
+                if count < options['batch_size']:
+                    if options['once']:
+                        break
+                    stopping.wait(options['poll_interval'])
+        finally:
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+        self.stdout.write(self.style.SUCCESS(f'Processed {processed} webhook events.'))
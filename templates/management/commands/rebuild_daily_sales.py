@@ -0,0 +1,21 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from templates.models import DailySales, Payment
+from templates.sales import rebuild_daily_sales
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the daily sales rollups from the payments table (all days, or from --since on)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=date.fromisoformat, help='First day to rebuild, YYYY-MM-DD')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            created = rebuild_daily_sales(Payment, DailySales, since=options['since'],
+                                          batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {created} daily sales rows.'))
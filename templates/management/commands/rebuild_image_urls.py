@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from templates.cache import TEMPLATE_DETAIL, TEMPLATE_LIST, invalidate
+from templates.models import Template
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the stored responsive image URL sets (e.g. after changing TEMPLATE_IMAGE_WIDTHS)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        if not settings.CLOUDINARY_CLOUD_NAME:
+            raise CommandError('CLOUDINARY_CLOUD_NAME is not set; image URLs would have no cloud name.')
+        batch = []
+        updated = 0
+        for template in Template.objects.only('id', 'image', 'additional_images').iterator(chunk_size=options['batch_size']):
+            template.refresh_image_urls()
+            batch.append(template)
+            if len(batch) == options['batch_size']:
+                updated += Template.objects.bulk_update(batch, ['image_urls', 'additional_image_urls'])
+                batch = []
+        updated += Template.objects.bulk_update(batch, ['image_urls', 'additional_image_urls'])
+        # bulk_update skips the save signals that invalidate cached catalog responses
+        invalidate(TEMPLATE_LIST, TEMPLATE_DETAIL)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt image URLs for {updated} templates.'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from templates.models import Template, Review
+from templates.ratings import rebuild_rating_aggregates
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the denormalized review_count/rating_sum on every template'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            updated = rebuild_rating_aggregates(Template, Review)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rating aggregates for {updated} templates.'))
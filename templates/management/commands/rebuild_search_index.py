@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from templates.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the template full-text search index (needed after bulk writes that skip signals)'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        with transaction.atomic():
+            indexed = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'{type(backend).__name__}: indexed {indexed} templates.'))
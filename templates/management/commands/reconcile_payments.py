@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from templates.reconcile import Reconciler
+
+
+class Command(BaseCommand):
+    help = (
+        'Asks Cashfree for the status of stale PENDING payments (e.g. after a lost webhook) '
+        'and applies any that were paid or expired'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=float, default=30.0,
+                            help='Only check payments pending for at least this many minutes')
+        parser.add_argument('--max-age', type=float, default=7.0,
+                            help='Ignore payments created more than this many days ago')
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent Cashfree requests')
+        parser.add_argument('--rate', type=float, default=20.0,
+                            help='Maximum Cashfree requests per second (0 for no limit)')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        reconciler = Reconciler(workers=options['workers'], rate=options['rate'])
+        stats = reconciler.run(
+            older_than=timedelta(minutes=options['older_than']),
+            max_age=timedelta(days=options['max_age']),
+            batch_size=options['batch_size'],
+        )
+        message = (
+            f"Checked {stats['checked']} pending payments: {stats['success']} paid, {stats['failed']} failed, "
+            f"{stats['unchanged']} still pending, {stats['errors']} errors"
+        )
+        if stats['skipped']:
+            message += f", {stats['skipped']} skipped after Cashfree became unavailable"
+        self.stdout.write(self.style.SUCCESS(message + '.'))
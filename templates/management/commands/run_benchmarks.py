@@ -0,0 +1,247 @@
+import base64
+import hashlib
+import hmac
+import json
+import subprocess
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+import django
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from templates.benchmarking import WORDS, summarize
+from templates.cashfree import reset_clients
+from templates.models import Payment, SupportInquiry, Template
+from templates.outbox import deliver, enqueue_email
+from templates.stubs import CashfreeStubHandler, start_smtp_stub, start_stub_server, stop_stub_server
+from templates.throttling import load_test_rates
+
+from .seed_benchmark_data import CATEGORY_PREFIX, EMAIL_DOMAIN
+
+WEBHOOK_SECRET = 'bench-secret'
+SCENARIOS = [
+    'template-list', 'template-detail', 'template-search', 'initiate-payment',
+    'webhook', 'support-create', 'support-track', 'outbox-deliver',
+]
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                              capture_output=True, text=True, timeout=5).stdout.strip()
+    except OSError:
+        return ''
+
+
+class Command(BaseCommand):
+    help = (
+        'Drives the API in-process against local Cashfree and SMTP stubs and reports p50/p95/p99 '
+        'latency, throughput and SQL queries per endpoint as JSON. Writes payments, inquiries and '
+        'outbox rows: run it against a disposable database seeded with seed_benchmark_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--concurrency', type=int, default=1, help='Client threads per scenario')
+        parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+        parser.add_argument('--gateway-delay', type=float, default=0.0, help='Stub Cashfree latency in seconds')
+        parser.add_argument('--generate', action='store_true', help='Run seed_benchmark_data --clear first')
+        parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+        parser.add_argument('--compare', help='A previous JSON report; prints p95 and query deltas against it')
+
+    def handle(self, *args, **options):
+        if options['generate']:
+            call_command('seed_benchmark_data', clear=True, stdout=self.stderr)
+        self.template_ids = list(
+            Template.objects.filter(category__name__startswith=CATEGORY_PREFIX).values_list('pk', flat=True)
+        )
+        if not self.template_ids:
+            raise CommandError('No benchmark data; run seed_benchmark_data first or pass --generate.')
+
+        gateway = start_stub_server(CashfreeStubHandler, delay=options['gateway_delay'])
+        smtp = start_smtp_stub()
+        overrides = override_settings(
+            CASHFREE_BASE_URL=gateway.url, CASHFREE_APP_ID='bench', CASHFREE_SECRET_KEY=WEBHOOK_SECRET,
+            WEBHOOK_PROCESS_IN_BACKGROUND=False,
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend', EMAIL_HOST=smtp.host,
+            EMAIL_PORT=smtp.port, EMAIL_USE_TLS=False, EMAIL_HOST_USER='', EMAIL_HOST_PASSWORD='',
+            REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': load_test_rates()},
+        )
+        try:
+            with overrides:
+                reset_clients()
+                endpoints = {
+                    name: self.run_scenario(name, options['iterations'], options['warmup'], options['concurrency'])
+                    for name in options['scenarios']
+                }
+        finally:
+            reset_clients()
+            stop_stub_server(gateway)
+            stop_stub_server(smtp)
+
+        report = {
+            'meta': {
+                'commit': git_commit(),
+                'created_at': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'django': django.get_version(),
+                'templates': len(self.template_ids),
+                'iterations': options['iterations'],
+                'concurrency': options['concurrency'],
+                'gateway_delay_s': options['gateway_delay'],
+            },
+            'endpoints': endpoints,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.print_table(endpoints)
+        else:
+            self.stdout.write(output)
+        if options['compare']:
+            with open(options['compare']) as f:
+                self.print_comparison(json.load(f)['endpoints'], endpoints)
+
+    def run_scenario(self, name, iterations, warmup, concurrency):
+        call = getattr(self, 'scenario_' + name.replace('-', '_'))(iterations + warmup)
+        warm_client = Client(raise_request_exception=False)
+        for i in range(warmup):
+            call(warm_client, iterations + i)
+
+        def worker(indices):
+            client = Client(raise_request_exception=False)
+            outcomes = []
+            try:
+                for i in indices:
+                    with CaptureQueriesContext(connections['default']) as queries:
+                        started = time.perf_counter()
+                        ok = call(client, i)
+                        latency = time.perf_counter() - started
+                    outcomes.append((latency, len(queries), ok))
+            finally:
+                if threading.current_thread() is not threading.main_thread():
+                    connections.close_all()
+            return outcomes
+
+        started = time.perf_counter()
+        if concurrency == 1:
+            outcomes = worker(range(iterations))
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                chunks = pool.map(worker, [range(i, iterations, concurrency) for i in range(concurrency)])
+                outcomes = [outcome for chunk in chunks for outcome in chunk]
+        wall = time.perf_counter() - started
+
+        query_counts = [queries for _, queries, _ in outcomes]
+        result = {
+            **summarize([latency for latency, _, _ in outcomes], wall),
+            'errors': sum(1 for _, _, ok in outcomes if not ok),
+            'queries_mean': round(sum(query_counts) / len(query_counts), 2),
+            'queries_max': max(query_counts),
+        }
+        self.stderr.write(f"{name}: p50 {result['p50_ms']} ms  p95 {result['p95_ms']} ms  "
+                          f"{result['queries_mean']} queries  {result['errors']} errors")
+        return result
+
+    # scenario_*(count) does its untimed setup for ``count`` calls and returns ``call(client, i) -> ok``
+
+    def scenario_template_list(self, count):
+        return lambda client, i: client.get('/api/templates/').status_code == 200
+
+    def scenario_template_detail(self, count):
+        ids = self.template_ids
+        return lambda client, i: client.get(f'/api/templates/{ids[i % len(ids)]}/').status_code == 200
+
+    def scenario_template_search(self, count):
+        return lambda client, i: client.get('/api/templates/', {'search': WORDS[i % len(WORDS)]}).status_code == 200
+
+    def scenario_initiate_payment(self, count):
+        ids = self.template_ids
+
+        def call(client, i):
+            response = client.post(f'/api/templates/{ids[i % len(ids)]}/initiate-payment/',
+                                   {'email': f'buyer{i}@{EMAIL_DOMAIN}'}, content_type='application/json')
+            return response.status_code == 200
+        return call
+
+    def scenario_webhook(self, count):
+        run = uuid.uuid4().hex[:8]
+        template = Template.objects.get(pk=self.template_ids[0])
+        Payment.objects.bulk_create([
+            Payment(template=template, order_id=f'benchhook_{run}_{i}', user_email=f'buyer{i}@{EMAIL_DOMAIN}',
+                    amount=Decimal('499.00'))
+            for i in range(count)
+        ])
+
+        def call(client, i):
+            body = json.dumps({
+                'type': 'PAYMENT_SUCCESS_WEBHOOK',
+                'data': {'order': {'order_id': f'benchhook_{run}_{i}'}, 'payment': {'cf_payment_id': f'{run}_{i}'}},
+            }).encode()
+            timestamp = str(int(time.time() * 1000))
+            digest = hmac.new(WEBHOOK_SECRET.encode(), timestamp.encode() + body, hashlib.sha256).digest()
+            response = client.post('/api/webhook/', body, content_type='application/json', headers={
+                'x-webhook-timestamp': timestamp, 'x-webhook-signature': base64.b64encode(digest).decode(),
+            })
+            return response.status_code == 200
+        return call
+
+    def scenario_support_create(self, count):
+        def call(client, i):
+            response = client.post('/api/support/', {
+                'email': f'customer{i}@{EMAIL_DOMAIN}', 'inquiry_type': 'GENERAL',
+                'description': 'Where can I download my template?',
+            }, content_type='application/json')
+            return response.status_code == 201
+        return call
+
+    def scenario_support_track(self, count):
+        inquiry = SupportInquiry.objects.create(email=f'tracker@{EMAIL_DOMAIN}', inquiry_type='PAYMENT_STATUS',
+                                                description='Tracking benchmark')
+        data = {'inquiry_id': inquiry.inquiry_id, 'email': inquiry.email}
+        return lambda client, i: client.post('/api/support/track/', data,
+                                             content_type='application/json').status_code == 200
+
+    def scenario_outbox_deliver(self, count):
+        # Sends only messages it queued itself, over one reused SMTP connection
+        emails = [
+            enqueue_email('Benchmark', f'<p>Message {i} for bench@{EMAIL_DOMAIN}</p>', [f'bench@{EMAIL_DOMAIN}'])
+            for i in range(count)
+        ]
+        smtp = get_connection()
+
+        def call(client, i):
+            email = emails[i]
+            email.attempts = 1
+            return deliver(email, smtp, max_attempts=1)
+        return call
+
+    def print_table(self, endpoints):
+        for name, stats in endpoints.items():
+            self.stdout.write(
+                f"{name:<18} p50 {stats['p50_ms']:8.2f} ms  p95 {stats['p95_ms']:8.2f} ms  p99 {stats['p99_ms']:8.2f} ms  "
+                f"{stats['throughput_rps']:8.1f} req/s  {stats['queries_mean']:6.1f} queries  {stats['errors']} errors"
+            )
+
+    def print_comparison(self, baseline, endpoints):
+        for name, stats in endpoints.items():
+            before = baseline.get(name)
+            if not before:
+                continue
+            change = (stats['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0.0
+            self.stdout.write(
+                f"{name:<18} p95 {before['p95_ms']:8.2f} -> {stats['p95_ms']:8.2f} ms ({change:+.0f}%)  "
+                f"queries {before['queries_mean']} -> {stats['queries_mean']}"
+            )
@@ -0,0 +1,67 @@
+import logging
+import signal
+import threading
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from backend.routers import unpinned
+from templates.outbox import claim_batch, deliver, release
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Drains the outbound email outbox over a reused SMTP connection, retrying failures with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to sleep when the outbox is empty')
+        parser.add_argument('--max-attempts', type=int, default=8)
+        parser.add_argument('--base-delay', type=int, default=30, help='First retry delay in seconds, doubled per attempt')
+        parser.add_argument('--max-delay', type=int, default=3600)
+        parser.add_argument('--once', action='store_true', help='Exit once nothing is due instead of polling')
+
+    def handle(self, *args, **options):
+        self.stopping = threading.Event()
+        previous_handlers = {
+            signum: signal.signal(signum, self.request_stop) for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+
+        connection = get_connection()
+        sent = failed = 0
+        try:
+            while not self.stopping.is_set():
+                # One primary pin per batch, not for the life of the worker
+                with unpinned():
+                    batch = claim_batch(options['batch_size'])
+                    if not batch:
+                        # Don't hold an idle SMTP session open while polling
+                        connection.close()
+                        if options['once']:
+                            break
+                        self.stopping.wait(options['poll_interval'])
+                        continue
+
+                    try:
+                        connection.open()
+                    except Exception as e:
+                        logger.warning("Could not open SMTP connection: %s", e)
+                    for index, email in enumerate(batch):
+                        if self.stopping.is_set():
+                            release(batch[index:])
+                            break
+                        if deliver(email, connection, options['max_attempts'], options['base_delay'], options['max_delay']):
+                            sent += 1
+                        else:
+                            failed += 1
+                            connection.close()
+        finally:
+            connection.close()
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+        self.stdout.write(self.style.SUCCESS(f'Email worker stopped: {sent} sent, {failed} failed attempts.'))
+
+    def request_stop(self, signum, frame):
+        logger.info("Email worker received signal %s, finishing current message", signum)
+        self.stopping.set()
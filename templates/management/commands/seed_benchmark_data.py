@@ -0,0 +1,103 @@
+import random
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from templates.benchmarking import WORDS
+from templates.cache import CATEGORY_LIST, TEMPLATE_DETAIL, TEMPLATE_LIST, invalidate
+from templates.models import Category, DailySales, OutboundEmail, Payment, Review, SupportInquiry, Template
+from templates.ratings import rebuild_rating_aggregates
+from templates.sales import rebuild_daily_sales
+from templates.search import get_search_backend
+
+# Everything generated is tagged so --clear can remove it again
+CATEGORY_PREFIX = 'Bench '
+EMAIL_DOMAIN = 'bench.example.com'
+STACKS = ['React', 'Vue', 'Next.js', 'Tailwind CSS', 'Bootstrap', 'Django', 'Node.js', 'TypeScript']
+
+
+def clear_benchmark_data():
+    """Deletes generated rows; templates, reviews and payments cascade from their categories."""
+    SupportInquiry.objects.filter(email__endswith=f'@{EMAIL_DOMAIN}').delete()
+    OutboundEmail.objects.filter(body__contains=f'@{EMAIL_DOMAIN}').delete()
+    return Category.objects.filter(name__startswith=CATEGORY_PREFIX).delete()[0]
+
+
+class Command(BaseCommand):
+    help = (
+        'Bulk-creates benchmark categories, templates, reviews and payments '
+        '(rating aggregates, sales rollups, image URLs and the search index are rebuilt to match)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=10)
+        parser.add_argument('--templates', type=int, default=1000)
+        parser.add_argument('--reviews', type=int, default=5000)
+        parser.add_argument('--payments', type=int, default=2000)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0, help='Random seed, for repeatable data sets')
+        parser.add_argument('--clear', action='store_true', help='Remove previously generated data first')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        if options['clear']:
+            self.stdout.write(f'Removed {clear_benchmark_data()} generated rows.')
+
+        with transaction.atomic():
+            categories = Category.objects.bulk_create(
+                [Category(name=f'{CATEGORY_PREFIX}{i}') for i in range(options['categories'])]
+            )
+            templates = Template.objects.bulk_create(
+                [self.make_template(rng, rng.choice(categories), i) for i in range(options['templates'])],
+                batch_size=batch_size,
+            )
+            Review.objects.bulk_create(
+                [
+                    Review(template=rng.choice(templates), user=f'user{i}', rating=rng.randint(1, 5),
+                           comment=' '.join(rng.choices(WORDS, k=12)))
+                    for i in range(options['reviews'])
+                ],
+                batch_size=batch_size,
+            )
+            Payment.objects.bulk_create(
+                [self.make_payment(rng, rng.choice(templates), i) for i in range(options['payments'])],
+                batch_size=batch_size,
+            )
+            # bulk_create skips save() and signals, so bring derived data up to date in bulk
+            rebuild_rating_aggregates(Template, Review)
+            rebuild_daily_sales(Payment, DailySales)
+            get_search_backend().rebuild()
+            invalidate(CATEGORY_LIST, TEMPLATE_LIST, TEMPLATE_DETAIL)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(categories)} categories, {len(templates)} templates, "
+            f"{options['reviews']} reviews and {options['payments']} payments."
+        ))
+
+    def make_template(self, rng, category, index):
+        template = Template(
+            category=category,
+            title=f"{' '.join(rng.sample(WORDS, 2)).title()} {index}",
+            description=' '.join(rng.choices(WORDS, k=40)),
+            price=Decimal(rng.randrange(199, 4999)),
+            image=f'templates/bench_{index}',
+            additional_images=[f'templates/bench_{index}_{n}' for n in range(rng.randint(0, 4))],
+            features=rng.sample(WORDS, 4),
+            tech_stack=rng.sample(STACKS, 3),
+            live_preview_url=f'https://preview.example.com/{index}',
+            zip_file_url=f'https://files.example.com/{index}.zip',
+        )
+        template.refresh_image_urls()
+        return template
+
+    def make_payment(self, rng, template, index):
+        return Payment(
+            template=template,
+            order_id=f'bench_{template.pk}_{index}',
+            user_email=f'buyer{index}@{EMAIL_DOMAIN}',
+            user_phone='9999999999',
+            amount=template.price,
+            status=rng.choices(['SUCCESS', 'PENDING', 'FAILED'], weights=[70, 20, 10])[0],
+        )
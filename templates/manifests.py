@@ -0,0 +1,145 @@
+"""
+Manifests of template archives: one row per archive with its entries (name,
+size, compressed size, CRC) and a SHA-256 of the whole file, so "what's
+inside" never has to open the ZIP at request time.
+
+Entries come from the ZIP central directory only: the archive is mmapped and
+zipfile reads the end-of-central-directory record and the directory it points
+to, leaving the compressed data untouched. Local archives are read under
+TEMPLATE_FILES_ROOT; templates that only have ``zip_file_url`` are fetched to a
+temporary file first.
+
+Rebuilds are incremental. A cheap validator (mtime and size locally, ETag or
+Last-Modified and length remotely) skips archives that were not touched; the
+rest are hashed, and the stored manifest is rewritten only when the hash changed.
+"""
+import hashlib
+import logging
+import mmap
+import os
+import shutil
+import tempfile
+import zipfile
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+
+from .downloads import DownloadDenied, archive_path
+from .models import TemplateManifest
+
+logger = logging.getLogger(__name__)
+
+FETCH_TIMEOUT = (5, 60)
+
+
+class ManifestError(Exception):
+    pass
+
+
+def read_manifest(path):
+    """``(sha256, size, entries)`` for the ZIP at ``path``."""
+    try:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if not size:
+                raise ManifestError(f'{path} is empty')
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                digest = hashlib.sha256(mm).hexdigest()
+                return digest, size, read_entries(mm)
+    except OSError as e:
+        # Unreadable, or removed since it was found
+        raise ManifestError(f'{path}: {e}')
+
+
+def read_entries(mm):
+    try:
+        with zipfile.ZipFile(mm) as archive:
+            infos = archive.infolist()
+    except (zipfile.BadZipFile, ValueError) as e:
+        # mmap raises ValueError where a file would raise OSError, e.g. seeking before the start
+        raise ManifestError(f'Not a ZIP archive: {e}')
+    return [
+        {
+            'name': info.filename,
+            'size': info.file_size,
+            'compressed_size': info.compress_size,
+            'crc': f'{info.CRC:08x}',
+        }
+        for info in infos if not info.is_dir()
+    ]
+
+
+def local_validator(path):
+    stat = os.stat(path)
+    return f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+
+
+def remote_validator(url):
+    """ETag (or Last-Modified) plus length from a HEAD request; '' when the server sends neither."""
+    response = requests.head(url, allow_redirects=True, timeout=FETCH_TIMEOUT)
+    response.raise_for_status()
+    tag = response.headers.get('ETag') or response.headers.get('Last-Modified')
+    return f"{tag}-{response.headers.get('Content-Length', '')}" if tag else ''
+
+
+def fetch(url, destination):
+    with requests.get(url, stream=True, timeout=FETCH_TIMEOUT) as response:
+        response.raise_for_status()
+        shutil.copyfileobj(response.raw, destination, settings.DOWNLOAD_CHUNK_SIZE)
+    destination.flush()
+
+
+def build_manifest(template, force=False):
+    """
+    Brings ``template``'s manifest up to date. Returns 'built', 'rehashed'
+    (touched but identical), 'unchanged', 'removed' when it no longer has an
+    archive but had a manifest, or None when it has neither.
+    """
+    manifest = TemplateManifest.objects.filter(template=template).first()
+    if template.zip_file:
+        source = template.zip_file
+        try:
+            path = archive_path(template)
+        except DownloadDenied:
+            raise ManifestError(f'{source} not found under TEMPLATE_FILES_ROOT')
+        try:
+            validator = local_validator(path)
+        except OSError as e:
+            raise ManifestError(f'{source}: {e}')
+    elif template.zip_file_url:
+        source = path = template.zip_file_url
+        try:
+            validator = remote_validator(source)
+        except requests.RequestException as e:
+            raise ManifestError(f'{source}: {e}')
+    else:
+        if manifest:
+            manifest.delete()
+            return 'removed'
+        return None
+
+    if (not force and manifest and validator
+            and manifest.source == source and manifest.validator == validator):
+        return 'unchanged'
+
+    if template.zip_file:
+        digest, size, entries = read_manifest(path)
+    else:
+        with tempfile.NamedTemporaryFile(suffix='.zip') as f:
+            try:
+                fetch(source, f)
+            except requests.RequestException as e:
+                raise ManifestError(f'{source}: {e}')
+            digest, size, entries = read_manifest(f.name)
+
+    if manifest and manifest.archive_hash == digest:
+        manifest.source, manifest.validator = source, validator
+        manifest.save(update_fields=['source', 'validator', 'checked_at'])
+        return 'rehashed'
+    TemplateManifest.objects.update_or_create(template=template, defaults={
+        'source': source, 'validator': validator, 'archive_hash': digest, 'size': size, 'entries': entries,
+        'built_at': timezone.now(),
+    })
+    logger.info("Manifest built for template %s: %d entries, sha256 %s", template.pk, len(entries), digest)
+    return 'built'
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.1 on 2026-10-17 03:53
+
+from django.db import migrations, models
+
+from templates.ratings import rebuild_rating_aggregates
+
+
+def backfill_rating_aggregates(apps, schema_editor):
+    rebuild_rating_aggregates(apps.get_model('templates', 'Template'), apps.get_model('templates', 'Review'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('templates', '0008_alter_template_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='template',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='template',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_rating_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.1 on 2026-10-17 04:09
+
+from django.db import migrations, models
+
+from templates.images import build_image_urls, image_urls_enabled
+
+
+def backfill_image_urls(apps, schema_editor):
+    if not image_urls_enabled():
+        # Left empty; run rebuild_image_urls once CLOUDINARY_CLOUD_NAME is set
+        return
+    Template = apps.get_model('templates', 'Template')
+    templates = list(Template.objects.only('id', 'image', 'additional_images'))
+    for template in templates:
+        template.image_urls = build_image_urls(template.image) or {}
+        template.additional_image_urls = [
+            urls for urls in (build_image_urls(public_id) for public_id in template.additional_images or []) if urls
+        ]
+    Template.objects.bulk_update(templates, ['image_urls', 'additional_image_urls'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('templates', '0012_webhookevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='template',
+            name='additional_image_urls',
+            field=models.JSONField(default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name='template',
+            name='image_urls',
+            field=models.JSONField(default=dict, editable=False),
+        ),
+        migrations.RunPython(backfill_image_urls, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-17 04:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('templates', '0013_template_image_urls'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', 'created_at'], name='payment_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['user_email', 'created_at'], name='payment_email_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['template', 'date'], name='review_template_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supportinquiry',
+            index=models.Index(fields=['order_id', 'created_at'], name='support_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='template',
+            index=models.Index(fields=['category', 'price'], name='template_category_price_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-17 04:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from templates.sales import rebuild_daily_sales
+
+
+def backfill_daily_sales(apps, schema_editor):
+    rebuild_daily_sales(apps.get_model('templates', 'Payment'), apps.get_model('templates', 'DailySales'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('templates', '0014_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('template', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='templates.template')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'template', 'status'), name='daily_sales_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_sales, migrations.RunPython.noop),
+    ]
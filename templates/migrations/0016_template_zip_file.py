@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-17 04:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('templates', '0015_daily_sales'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='template',
+            name='zip_file',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+    ]
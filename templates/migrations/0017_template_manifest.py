@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-17 04:44
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('templates', '0016_template_zip_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TemplateManifest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=500)),
+                ('validator', models.CharField(blank=True, default='', max_length=200)),
+                ('archive_hash', models.CharField(max_length=64)),
+                ('size', models.BigIntegerField()),
+                ('entries', models.JSONField(default=list)),
+                ('built_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('checked_at', models.DateTimeField(auto_now=True)),
+                ('template', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='manifest', to='templates.template')),
+            ],
+        ),
+    ]
@@ -1,7 +1,12 @@
 from time import timezone
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.utils import timezone
 
+from .ids import new_inquiry_id
+from .images import build_image_urls, image_urls_enabled
+from .sales import add_to_daily_sales
+
 class Category(models.Model):
     name = models.CharField(max_length=100)
     def __str__(self):
@@ -18,17 +23,46 @@ class Template(models.Model):
     tech_stack = models.JSONField(default=list)  # List of tech stack, e.g., ["React", "Tailwind CSS"]
     live_preview_url = models.URLField(max_length=500, blank=True, null=True)  # URL for live preview
     zip_file_url = models.URLField(blank=True, null=True)
+    # Archive path under TEMPLATE_FILES_ROOT, served by the signed download endpoint
+    zip_file = models.CharField(max_length=255, blank=True, default='')
+    # Responsive Cloudinary URL sets built from image/additional_images on save
+    image_urls = models.JSONField(default=dict, editable=False)
+    additional_image_urls = models.JSONField(default=list, editable=False)
+    # Denormalized rating aggregates, maintained by Review.save and the post_delete signal
+    review_count = models.PositiveIntegerField(default=0, editable=False)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.title
 
+    def refresh_image_urls(self):
+        """Rebuilds the URL sets; False (leaving them as they are) when no cloud name is configured."""
+        if not image_urls_enabled():
+            return False
+        self.image_urls = build_image_urls(self.image) or {}
+        self.additional_image_urls = [
+            urls for urls in (build_image_urls(public_id) for public_id in self.additional_images or []) if urls
+        ]
+        return True
+
+    def save(self, *args, **kwargs):
+        refreshed = self.refresh_image_urls()
+        update_fields = kwargs.get('update_fields')
+        if refreshed and update_fields is not None and {'image', 'additional_images'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'image_urls', 'additional_image_urls'}
+        super().save(*args, **kwargs)
+
     @property
     def average_rating(self):
-        reviews = self.reviews.all()
-        if reviews.exists():
-            return round(sum(review.rating for review in reviews) / reviews.count(), 1)
+        if self.review_count:
+            return round(self.rating_sum / self.review_count, 1)
         return 0
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['category', 'price'], name='template_category_price_idx'),
+        ]
+
 class Review(models.Model):
     template = models.ForeignKey(Template, on_delete=models.CASCADE, related_name='reviews')
     user = models.CharField(max_length=100)
@@ -36,8 +70,30 @@ class Review(models.Model):
     comment = models.TextField()
     date = models.DateTimeField(auto_now_add=True)
 
+    def save(self, *args, **kwargs):
+        # Keep Template.review_count/rating_sum in step with the review row
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = Review.objects.select_for_update().filter(pk=self.pk).values('template_id', 'rating').first()
+            super().save(*args, **kwargs)
+            if previous:
+                Template.objects.filter(pk=previous['template_id']).update(
+                    review_count=F('review_count') - 1,
+                    rating_sum=F('rating_sum') - previous['rating'],
+                )
+            Template.objects.filter(pk=self.template_id).update(
+                review_count=F('review_count') + 1,
+                rating_sum=F('rating_sum') + self.rating,
+            )
+
     def __str__(self):
         return f"{self.user} - {self.template.title}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['template', 'date'], name='review_template_date_idx'),
+        ]
     
 
 
@@ -51,11 +107,112 @@ class Payment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    def save(self, *args, **kwargs):
+        # Move this payment between DailySales rows when its template, amount or status changes
+        update_fields = kwargs.get('update_fields')
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = (Payment.objects.select_for_update().filter(pk=self.pk)
+                            .values('template_id', 'amount', 'status', 'created_at').first())
+            super().save(*args, **kwargs)
+            if previous:
+                saved = {
+                    name: previous[name] if update_fields is not None and field not in update_fields
+                    else getattr(self, name)
+                    for name, field in (('template_id', 'template'), ('amount', 'amount'), ('status', 'status'))
+                }
+                if all(saved[name] == previous[name] for name in saved):
+                    return
+                self.count_sale(previous['template_id'], previous['created_at'], previous['status'],
+                                -1, -previous['amount'])
+            else:
+                saved = {'template_id': self.template_id, 'amount': self.amount, 'status': self.status}
+            self.count_sale(saved['template_id'], self.created_at, saved['status'], 1, saved['amount'])
+
+    @staticmethod
+    def count_sale(template_id, created_at, status, count, amount):
+        add_to_daily_sales(DailySales, template_id, timezone.localdate(created_at), status, count, amount)
+
     def __str__(self):
         return f"Payment {self.order_id} for {self.template.title}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='payment_status_created_idx'),
+            models.Index(fields=['user_email', 'created_at'], name='payment_email_created_idx'),
+        ]
     
 
 
+# Payments per template, day (of creation) and status; maintained by Payment.save
+
+class DailySales(models.Model):
+    date = models.DateField()
+    template = models.ForeignKey(Template, on_delete=models.CASCADE, related_name='daily_sales')
+    status = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.date} {self.template_id} {self.status}: {self.count} / {self.amount}"
+
+    class Meta:
+        constraints = [
+            # Leading date column: the analytics range query reads this index
+            models.UniqueConstraint(fields=['date', 'template', 'status'], name='daily_sales_unique'),
+        ]
+
+
+# Archive contents, precomputed by the build_manifests command (templates/manifests.py)
+
+class TemplateManifest(models.Model):
+    template = models.OneToOneField(Template, on_delete=models.CASCADE, related_name='manifest')
+    # zip_file path or zip_file_url the manifest was read from
+    source = models.CharField(max_length=500)
+    # Cheap change check (mtime/size, or ETag/Last-Modified) consulted before hashing
+    validator = models.CharField(max_length=200, blank=True, default='')
+    archive_hash = models.CharField(max_length=64)
+    size = models.BigIntegerField()
+    entries = models.JSONField(default=list)
+    built_at = models.DateTimeField(default=timezone.now)
+    checked_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.template_id}: {self.archive_hash[:12]} ({len(self.entries)} entries)"
+
+
+# Payment gateway webhook deliveries, deduplicated by event_id
+
+class WebhookEvent(models.Model):
+    STATUS_CHOICES = (
+        ('RECEIVED', 'Received'),
+        ('PROCESSED', 'Processed'),
+        ('IGNORED', 'Ignored'),
+        ('FAILED', 'Failed'),
+    )
+
+    event_id = models.CharField(max_length=128, unique=True)
+    event_type = models.CharField(max_length=64)
+    order_id = models.CharField(max_length=100, blank=True, default='')
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='RECEIVED')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+    received_at = models.DateTimeField(auto_now_add=True)
+    # Pushed back after each failed attempt, like OutboundEmail.next_attempt_at
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.event_type} {self.order_id} ({self.status})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='webhook_pending_idx'),
+        ]
+
+
 
 # Inquiry model for user inquiries
 
@@ -84,12 +241,47 @@ class SupportInquiry(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.inquiry_id:
-            # Generate unique inquiry ID (e.g., SUPP-123456)
-            self.inquiry_id = f"SUPP-{int(timezone.now().timestamp())}"
+            # Time-ordered unique ID, e.g. SUPP-0D3K8N1R2T000
+            self.inquiry_id = new_inquiry_id()
         super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.inquiry_id} - {self.email} - {self.status}"
 
     class Meta:
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+        indexes = [
+            # track() looks up by (inquiry_id, email); the unique index on inquiry_id already serves it
+            models.Index(fields=['order_id', 'created_at'], name='support_order_idx'),
+        ]
+
+
+# Outbox for outbound email, drained by the run_email_worker command
+
+class OutboundEmail(models.Model):
+    STATUS_CHOICES = (
+        ('PENDING', 'Pending'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+    )
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    content_subtype = models.CharField(max_length=20, default='html')
+    from_email = models.CharField(max_length=254)
+    to = models.JSONField(default=list)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
+
+    class Meta:
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
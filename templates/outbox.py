@@ -0,0 +1,92 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+# A claimed message is invisible to other workers for this long; if the worker
+# dies mid-send the message becomes due again once the lease runs out.
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+def enqueue_email(subject, body, to, from_email=None, content_subtype='html'):
+    """
+    Records an email in the outbox. Call it inside the transaction that makes
+    the state change so the message is stored if and only if that commits.
+    """
+    return OutboundEmail.objects.create(
+        subject=subject,
+        body=body,
+        content_subtype=content_subtype,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(to),
+    )
+
+
+def claim_batch(batch_size):
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboundEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='PENDING', next_attempt_at__lte=now)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        if batch:
+            OutboundEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+                attempts=F('attempts') + 1,
+                next_attempt_at=now + CLAIM_LEASE,
+            )
+    for email in batch:
+        email.attempts += 1
+    return batch
+
+
+def release(emails):
+    # Hands unsent claims straight back instead of waiting out the lease
+    OutboundEmail.objects.filter(pk__in=[email.pk for email in emails], status='PENDING').update(
+        attempts=F('attempts') - 1,
+        next_attempt_at=timezone.now(),
+    )
+
+
+def retry_delay(attempts, base_delay, max_delay):
+    return timedelta(seconds=min(base_delay * 2 ** (attempts - 1), max_delay))
+
+
+def deliver(email, connection, max_attempts, base_delay=30, max_delay=3600):
+    """Sends one claimed message over ``connection``; returns True when sent."""
+    message = EmailMessage(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email,
+        to=email.to,
+        connection=connection,
+    )
+    message.content_subtype = email.content_subtype
+    try:
+        message.send()
+    except Exception as e:
+        if email.attempts >= max_attempts:
+            email.status = 'FAILED'
+            logger.error("Giving up on outbox email %s after %s attempts: %s", email.pk, email.attempts, e)
+        else:
+            email.next_attempt_at = timezone.now() + retry_delay(email.attempts, base_delay, max_delay)
+            logger.warning("Outbox email %s failed (attempt %s), retrying at %s: %s",
+                           email.pk, email.attempts, email.next_attempt_at, e)
+        email.last_error = str(e)
+        email.save(update_fields=['status', 'next_attempt_at', 'last_error'])
+        return False
+
+    email.status = 'SENT'
+    email.sent_at = timezone.now()
+    email.last_error = ''
+    email.save(update_fields=['status', 'sent_at', 'last_error'])
+    logger.info("Outbox email %s sent to %s", email.pk, email.to)
+    return True
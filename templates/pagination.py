@@ -0,0 +1,34 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+from .search import SEARCH_RANK
+
+
+class SettingsCursorPagination(CursorPagination):
+    # Name of the setting holding the default page size
+    page_size_setting = None
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        # Read per request rather than at import, so settings changes apply
+        self.page_size = getattr(settings, self.page_size_setting)
+        self.max_page_size = settings.LIST_MAX_PAGE_SIZE
+        return super().get_page_size(request)
+
+
+class TemplateCursorPagination(SettingsCursorPagination):
+    # Keyset pagination on the primary key: newest first, stable under inserts.
+    ordering = '-id'
+    page_size_setting = 'LIST_PAGE_SIZE'
+
+    def get_ordering(self, request, queryset, view):
+        # Ranked search results page by relevance, ties broken by id
+        if SEARCH_RANK in queryset.query.annotations:
+            return ('-' + SEARCH_RANK, '-id')
+        return super().get_ordering(request, queryset, view)
+
+
+class ReviewCursorPagination(SettingsCursorPagination):
+    # Newest first; (template, date) is indexed, id breaks ties between same-instant reviews
+    ordering = ('-date', '-id')
+    page_size_setting = 'REVIEW_PAGE_SIZE'
@@ -0,0 +1,121 @@
+"""
+Cheap payment status reads for checkout polling, plus waiting for a change.
+
+Status is cached per order and rewritten whenever a Payment is saved. Waiting
+(long-poll and SSE) is served by the async views only. Waiters in this process
+are woken directly by that write; waiters in other workers notice on their next
+poll of the (shared) cache. With a per-process cache,
+PAYMENT_STATUS_CACHE_TIMEOUT bounds how stale another worker's view can be.
+"""
+import asyncio
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from rest_framework.fields import DateTimeField
+
+from .cache import get_cache
+from .models import Payment
+
+# Statuses after which nothing changes any more
+FINAL_STATUSES = {'SUCCESS', 'FAILED'}
+
+_waiters = defaultdict(set)
+_waiters_lock = threading.Lock()
+
+
+def status_key(order_id):
+    return f'payment:status:{order_id}'
+
+
+def status_data(order_id, status, updated_at):
+    return {'order_id': order_id, 'status': status, 'updated_at': DateTimeField().to_representation(updated_at)}
+
+
+def get_payment_status(order_id):
+    """``{'order_id', 'status', 'updated_at'}`` for ``order_id``, or None when there is no such payment."""
+    cache = get_cache()
+    data = cache.get(status_key(order_id))
+    if data is None:
+        row = Payment.objects.filter(order_id=order_id).values('status', 'updated_at').first()
+        if row is None:
+            return None
+        data = status_data(order_id, row['status'], row['updated_at'])
+        cache.set(status_key(order_id), data, timeout=settings.PAYMENT_STATUS_CACHE_TIMEOUT)
+    return data
+
+
+async def aget_payment_status(order_id):
+    cache = get_cache()
+    data = await cache.aget(status_key(order_id))
+    if data is None:
+        row = await Payment.objects.filter(order_id=order_id).values('status', 'updated_at').afirst()
+        if row is None:
+            return None
+        data = status_data(order_id, row['status'], row['updated_at'])
+        await cache.aset(status_key(order_id), data, timeout=settings.PAYMENT_STATUS_CACHE_TIMEOUT)
+    return data
+
+
+def publish_status(payment):
+    """Writes the committed status through to the cache and wakes local waiters."""
+    data = status_data(payment.order_id, payment.status, payment.updated_at)
+    get_cache().set(status_key(payment.order_id), data, timeout=settings.PAYMENT_STATUS_CACHE_TIMEOUT)
+    with _waiters_lock:
+        callbacks = _waiters.pop(payment.order_id, set())
+    for callback in callbacks:
+        callback()
+
+
+def _register(order_id, callback):
+    with _waiters_lock:
+        _waiters[order_id].add(callback)
+
+
+def _unregister(order_id, callback):
+    with _waiters_lock:
+        callbacks = _waiters.get(order_id)
+        if callbacks is not None:
+            callbacks.discard(callback)
+            if not callbacks:
+                del _waiters[order_id]
+
+
+def wait_seconds(value):
+    """Parses the ``wait`` query parameter, capped at PAYMENT_STATUS_MAX_WAIT."""
+    try:
+        seconds = float(value or 0)
+    except ValueError:
+        return 0.0
+    return max(0.0, min(seconds, settings.PAYMENT_STATUS_MAX_WAIT))
+
+
+async def await_status_change(order_id, known_status, timeout):
+    """
+    Waits up to ``timeout`` seconds until the status differs from
+    ``known_status``; returns the latest status data either way. Async only:
+    a sync worker would be tied up for the whole wait.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        data = await aget_payment_status(order_id)
+        remaining = deadline - loop.time()
+        if data is None or data['status'] != known_status or remaining <= 0:
+            return data
+        woken = asyncio.Event()
+
+        def wake():
+            try:
+                loop.call_soon_threadsafe(woken.set)
+            except RuntimeError:
+                # The loop closed after this waiter gave up
+                pass
+
+        _register(order_id, wake)
+        try:
+            await asyncio.wait_for(woken.wait(), min(remaining, settings.PAYMENT_STATUS_POLL_INTERVAL))
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            _unregister(order_id, wake)
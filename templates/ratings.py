@@ -0,0 +1,17 @@
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def rebuild_rating_aggregates(template_model, review_model):
+    """Recompute review_count/rating_sum for every template in one UPDATE."""
+    reviews = review_model.objects.filter(template=OuterRef('pk')).order_by().values('template')
+    return template_model.objects.update(
+        review_count=Coalesce(
+            Subquery(reviews.annotate(total=Count('id')).values('total'), output_field=IntegerField()),
+            Value(0),
+        ),
+        rating_sum=Coalesce(
+            Subquery(reviews.annotate(total=Sum('rating')).values('total'), output_field=IntegerField()),
+            Value(0),
+        ),
+    )
@@ -0,0 +1,128 @@
+"""
+Catches up payments whose webhook never arrived: asks Cashfree for the status
+of stale PENDING orders and applies the answer like a webhook would.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from backend.routers import unpinned
+
+from .cashfree import CashfreeAPIError, CashfreeClient, CashfreeUnavailable, client_options
+from .models import Payment
+from .webhooks import apply_payment_status
+
+logger = logging.getLogger(__name__)
+
+# Cashfree order_status -> internal Payment.status; ACTIVE means still open
+ORDER_STATUSES = {
+    'PAID': 'SUCCESS',
+    'EXPIRED': 'FAILED',
+    'TERMINATED': 'FAILED',
+}
+
+
+class RateLimiter:
+    """Spaces ``acquire()`` calls at least 1/rate seconds apart, across threads."""
+
+    def __init__(self, rate, clock=time.monotonic, sleep=time.sleep):
+        self.interval = 1.0 / rate if rate else 0.0
+        self.clock = clock
+        self.sleep = sleep
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+
+    def acquire(self):
+        with self.lock:
+            now = self.clock()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            self.sleep(slot - now)
+
+
+def stale_payments(older_than, max_age, batch_size):
+    """
+    Yields lists of ``(pk, order_id, created_at)`` for PENDING payments created
+    between ``max_age`` and ``older_than`` ago, oldest first. Each batch is one
+    range query on the (status, created_at) index, continuing after the last row.
+    """
+    now = timezone.now()
+    base = Payment.objects.filter(status='PENDING', created_at__gte=now - max_age, created_at__lt=now - older_than)
+    last = None
+    while True:
+        page = base
+        if last is not None:
+            page = page.filter(Q(created_at__gt=last[2]) | Q(created_at=last[2], pk__gt=last[0]))
+        rows = list(page.order_by('created_at', 'pk').values_list('pk', 'order_id', 'created_at')[:batch_size])
+        if not rows:
+            return
+        yield rows
+        last = rows[-1]
+
+
+class Reconciler:
+    def __init__(self, workers=8, rate=20.0, client=None):
+        self.workers = workers
+        self.limiter = RateLimiter(rate)
+        self.client = client or CashfreeClient(**client_options(), pool_size=workers)
+        self.stats = Counter()
+        self.stats_lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def count(self, outcome):
+        with self.stats_lock:
+            self.stats[outcome] += 1
+
+    def check(self, order_id):
+        """The internal status Cashfree reports for ``order_id``; None if unknown or unchanged."""
+        if self.stopped.is_set():
+            self.count('skipped')
+            return None
+        self.limiter.acquire()
+        try:
+            data = self.client.get_order(order_id)
+        except CashfreeAPIError as e:
+            if e.status_code == 404:
+                # create_order never reached Cashfree, so this order can't be paid
+                return 'FAILED'
+            logger.warning("Reconcile: Cashfree rejected status check for %s: %s", order_id, e.data)
+            self.count('errors')
+            return None
+        except CashfreeUnavailable as e:
+            logger.error("Reconcile: Cashfree unavailable, stopping: %s", e)
+            self.count('errors')
+            self.stopped.set()
+            return None
+        return ORDER_STATUSES.get(data.get('order_status'))
+
+    def apply(self, new_statuses):
+        """Applies ``{pk: status}`` in one transaction, skipping payments that moved on meanwhile."""
+        with transaction.atomic():
+            payments = (Payment.objects.select_for_update().select_related('template')
+                        .filter(pk__in=list(new_statuses), status='PENDING'))
+            for payment in payments:
+                if apply_payment_status(payment, new_statuses[payment.pk]):
+                    self.stats[new_statuses[payment.pk].lower()] += 1
+
+    def run(self, older_than, max_age, batch_size=500):
+        with ThreadPoolExecutor(self.workers) as pool:
+            for rows in stale_payments(older_than, max_age, batch_size):
+                results = pool.map(self.check, [order_id for _, order_id, _ in rows])
+                new_statuses = {pk: status for (pk, _, _), status in zip(rows, results) if status}
+                self.stats['checked'] += len(rows)
+                if new_statuses:
+                    with unpinned():
+                        self.apply(new_statuses)
+                if self.stopped.is_set():
+                    break
+        self.stats['unchanged'] = self.stats['checked'] - sum(
+            self.stats[outcome] for outcome in ('success', 'failed', 'errors', 'skipped')
+        )
+        return self.stats
@@ -0,0 +1,48 @@
+"""
+Daily sales rollups: payments counted and summed per (day, template, status),
+where the day is the payment's creation date. Payment.save keeps them current;
+rebuild_daily_sales recomputes them from the payments table.
+
+Functions take the models as arguments so migrations can use them too.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+
+
+def add_to_daily_sales(daily_sales_model, template_id, day, status, count, amount):
+    """Adds ``count`` payments worth ``amount`` (both may be negative) to one rollup row."""
+    rows = daily_sales_model.objects.filter(date=day, template_id=template_id, status=status)
+    if rows.update(count=F('count') + count, amount=F('amount') + amount):
+        return
+    try:
+        with transaction.atomic():
+            daily_sales_model.objects.create(date=day, template_id=template_id, status=status,
+                                             count=count, amount=amount)
+    except IntegrityError:
+        # Another transaction created the row first
+        rows.update(count=F('count') + count, amount=F('amount') + amount)
+
+
+def rebuild_daily_sales(payment_model, daily_sales_model, since=None, batch_size=1000):
+    """Replaces the rollups (from ``since`` on, if given) with totals aggregated from payments."""
+    rollups = daily_sales_model.objects.all()
+    payments = payment_model.objects.all()
+    if since is not None:
+        rollups = rollups.filter(date__gte=since)
+        payments = payments.filter(created_at__date__gte=since)
+    rollups.delete()
+    totals = (
+        payments.annotate(day=TruncDate('created_at')).order_by()
+        .values('day', 'template_id', 'status')
+        .annotate(total_count=Count('id'), total_amount=Sum('amount'))
+    )
+    batch, created = [], 0
+    for row in totals.iterator(chunk_size=batch_size):
+        batch.append(daily_sales_model(date=row['day'], template_id=row['template_id'], status=row['status'],
+                                       count=row['total_count'], amount=row['total_amount']))
+        if len(batch) == batch_size:
+            created += len(daily_sales_model.objects.bulk_create(batch))
+            batch = []
+    created += len(daily_sales_model.objects.bulk_create(batch))
+    return created
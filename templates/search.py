@@ -0,0 +1,118 @@
+import logging
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'templates_template_fts'
+SEARCH_RANK = 'search_rank'
+
+
+class IContainsSearchBackend:
+    """Unindexed substring match on title/description, in insertion order."""
+
+    def search(self, queryset, query):
+        return queryset.filter(Q(title__icontains=query) | Q(description__icontains=query))
+
+    def index_template(self, template):
+        pass
+
+    def remove_template(self, template_id):
+        pass
+
+    def rebuild(self):
+        return 0
+
+
+class PostgresSearchBackend(IContainsSearchBackend):
+    """
+    Matches against the stored ``search_vector`` tsvector column (GIN indexed,
+    generated from title and description by migration 0010) and ranks with
+    SearchRank. The column is maintained by Postgres itself.
+    """
+
+    def search(self, queryset, query):
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVectorField
+        from django.db.models.functions import Cast
+
+        search_query = SearchQuery(query, config='english', search_type='websearch')
+        vector = RawSQL('"templates_template"."search_vector"', [], output_field=SearchVectorField())
+        return queryset.annotate(search_vector=vector).filter(search_vector=search_query).annotate(**{
+            SEARCH_RANK: Cast(SearchRank(vector, search_query), FloatField()),
+        })
+
+
+class SQLiteFTSSearchBackend(IContainsSearchBackend):
+    """
+    Matches against an FTS5 shadow table keyed by template id and ranks with
+    bm25 (title weighted above description). The shadow table is kept in sync
+    by the Template post_save/post_delete signals.
+    """
+
+    def search(self, queryset, query):
+        match = self.match_expression(query)
+        if not match:
+            return queryset.none()
+        # bm25 only exists inside a MATCH query, so the rank is looked up in a scored
+        # hit list; LIMIT -1 stops SQLite flattening that list into the correlated
+        # subquery, so FTS5 scores it once rather than once per row. bm25 is
+        # lower-is-better, negate it so both engines sort by descending rank
+        hits = RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        rank = RawSQL(
+            f'SELECT hit.rank FROM (SELECT rowid AS id, -bm25({FTS_TABLE}, 10.0, 1.0) AS rank '
+            f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s LIMIT -1) AS hit WHERE hit.id = templates_template.id',
+            [match], output_field=FloatField(),
+        )
+        return queryset.filter(pk__in=hits).annotate(**{SEARCH_RANK: rank})
+
+    @staticmethod
+    def match_expression(query):
+        # Quote every term so user input can't inject FTS syntax; prefix-match each
+        terms = re.findall(r'\w+', query)
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def index_template(self, template):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [template.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, description) VALUES (%s, %s, %s)',
+                [template.pk, template.title, template.description],
+            )
+
+    def remove_template(self, template_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [template_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, description) '
+                f'SELECT id, title, description FROM templates_template'
+            )
+            return cursor.rowcount
+
+
+_backend = None
+
+
+def get_search_backend():
+    global _backend
+    if _backend is None:
+        backend_path = getattr(settings, 'TEMPLATE_SEARCH_BACKEND', None)
+        if backend_path:
+            _backend = import_string(backend_path)()
+        elif connection.vendor == 'postgresql':
+            _backend = PostgresSearchBackend()
+        elif connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names():
+            # Migration 0010 only creates the shadow table when SQLite ships FTS5
+            _backend = SQLiteFTSSearchBackend()
+        else:
+            _backend = IContainsSearchBackend()
+        logger.info("Using template search backend %s", type(_backend).__name__)
+    return _backend
@@ -1,18 +1,17 @@
+from django.conf import settings
+from django.db.models import Prefetch
 from rest_framework import serializers
-from .models import Category, Template, Review, Payment, SupportInquiry
-import cloudinary
-from cloudinary import CloudinaryImage
+from .models import Category, Template, TemplateManifest, Review, Payment, SupportInquiry
+from .instrumentation import TimedSerializerMixin
 import logging
-from django.conf import settings
-from cloudinary.utils import cloudinary_url 
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ['id', 'name']
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Review
         fields = ['id', 'template', 'user', 'rating', 'comment', 'date']
@@ -26,62 +25,57 @@ class ReviewSerializer(serializers.ModelSerializer):
 
 logger = logging.getLogger(__name__)
 
-class TemplateSerializer(serializers.ModelSerializer):
+
+def latest_reviews(lookup='reviews'):
+    """
+    Prefetches each template's newest EMBEDDED_REVIEWS reviews into
+    ``latest_reviews``; Django runs a sliced prefetch as one ROW_NUMBER() query.
+    """
+    limit = settings.EMBEDDED_REVIEWS
+    return Prefetch(lookup, queryset=Review.objects.order_by('-date', '-id')[:limit], to_attr='latest_reviews')
+
+
+class TemplateSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
-    reviews = ReviewSerializer(many=True, read_only=True)
+    reviews = serializers.SerializerMethodField()
     average_rating = serializers.SerializerMethodField()
     image = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     additional_images = serializers.SerializerMethodField()
+    additional_images_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Template
         fields = [
-            'id', 'title', 'description', 'category', 'price', 'image',
-            'additional_images', 'features', 'tech_stack', 'reviews',
-            'average_rating', 'live_preview_url', 'zip_file_url'
+            'id', 'title', 'description', 'category', 'price', 'image', 'image_srcset',
+            'additional_images', 'additional_images_srcset', 'features', 'tech_stack', 'reviews',
+            'average_rating', 'review_count', 'live_preview_url', 'zip_file_url'
         ]
+        # Buyers get the archive through a signed download link, never the raw URL
+        extra_kwargs = {'zip_file_url': {'write_only': True}}
+
+    def get_reviews(self, obj):
+        reviews = getattr(obj, 'latest_reviews', None)
+        if reviews is None:
+            limit = settings.EMBEDDED_REVIEWS
+            reviews = obj.reviews.order_by('-date', '-id')[:limit]
+        return ReviewSerializer(reviews, many=True).data
 
     def get_average_rating(self, obj):
-        reviews = obj.reviews.all()
-        if reviews.exists():
-            return round(sum(review.rating for review in reviews) / reviews.count(), 1)
-        return 0
+        return obj.average_rating
 
+    # URL sets are precomputed by Template.save; these only read them back
     def get_image(self, obj):
-        if obj.image:
-            try:
-                public_id = obj.image
-                if not public_id.startswith('templates/'):
-                    logger.warning(f"Invalid public_id format for image: {public_id}. Expected to start with 'templates/'.")
-                    return None
-
-                # Manually construct Cloudinary URL with optimization parameters
-                url = f"https://res.cloudinary.com/{settings.CLOUDINARY_CLOUD_NAME}/image/upload/q_auto,f_auto,w_800,h_600,c_fill/v1/{public_id}"
-                logger.debug(f"Generated Cloudinary URL for image {public_id}: {url}")
-                return url
-            except Exception as e:
-                logger.error(f"Error generating Cloudinary URL for image {obj.image}: {str(e)}")
-                return None
-        return None
+        return obj.image_urls.get('src')
+
+    def get_image_srcset(self, obj):
+        return obj.image_urls.get('srcset')
 
     def get_additional_images(self, obj):
-        if obj.additional_images:
-            try:
-                urls = []
-                for public_id in obj.additional_images:
-                    if not public_id.startswith('templates/'):
-                        logger.warning(f"Invalid public_id format for additional image: {public_id}. Expected to start with 'templates/'.")
-                        continue
-
-                    # Manually construct Cloudinary URL with optimization parameters
-                    url = f"https://res.cloudinary.com/{settings.CLOUDINARY_CLOUD_NAME}/image/upload/q_auto,f_auto,w_800,h_600,c_fill/v1/{public_id}"
-                    logger.debug(f"Generated Cloudinary URL for additional image {public_id}: {url}")
-                    urls.append(url)
-                return urls
-            except Exception as e:
-                logger.error(f"Error generating Cloudinary URLs for additional_images {obj.additional_images}: {str(e)}")
-                return []
-        return []
+        return [urls['src'] for urls in obj.additional_image_urls]
+
+    def get_additional_images_srcset(self, obj):
+        return [urls['srcset'] for urls in obj.additional_image_urls]
 
     def validate_price(self, value):
         if value <= 0:
@@ -110,7 +104,16 @@ class TemplateSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError("Invalid category data. Must provide 'name'.")
         return super().update(instance, validated_data)
 
-class PaymentSerializer(serializers.ModelSerializer):
+class TemplateListSerializer(TemplateSerializer):
+    # Catalog cards only: no embedded reviews, those stay on the detail view
+    class Meta(TemplateSerializer.Meta):
+        fields = [
+            'id', 'title', 'description', 'category', 'price', 'image', 'image_srcset',
+            'additional_images', 'additional_images_srcset', 'features', 'tech_stack',
+            'average_rating', 'review_count', 'live_preview_url'
+        ]
+
+class PaymentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     template = TemplateSerializer(read_only=True)
 
     class Meta:
@@ -131,7 +134,7 @@ class PaymentSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("A valid email is required.")
         return value
 
-class SupportInquirySerializer(serializers.ModelSerializer):
+class SupportInquirySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = SupportInquiry
         fields = [
@@ -160,4 +163,9 @@ class SupportInquirySerializer(serializers.ModelSerializer):
         valid_types = [choice[0] for choice in SupportInquiry.INQUIRY_TYPES]
         if value not in valid_types:
             raise serializers.ValidationError(f"Inquiry type must be one of: {', '.join(valid_types)}.")
-        return value
\ No newline at end of file
+        return value
+
+class TemplateManifestSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TemplateManifest
+        fields = ['template', 'archive_hash', 'size', 'entries', 'built_at']
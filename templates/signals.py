@@ -0,0 +1,66 @@
+from django.db.backends.signals import connection_created
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import CATEGORY_LIST, TEMPLATE_DETAIL, TEMPLATE_LIST, invalidate, template_detail
+from .instrumentation import install_query_wrapper
+from .models import Category, DailySales, Payment, Template, Review
+from .payment_status import publish_status
+from .search import get_search_backend
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_from_aggregates(sender, instance, **kwargs):
+    # Runs inside the deletion transaction, for instance and queryset deletes alike
+    Template.objects.filter(pk=instance.template_id).update(
+        review_count=F('review_count') - 1,
+        rating_sum=F('rating_sum') - instance.rating,
+    )
+
+
+@receiver(post_delete, sender=Payment)
+def remove_payment_from_daily_sales(sender, instance, **kwargs):
+    # Update only: when the template is being deleted, its rollup rows already are
+    DailySales.objects.filter(
+        date=timezone.localdate(instance.created_at), template_id=instance.template_id, status=instance.status,
+    ).update(count=F('count') - 1, amount=F('amount') - instance.amount)
+
+
+@receiver(post_save, sender=Template)
+def index_template_for_search(sender, instance, **kwargs):
+    get_search_backend().index_template(instance)
+
+
+@receiver(post_delete, sender=Template)
+def remove_template_from_search(sender, instance, **kwargs):
+    get_search_backend().remove_template(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Template)
+def invalidate_template_cache(sender, instance, **kwargs):
+    invalidate(TEMPLATE_LIST, template_detail(instance.pk))
+
+
+@receiver([post_save, post_delete], sender=Review)
+def invalidate_review_cache(sender, instance, **kwargs):
+    # Reviews feed the nested detail payload and the list's rating aggregates
+    invalidate(TEMPLATE_LIST, template_detail(instance.template_id))
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category_cache(sender, instance, **kwargs):
+    # Category names are nested in every template payload
+    invalidate(CATEGORY_LIST, TEMPLATE_LIST, TEMPLATE_DETAIL)
+
+
+@receiver(post_save, sender=Payment)
+def publish_payment_status(sender, instance, **kwargs):
+    # After commit, so pollers never see a status that could still roll back
+    transaction.on_commit(lambda: publish_status(instance))
+
+
+# Count and time every query for the request metrics middleware
+connection_created.connect(install_query_wrapper, dispatch_uid='templates.instrument_query')
@@ -0,0 +1,230 @@
+"""
+Local stand-ins for external services, used by the tests and the load/benchmark
+commands. Each runs on a daemon thread bound to 127.0.0.1 on a free port.
+"""
+import json
+import re
+import socketserver
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class CashfreeStubHandler(BaseHTTPRequestHandler):
+    """
+    Answers like Cashfree PG after ``server.delay`` seconds. Scripted
+    ``(status, body, delay)`` tuples in ``server.responses`` are served first.
+    Orders report ``server.order_statuses.get(order_id, 'ACTIVE')``; a None
+    status answers 404, as for an order Cashfree never created.
+    ``server.peak_in_flight`` is the most requests it has held at once.
+    """
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; don't let Nagle hold the body back
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.respond({})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.respond(json.loads(body) if body else {})
+
+    def respond(self, request_body):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.command, self.path, self.client_address))
+            scripted = server.responses.pop(0) if server.responses else None
+            server.in_flight += 1
+            server.peak_in_flight = max(server.peak_in_flight, server.in_flight)
+        status_code, body, delay = scripted or self.default_response(request_body)
+        try:
+            time.sleep(delay)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+        payload = json.dumps(body).encode()
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def default_response(self, request_body):
+        server = self.server
+        if self.command == 'POST' and self.path == '/pg/orders':
+            order_id = request_body.get('order_id', '')
+            return 200, {'order_id': order_id, 'payment_session_id': f'session_{order_id}'}, server.delay
+        if self.command == 'GET' and self.path.startswith('/pg/orders/'):
+            order_id = self.path.rsplit('/', 1)[-1]
+            order_status = server.order_statuses.get(order_id, 'ACTIVE')
+            if order_status is None:
+                return 404, {'message': 'order not found', 'code': 'order_not_found'}, server.delay
+            return 200, {'order_id': order_id, 'order_status': order_status}, server.delay
+        return 404, {'message': 'Not found'}, 0
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CloudinaryStubHandler(BaseHTTPRequestHandler):
+    """
+    Accepts Cloudinary upload API calls (``POST /v1_1/<cloud>/image/upload``)
+    after ``server.delay`` seconds. Point the SDK at it with
+    ``CLOUDINARY_UPLOAD_PREFIX``.
+    """
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        server = self.server
+        with server.lock:
+            server.requests.append((self.command, self.path, len(body)))
+        time.sleep(server.delay)
+        match = re.search(rb'name="folder"\r\n\r\n([^\r]*)', body)
+        folder = match.group(1).decode() if match else ''
+        public_id = f"{folder.rstrip('/') + '/' if folder else ''}{uuid.uuid4().hex[:12]}"
+        payload = json.dumps({
+            'public_id': public_id,
+            'version': 1,
+            'resource_type': 'image',
+            'bytes': len(body),
+            'secure_url': f'https://res.cloudinary.com/stub/image/upload/v1/{public_id}',
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FileStubHandler(BaseHTTPRequestHandler):
+    """Serves ``server.files`` (path -> bytes) with an ETag of the content, like a CDN."""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+    def do_GET(self):
+        self.respond(send_body=True)
+
+    def respond(self, send_body):
+        with self.server.lock:
+            self.server.requests.append((self.command, self.path, 0))
+        body = self.server.files.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/zip')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', f'"{uuid.uuid5(uuid.NAMESPACE_OID, body.hex()).hex}"')
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SMTPStubHandler(socketserver.StreamRequestHandler):
+    """
+    Just enough SMTP (no TLS, no auth) for Django's SMTP backend. Accepted
+    messages are appended to ``server.messages`` as ``(sender, recipients, data)``;
+    each DATA reply waits ``server.delay`` seconds.
+    """
+    disable_nagle_algorithm = True
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self.reply('220 stub ESMTP')
+        sender, recipients = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode(errors='replace').strip()
+            verb = command[:4].upper()
+            if verb in ('HELO', 'EHLO'):
+                self.reply('250 stub')
+            elif verb == 'MAIL':
+                sender, recipients = command.partition(':')[2].strip(' <>'), []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                recipients.append(command.partition(':')[2].strip(' <>'))
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                for data_line in self.rfile:
+                    if data_line in (b'.\r\n', b'.\n'):
+                        break
+                    data.append(data_line)
+                time.sleep(self.server.delay)
+                with self.server.lock:
+                    self.server.messages.append((sender, recipients, b''.join(data)))
+                self.reply('250 OK queued')
+            elif verb in ('RSET', 'NOOP'):
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class ThreadingSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def start_smtp_stub(delay=0):
+    """Starts the SMTP stub; stop it with ``stop_stub_server``."""
+    server = ThreadingSMTPServer(('127.0.0.1', 0), SMTPStubHandler)
+    server.lock = threading.Lock()
+    server.messages = []
+    server.delay = delay
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.host, server.port = server.server_address
+    return server
+
+
+class StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients that time out hang up before the delayed answer goes out
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+
+def start_stub_server(handler_class, **attributes):
+    """Starts ``handler_class`` on a free port; stop it with ``stop_stub_server``."""
+    server = StubHTTPServer(('127.0.0.1', 0), handler_class)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.responses = []
+    server.delay = 0
+    server.order_statuses = {}
+    server.files = {}
+    server.in_flight = server.peak_in_flight = 0
+    for name, value in attributes.items():
+        setattr(server, name, value)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server.url = f'http://127.0.0.1:{server.server_port}'
+    return server
+
+
+def stop_stub_server(server):
+    server.shutdown()
+    server.server_close()
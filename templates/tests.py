@@ -1,3 +1,1616 @@
-from django.test import TestCase
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import mmap
+import multiprocessing
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+
+import cloudinary
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections, transaction
+from django.db.models import Sum
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.utils.datastructures import MultiValueDict
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from backend.logconfig import AsyncQueueHandler, JsonFormatter
+from backend.routers import unpinned, use_primary
+
+from .forms import TemplateAdminForm
+from .ids import LENGTH, MAX_WORKER, SEQUENCE_BITS, IdGenerator, new_id, new_inquiry_id, new_order_id
+from .stubs import CashfreeStubHandler, CloudinaryStubHandler, FileStubHandler, start_smtp_stub, start_stub_server, stop_stub_server
+from .uploads import upload_images, upload_to_cloudinary
+from .cashfree import (
+    AsyncCashfreeClient, CashfreeAPIError, CashfreeClient, CashfreeUnavailable, CircuitBreaker, reset_clients,
+    resolve_base_url,
+)
+from .models import Category, DailySales, Template, TemplateManifest, Review, Payment, SupportInquiry, OutboundEmail, WebhookEvent
+from .payment_status import get_payment_status
+from .outbox import enqueue_email
+from .downloads import download_url
+from .manifests import ManifestError, build_manifest
+from .reconcile import RateLimiter
+from .webhooks import apply_payment_status, process_pending_events
+from .search import get_search_backend
+from .throttling import LocalBuckets, get_bucket_store, parse_rate, take_token
+from .serializers import latest_reviews
+
+
+def make_template(category, title='Landing Page', price='499.00', **kwargs):
+    return Template.objects.create(
+        title=title,
+        description=kwargs.pop('description', 'A responsive landing page template'),
+        category=category,
+        price=Decimal(price),
+        **kwargs
+    )
+
+
+class CatalogTestCase(TestCase):
+    def setUp(self):
+        # Cached catalog responses and throttle buckets must not leak between tests
+        cache.clear()
+        get_bucket_store().clear()
+
+
+class TemplateListTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Business')
+        self.templates = [make_template(self.category, title=f'Template {i}') for i in range(5)]
+        Review.objects.create(template=self.templates[0], user='alice', rating=4, comment='Nice')
+
+    def test_list_is_cursor_paginated_without_reviews(self):
+        response = self.client.get('/api/templates/', {'page_size': 2})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+        self.assertNotIn('reviews', response.data['results'][0])
+        self.assertEqual(response.data['results'][0]['id'], self.templates[-1].id)
+
+    def test_list_pages_cover_all_templates_once(self):
+        seen = []
+        url, params = '/api/templates/', {'page_size': 2}
+        while url:
+            response = self.client.get(url, params)
+            seen.extend(item['id'] for item in response.data['results'])
+            url, params = response.data['next'], None
+        self.assertEqual(sorted(seen), sorted(t.id for t in self.templates))
+
+    @override_settings(LIST_PAGE_SIZE=2, LIST_MAX_PAGE_SIZE=3)
+    def test_page_sizes_follow_settings(self):
+        self.assertEqual(len(self.client.get('/api/templates/').data['results']), 2)
+        self.assertEqual(len(self.client.get('/api/templates/', {'page_size': 5}).data['results']), 3)
+
+    def test_detail_keeps_nested_reviews(self):
+        response = self.client.get(f'/api/templates/{self.templates[0].id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['reviews']), 1)
+        self.assertEqual(response.data['average_rating'], 4)
+
+
+
+@override_settings(EMBEDDED_REVIEWS=3)
+class TemplateReviewPageTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        category = Category.objects.create(name='Business')
+        self.templates = [make_template(category, title=f'Template {i}') for i in range(3)]
+        Review.objects.bulk_create([
+            Review(template=template, user=f'user{i}', rating=5, comment=f'Review {i}')
+            for template in self.templates for i in range(7)
+        ])
+        self.template = self.templates[0]
+
+    def test_detail_embeds_only_the_latest_reviews(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/templates/{self.template.id}/')
+        newest = Review.objects.filter(template=self.template).order_by('-date', '-id')[:3]
+        self.assertEqual([review['id'] for review in response.data['reviews']], [review.id for review in newest])
+
+    def test_latest_reviews_load_in_one_query_for_many_templates(self):
+        with self.assertNumQueries(2):
+            templates = list(Template.objects.prefetch_related(latest_reviews()))
+        self.assertEqual([len(template.latest_reviews) for template in templates], [3, 3, 3])
+
+    def test_reviews_endpoint_pages_through_every_review(self):
+        seen = []
+        url, params = f'/api/templates/{self.template.id}/reviews/', {'page_size': 3}
+        while url:
+            response = self.client.get(url, params)
+            self.assertLessEqual(len(response.data['results']), 3)
+            seen.extend(review['id'] for review in response.data['results'])
+            url, params = response.data['next'], None
+        expected = Review.objects.filter(template=self.template).order_by('-date', '-id')
+        self.assertEqual(seen, [review.id for review in expected])
+
+    def test_reviews_endpoint_for_missing_template(self):
+        self.assertEqual(self.client.get('/api/templates/999/reviews/').status_code, 404)
+
+class RatingAggregateTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.category = Category.objects.create(name='Portfolio')
+        self.template = make_template(self.category)
+
+    def test_aggregates_follow_create_edit_and_delete(self):
+        first = Review.objects.create(template=self.template, user='alice', rating=5, comment='Great')
+        Review.objects.create(template=self.template, user='bob', rating=2, comment='Meh')
+        self.template.refresh_from_db()
+        self.assertEqual((self.template.review_count, self.template.rating_sum), (2, 7))
+        self.assertEqual(self.template.average_rating, 3.5)
+
+        first.rating = 3
+        first.save()
+        self.template.refresh_from_db()
+        self.assertEqual((self.template.review_count, self.template.rating_sum), (2, 5))
+
+        first.delete()
+        Review.objects.filter(template=self.template).delete()
+        self.template.refresh_from_db()
+        self.assertEqual((self.template.review_count, self.template.rating_sum), (0, 0))
+        self.assertEqual(self.template.average_rating, 0)
+
+    def test_moving_review_updates_both_templates(self):
+        other = make_template(self.category, title='Other')
+        review = Review.objects.create(template=self.template, user='alice', rating=4, comment='Good')
+        review.template = other
+        review.save()
+        self.template.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((self.template.review_count, self.template.rating_sum), (0, 0))
+        self.assertEqual((other.review_count, other.rating_sum), (1, 4))
+
+    def test_rebuild_command_repairs_drift(self):
+        Review.objects.bulk_create([
+            Review(template=self.template, user='alice', rating=5, comment='Great'),
+            Review(template=self.template, user='bob', rating=4, comment='Good'),
+        ])
+        call_command('rebuild_rating_aggregates', stdout=StringIO())
+        self.template.refresh_from_db()
+        self.assertEqual((self.template.review_count, self.template.rating_sum), (2, 9))
+
+    def test_list_needs_no_per_template_rating_queries(self):
+        for i in range(10):
+            template = make_template(self.category, title=f'Bulk {i}')
+            Review.objects.create(template=template, user='alice', rating=4, comment='Good')
+        client = APIClient()
+        with CaptureQueriesContext(connection) as small:
+            client.get('/api/templates/', {'page_size': 2})
+        with CaptureQueriesContext(connection) as large:
+            client.get('/api/templates/', {'page_size': 10})
+        self.assertEqual(len(small), len(large))
+
+
+class TemplateSearchTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Business')
+        self.dashboard = make_template(self.category, title='Analytics Dashboard', description='Charts and tables')
+        self.mention = make_template(self.category, title='Agency Site', description='Includes a small dashboard page')
+        make_template(self.category, title='Wedding Invite', description='Elegant RSVP template')
+
+    def search_ids(self, query):
+        response = self.client.get('/api/templates/', {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data['results']]
+
+    def test_results_are_ranked_by_relevance(self):
+        self.assertEqual(self.search_ids('dashboard'), [self.dashboard.id, self.mention.id])
+
+    def test_index_follows_edits_and_deletes(self):
+        self.dashboard.title = 'Admin Panel'
+        self.dashboard.description = 'Charts and tables'
+        self.dashboard.save()
+        self.assertEqual(self.search_ids('dashboard'), [self.mention.id])
+        self.mention.delete()
+        self.assertEqual(self.search_ids('dashboard'), [])
+
+    def test_query_syntax_is_not_interpreted(self):
+        self.assertEqual(self.search_ids('dashboard"*) ('), [self.dashboard.id, self.mention.id])
+
+    def test_ranked_results_page_with_cursor(self):
+        response = self.client.get('/api/templates/', {'search': 'dashboard', 'page_size': 1})
+        first = [item['id'] for item in response.data['results']]
+        response = self.client.get(response.data['next'])
+        second = [item['id'] for item in response.data['results']]
+        self.assertEqual(first + second, [self.dashboard.id, self.mention.id])
+        self.assertIsNone(response.data['next'])
+
+
+class CatalogCacheTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Business')
+        self.template = make_template(self.category)
+
+    def test_repeat_reads_are_served_from_cache(self):
+        first = self.client.get(f'/api/templates/{self.template.id}/')
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(f'/api/templates/{self.template.id}/')
+        self.assertEqual((first['X-Cache'], second['X-Cache']), ('MISS', 'HIT'))
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(len(queries), 0)
+
+    def test_query_params_are_part_of_the_key(self):
+        self.client.get('/api/templates/')
+        self.assertEqual(self.client.get('/api/templates/', {'page_size': 1})['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get('/api/templates/', {'page_size': 1})['X-Cache'], 'HIT')
+
+    def test_review_write_invalidates_only_its_template(self):
+        other = make_template(self.category, title='Other')
+        self.client.get(f'/api/templates/{self.template.id}/')
+        self.client.get(f'/api/templates/{other.id}/')
+        Review.objects.create(template=self.template, user='alice', rating=5, comment='Great')
+        response = self.client.get(f'/api/templates/{self.template.id}/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['review_count'], 1)
+        self.assertEqual(self.client.get(f'/api/templates/{other.id}/')['X-Cache'], 'HIT')
+
+    def test_category_rename_invalidates_nested_payloads(self):
+        self.client.get('/api/categories/')
+        self.client.get('/api/templates/')
+        self.category.name = 'Agency'
+        self.category.save()
+        categories = self.client.get('/api/categories/')
+        templates = self.client.get('/api/templates/')
+        self.assertEqual(categories.data[0]['name'], 'Agency')
+        self.assertEqual(templates.data['results'][0]['category']['name'], 'Agency')
+
+    def test_stats_endpoint_reports_hits_and_misses(self):
+        self.client.get('/api/categories/')
+        self.client.get('/api/categories/')
+        self.assertEqual(self.client.get('/api/cache-stats/').status_code, 403)
+        admin = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass')
+        self.client.force_authenticate(admin)
+        stats = self.client.get('/api/cache-stats/').data
+        self.assertGreaterEqual(stats['category-list']['hits'], 1)
+        self.assertGreaterEqual(stats['category-list']['misses'], 1)
+
+
+def post_webhook(client, event_type, order_id, secret='test-secret', payment_id='cf_1', signature=None, path='/api/webhook/'):
+    body = json.dumps({
+        'type': event_type,
+        'data': {'order': {'order_id': order_id}, 'payment': {'cf_payment_id': payment_id}},
+    }).encode()
+    timestamp = str(int(time.time() * 1000))
+    if signature is None:
+        digest = hmac.new(secret.encode(), timestamp.encode() + body, hashlib.sha256).digest()
+        signature = base64.b64encode(digest).decode()
+    return client.post(path, body, content_type='application/json',
+                       headers={'x-webhook-timestamp': timestamp, 'x-webhook-signature': signature})
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionRefusedError('SMTP server unavailable')
+
+
+class EmailOutboxTests(TestCase):
+    def setUp(self):
+        get_bucket_store().clear()
+        self.client = APIClient()
+        category = Category.objects.create(name='Business')
+        self.template = make_template(category, zip_file_url='https://example.com/landing.zip')
+        self.payment = Payment.objects.create(
+            template=self.template, order_id='order_1', user_email='buyer@example.com', amount=Decimal('499.00')
+        )
+
+    def run_worker(self, **options):
+        call_command('run_email_worker', once=True, stdout=StringIO(), **options)
+
+    @override_settings(CASHFREE_SECRET_KEY='test-secret', WEBHOOK_PROCESS_IN_BACKGROUND=False)
+    def test_webhook_queues_email_instead_of_sending(self):
+        response = post_webhook(self.client, 'PAYMENT_SUCCESS_WEBHOOK', 'order_1')
+        self.assertEqual(response.status_code, 200)
+        call_command('process_webhook_events', once=True, grace=0, stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboundEmail.objects.get()
+        self.assertEqual((email.status, email.to), ('PENDING', ['buyer@example.com']))
+
+        self.run_worker()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('/api/downloads/', mail.outbox[0].body)
+        self.assertNotIn('https://example.com/landing.zip', mail.outbox[0].body)
+        self.assertEqual(OutboundEmail.objects.get().status, 'SENT')
+
+    def test_support_inquiry_queues_both_emails(self):
+        response = self.client.post('/api/support/', {
+            'email': 'buyer@example.com', 'inquiry_type': 'GENERAL', 'description': 'Where is my download link?',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(OutboundEmail.objects.filter(status='PENDING').count(), 2)
+        self.assertEqual(len(mail.outbox), 0)
+
+    @override_settings(EMAIL_BACKEND='templates.tests.FailingEmailBackend')
+    def test_failures_back_off_then_give_up(self):
+        email = OutboundEmail.objects.create(subject='Hi', body='Body', from_email='a@example.com', to=['b@example.com'])
+        self.run_worker(max_attempts=2, base_delay=60)
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('PENDING', 1))
+        self.assertGreater(email.next_attempt_at, timezone.now())
+        self.assertIn('SMTP server unavailable', email.last_error)
+
+        OutboundEmail.objects.update(next_attempt_at=timezone.now())
+        self.run_worker(max_attempts=2, base_delay=60)
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('FAILED', 2))
+
+
+class CashfreeClientTests(TestCase):
+    def setUp(self):
+        get_bucket_store().clear()
+        self.server = start_stub_server(CashfreeStubHandler)
+        self.addCleanup(stop_stub_server, self.server)
+        self.base_url = self.server.url
+
+    def make_client(self, **kwargs):
+        kwargs.setdefault('read_timeout', 1.0)
+        return CashfreeClient(self.base_url, 'app', 'secret', **kwargs)
+
+    def test_calls_reuse_one_keep_alive_connection(self):
+        self.server.responses = [(200, {'payment_session_id': f'session_{i}'}, 0) for i in range(3)]
+        client = self.make_client()
+        sessions = [client.create_order({'order_id': f'o{i}'})['payment_session_id'] for i in range(3)]
+        self.assertEqual(sessions, ['session_0', 'session_1', 'session_2'])
+        self.assertEqual(len({address for _, _, address in self.server.requests}), 1)
+        self.assertEqual(client.stats.snapshot()['create_order']['count'], 3)
+
+    def test_gets_are_retried_but_posts_are_not(self):
+        self.server.responses = [(503, {}, 0), (200, {'order_status': 'PAID'}, 0)]
+        self.assertEqual(self.make_client().get_order('o1'), {'order_status': 'PAID'})
+        self.assertEqual(len(self.server.requests), 2)
+
+        self.server.requests.clear()
+        self.server.responses = [(503, {'message': 'busy'}, 0), (200, {}, 0)]
+        with self.assertRaises(CashfreeAPIError) as raised:
+            self.make_client().create_order({'order_id': 'o2'})
+        self.assertEqual(raised.exception.status_code, 503)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_read_timeout_is_bounded(self):
+        self.server.responses = [(200, {}, 2.0)]
+        start = time.perf_counter()
+        with self.assertRaises(CashfreeUnavailable):
+            self.make_client(read_timeout=0.1, max_retries=0).create_order({'order_id': 'o1'})
+        self.assertEqual(len(self.server.requests), 1)
+        # Generous on a loaded runner, but well short of the stub's answer
+        self.assertLess(time.perf_counter() - start, 1.0)
+
+    def test_circuit_opens_and_fails_fast(self):
+        now = [0.0]
+        client = self.make_client(breaker=CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=lambda: now[0]))
+        self.server.responses = [(500, {}, 0), (500, {}, 0)]
+        for _ in range(2):
+            with self.assertRaises(CashfreeAPIError):
+                client.create_order({'order_id': 'o1'})
+        with self.assertRaises(CashfreeUnavailable):
+            client.create_order({'order_id': 'o1'})
+        self.assertEqual(len(self.server.requests), 2)
+
+        now[0] = 31.0
+        self.server.responses = [(200, {'payment_session_id': 'ok'}, 0)]
+        self.assertEqual(client.create_order({'order_id': 'o1'}), {'payment_session_id': 'ok'})
+
+    @override_settings(CASHFREE_APP_ID='app', CASHFREE_SECRET_KEY='secret')
+    def test_initiate_payment_uses_client(self):
+        template = make_template(Category.objects.create(name='Business'))
+        self.server.responses = [(200, {'payment_session_id': 'session_1'}, 0)]
+        with mock.patch('templates.views.get_cashfree_client', return_value=self.make_client()):
+            response = APIClient().post(f'/api/templates/{template.id}/initiate-payment/', {'email': 'buyer@example.com'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['payment_session_id'], 'session_1')
+        self.assertEqual(Payment.objects.get().status, 'PENDING')
+
+
+@override_settings(CASHFREE_SECRET_KEY='test-secret', WEBHOOK_PROCESS_IN_BACKGROUND=False)
+class PaymentWebhookTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        template = make_template(Category.objects.create(name='Business'))
+        self.payment = Payment.objects.create(
+            template=template, order_id='order_1', user_email='buyer@example.com', amount=Decimal('499.00')
+        )
+
+    def process(self):
+        call_command('process_webhook_events', once=True, grace=0, stdout=StringIO())
+        self.payment.refresh_from_db()
+
+    def test_unsigned_or_forged_deliveries_are_rejected(self):
+        self.assertEqual(post_webhook(self.client, 'PAYMENT_SUCCESS_WEBHOOK', 'order_1', signature='').status_code, 401)
+        self.assertEqual(post_webhook(self.client, 'PAYMENT_SUCCESS_WEBHOOK', 'order_1', secret='wrong').status_code, 401)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_ack_records_event_and_defers_processing(self):
+        response = post_webhook(self.client, 'PAYMENT_SUCCESS_WEBHOOK', 'order_1')
+        self.assertEqual(response.data, {'status': 'received'})
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, 'PENDING')
+
+        self.process()
+        self.assertEqual(self.payment.status, 'SUCCESS')
+        self.assertEqual(WebhookEvent.objects.get().status, 'PROCESSED')
+        self.assertEqual(OutboundEmail.objects.count(), 1)
+
+    def test_redelivery_is_a_single_insert(self):
+        post_webhook(self.client, 'PAYMENT_SUCCESS_WEBHOOK', 'order_1')
+        with CaptureQueriesContext(connection) as queries:
+            response = post_webhook(self.client, 'PAYMENT_SUCCESS_WEBHOOK', 'order_1')
+        self.assertEqual(response.data, {'status': 'duplicate'})
+        self.assertEqual(len([q for q in queries if q['sql'].startswith('INSERT')]), 1)
+        self.assertEqual(len([q for q in queries if q['sql'].startswith('SELECT')]), 0)
+        self.process()
+        self.assertEqual(OutboundEmail.objects.count(), 1)
+
+    @override_settings(WEBHOOK_MAX_ATTEMPTS=2)
+    def test_failing_events_back_off_then_fail(self):
+        for i in range(5):
+            post_webhook(self.client, 'PAYMENT_SUCCESS_WEBHOOK', 'order_1', payment_id=f'cf_{i}')
+        with mock.patch('templates.webhooks.apply_payment_status', side_effect=RuntimeError('boom')):
+            # More failing events than the batch size: one pass over each, then --once exits
+            call_command('process_webhook_events', once=True, grace=0, batch_size=2, stdout=StringIO())
+            self.assertEqual(set(WebhookEvent.objects.values_list('status', 'attempts')), {('RECEIVED', 1)})
+            self.assertTrue(all(event.next_attempt_at > timezone.now() for event in WebhookEvent.objects.all()))
+            self.assertEqual(process_pending_events(timezone.timedelta(0)), 0)
+
+            WebhookEvent.objects.update(next_attempt_at=timezone.now())
+            self.process()
+        self.assertEqual(set(WebhookEvent.objects.values_list('status', 'attempts', 'last_error')),
+                         {('FAILED', 2, 'boom')})
+        self.assertEqual(self.payment.status, 'PENDING')
+
+    def test_late_failure_does_not_downgrade_success(self):
+        post_webhook(self.client, 'PAYMENT_SUCCESS_WEBHOOK', 'order_1')
+        post_webhook(self.client, 'PAYMENT_FAILED_WEBHOOK', 'order_1', payment_id='cf_2')
+        self.process()
+        self.assertEqual(self.payment.status, 'SUCCESS')
+
+
+@override_settings(CASHFREE_APP_ID='app', CASHFREE_SECRET_KEY='test-secret', WEBHOOK_PROCESS_IN_BACKGROUND=False)
+class AsyncGatewayViewTests(TestCase):
+    def setUp(self):
+        get_bucket_store().clear()
+        self.server = start_stub_server(CashfreeStubHandler)
+        self.addCleanup(stop_stub_server, self.server)
+        self.template = make_template(Category.objects.create(name='Business'))
+
+    def gateway(self):
+        return mock.patch('templates.async_views.get_async_cashfree_client',
+                          side_effect=lambda: AsyncCashfreeClient(self.server.url, 'app', 'secret', read_timeout=1.0))
+
+    async def initiate(self, data):
+        with self.gateway():
+            return await AsyncClient().post(f'/api/async/templates/{self.template.id}/initiate-payment/', data,
+                                            content_type='application/json')
+
+    async def test_initiate_payment_creates_session(self):
+        response = await self.initiate({'email': 'buyer@example.com'})
+        self.assertEqual(response.status_code, 200)
+        payment = await Payment.objects.aget()
+        self.assertEqual(response.json(), {'payment_session_id': f'session_{payment.order_id}', 'order_id': payment.order_id})
+        self.assertEqual(payment.status, 'PENDING')
+
+    async def test_gateway_rejection_fails_the_payment(self):
+        self.server.responses = [(400, {'message': 'bad phone'}, 0)]
+        response = await self.initiate({'email': 'buyer@example.com', 'phone': 'x'})
+        self.assertEqual((response.status_code, response.json()['cashfree_error']), (400, 'bad phone'))
+        self.assertEqual((await Payment.objects.aget()).status, 'FAILED')
+
+    async def test_invalid_email_is_rejected_before_the_gateway(self):
+        response = await self.initiate({'email': 'nope'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.server.requests, [])
+
+    async def test_json_body_must_be_an_object(self):
+        for body in ('[]', '"x"', '1', '{'):
+            response = await self.initiate(body)
+            self.assertEqual(response.status_code, 400, body)
+        self.assertFalse(await Payment.objects.aexists())
+
+    async def test_webhook_and_payment_detail(self):
+        await Payment.objects.acreate(template=self.template, order_id='order_1', user_email='buyer@example.com',
+                                      amount=Decimal('499.00'))
+        client = AsyncClient()
+        response = await post_webhook(client, 'PAYMENT_SUCCESS_WEBHOOK', 'order_1', path='/api/async/webhook/')
+        self.assertEqual(response.json(), {'status': 'received'})
+        response = await post_webhook(client, 'PAYMENT_SUCCESS_WEBHOOK', 'order_1', path='/api/async/webhook/')
+        self.assertEqual(response.json(), {'status': 'duplicate'})
+        self.assertEqual((await post_webhook(client, 'PAYMENT_SUCCESS_WEBHOOK', 'order_1', secret='wrong',
+                                             path='/api/async/webhook/')).status_code, 401)
+
+        response = await client.get('/api/async/payments/order_1/')
+        self.assertEqual(response.json()['template']['title'], 'Landing Page')
+        self.assertEqual(response.json()['status'], 'PENDING')
+        self.assertEqual((await client.get('/api/async/payments/missing/')).status_code, 404)
+
+
+class GatewayLoadTests(TransactionTestCase):
+    def test_async_path_overlaps_gateway_waits(self):
+        out = StringIO()
+        call_command('loadtest_gateway', requests=8, delay=0.25, json=True, stdout=out)
+        results = json.loads(out.getvalue())
+        self.assertEqual(results['wsgi']['statuses'], {'200': 8})
+        self.assertEqual(results['asgi']['statuses'], {'200': 8})
+        # One blocking worker waits on the gateway once at a time; the event loop doesn't
+        self.assertEqual(results['wsgi']['peak_in_flight'], 1)
+        self.assertGreater(results['asgi']['peak_in_flight'], 1)
+
+
+@override_settings(CLOUDINARY_CLOUD_NAME='demo', TEMPLATE_IMAGE_WIDTHS=[400, 800])
+class TemplateImageUrlTests(CatalogTestCase):
+    def test_url_sets_are_built_on_save_and_served_as_stored(self):
+        template = make_template(
+            Category.objects.create(name='Business'),
+            image='templates/hero',
+            additional_images=['templates/shot1', 'elsewhere/shot2'],
+        )
+        base = 'https://res.cloudinary.com/demo/image/upload/q_auto,f_auto'
+        self.assertEqual(template.image_urls, {
+            'src': f'{base},w_800,h_600,c_fill/v1/templates/hero',
+            'srcset': f'{base},w_400,h_300,c_fill/v1/templates/hero 400w, '
+                      f'{base},w_800,h_600,c_fill/v1/templates/hero 800w',
+        })
+        self.assertEqual(len(template.additional_image_urls), 1)
+
+        data = APIClient().get(f'/api/templates/{template.id}/').data
+        self.assertEqual(data['image'], template.image_urls['src'])
+        self.assertEqual(data['image_srcset'], template.image_urls['srcset'])
+        self.assertEqual(data['additional_images'], [f'{base},w_800,h_600,c_fill/v1/templates/shot1'])
+
+    def test_partial_save_refreshes_urls(self):
+        template = make_template(Category.objects.create(name='Business'))
+        self.assertEqual(template.image_urls, {})
+        template.image = 'templates/hero'
+        template.save(update_fields=['image'])
+        template.refresh_from_db()
+        self.assertIn('templates/hero', template.image_urls['src'])
+
+
+    def test_missing_cloud_name_keeps_stored_urls(self):
+        template = make_template(Category.objects.create(name='Business'), image='templates/hero')
+        stored = template.image_urls
+        with override_settings(CLOUDINARY_CLOUD_NAME=''):
+            template.image = 'templates/other'
+            template.save(update_fields=['image'])
+            with self.assertRaises(CommandError):
+                call_command('rebuild_image_urls', stdout=StringIO())
+        template.refresh_from_db()
+        self.assertEqual(template.image_urls, stored)
+        self.assertNotIn('cloudinary.com//', json.dumps(template.image_urls))
+
+    def test_rebuild_invalidates_cached_catalog(self):
+        template = make_template(Category.objects.create(name='Business'), image='templates/hero')
+        client = APIClient()
+        self.assertIn('/demo/', client.get(f'/api/templates/{template.id}/').data['image'])
+        with override_settings(CLOUDINARY_CLOUD_NAME='other'):
+            call_command('rebuild_image_urls', stdout=StringIO())
+            self.assertIn('/other/', client.get(f'/api/templates/{template.id}/').data['image'])
+            self.assertIn('/other/', client.get('/api/templates/').data['results'][0]['image'])
+
+
+def slow_upload(file, timeout, latency=0.2):
+    # Stands in for a Cloudinary round trip
+    time.sleep(latency)
+    if file.name.startswith('broken'):
+        raise ValueError('Invalid image file')
+    return f'templates/{file.name}'
+
+
+class ParallelUploadTests(TestCase):
+    def screenshots(self, count, prefix='shot'):
+        return [SimpleUploadedFile(f'{prefix}{i}.png', b'png') for i in range(count)]
+
+    def form_data(self):
+        category = Category.objects.create(name='Business')
+        return {'title': 'Landing', 'description': 'Landing page', 'category': category.id, 'price': '499.00',
+                'features': '["Responsive"]', 'tech_stack': '["React"]', 'additional_images': '["templates/old"]'}
+
+    def test_uploads_run_concurrently(self):
+        files = self.screenshots(8)
+        # Every upload waits until all eight are running, so a sequential pool would time out
+        barrier = threading.Barrier(len(files), timeout=5)
+
+        def upload(file, timeout):
+            barrier.wait()
+            return slow_upload(file, timeout, latency=0)
+
+        results = upload_images(files, upload=upload, max_workers=8, timeout=10)
+        self.assertEqual(results, [(f'templates/shot{i}.png', None) for i in range(8)])
+
+    def test_slow_files_time_out_without_blocking_the_rest(self):
+        upload = lambda file, timeout: slow_upload(file, timeout, latency=1.0 if file.name == 'shot0.png' else 0)
+        results = upload_images(self.screenshots(3), upload=upload, max_workers=3, timeout=0.2)
+        self.assertIn('timed out', results[0][1])
+        self.assertEqual([public_id for public_id, _ in results[1:]], ['templates/shot1.png', 'templates/shot2.png'])
+
+    def test_admin_form_reports_partial_failures(self):
+        data = self.form_data()
+        files = MultiValueDict({
+            'image_upload': [SimpleUploadedFile('hero.png', b'png')],
+            'additional_images_upload': self.screenshots(2) + self.screenshots(1, prefix='broken'),
+        })
+        with mock.patch('templates.uploads.upload_to_cloudinary', side_effect=slow_upload), \
+                mock.patch('templates.uploads.destroy_from_cloudinary') as destroy:
+            form = TemplateAdminForm(data=data, files=files)
+            self.assertFalse(form.is_valid())
+        # The rejected form keeps nothing, so the successful uploads are removed again
+        self.assertEqual(sorted(call.args[0] for call in destroy.call_args_list),
+                         ['templates/hero.png', 'templates/shot0.png', 'templates/shot1.png'])
+        self.assertNotEqual(form.cleaned_data.get('image'), 'templates/hero.png')
+        self.assertIn('1 of 4 images failed to upload, so none were kept', form.non_field_errors()[0])
+        self.assertIn('1 of 3 additional images failed to upload', form.errors['additional_images_upload'][0])
+        self.assertIn('broken0.png: Invalid image file', form.errors['additional_images_upload'][1])
+
+    def test_admin_form_stores_uploaded_ids(self):
+        data = self.form_data()
+        files = MultiValueDict({'additional_images_upload': self.screenshots(2)})
+        with mock.patch('templates.uploads.upload_to_cloudinary', side_effect=slow_upload):
+            form = TemplateAdminForm(data=data, files=files)
+            self.assertTrue(form.is_valid(), form.errors)
+        template = form.save()
+        self.assertEqual(template.additional_images, ['templates/shot0.png', 'templates/shot1.png'])
+
+
+class BlockedHandler(logging.Handler):
+    """A sink that writes nothing until ``unblocked`` is set."""
+
+    def __init__(self):
+        super().__init__()
+        self.unblocked = threading.Event()
+        self.records = []
+
+    def emit(self, record):
+        self.unblocked.wait(timeout=10)
+        self.records.append(self.format(record))
+
+
+class LoggingPipelineTests(TestCase):
+    def make_logger(self, handler):
+        logger = logging.getLogger(f'templates.tests.pipeline.{id(handler)}')
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+        return logger
+
+    def test_json_lines_with_lazy_args_and_extras(self):
+        record = logging.makeLogRecord({
+            'name': 'templates.views', 'levelname': 'INFO', 'msg': 'Payment created: order_id=%s',
+            'args': ('order_1',), 'duration_ms': 12.5,
+        })
+        line = json.loads(JsonFormatter().format(record))
+        self.assertEqual(line['msg'], 'Payment created: order_id=order_1')
+        self.assertEqual(line['logger'], 'templates.views')
+        self.assertEqual(line['duration_ms'], 12.5)
+
+    def test_slow_sink_does_not_block_the_caller(self):
+        handler = AsyncQueueHandler(console=False)
+        sink = BlockedHandler()
+        sink.setFormatter(JsonFormatter())
+        handler.stop_listener()
+        handler.targets = [sink]
+        handler.start_listener()
+        logger = self.make_logger(handler)
+
+        for i in range(10):
+            logger.info("request %s handled", i)
+        # Every call returned while the sink is still stuck on the first record
+        self.assertEqual(sink.records, [])
+
+        sink.unblocked.set()
+        handler.stop_listener()
+        self.assertEqual([json.loads(line)['msg'] for line in sink.records], [f'request {i} handled' for i in range(10)])
+
+    def test_file_sink_rotates(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = f'{directory}/app.log'
+            handler = AsyncQueueHandler(filename=path, max_bytes=200, backup_count=2, console=False)
+            logger = self.make_logger(handler)
+            for i in range(20):
+                logger.info("line %s", i)
+            handler.stop_listener()
+            handler.targets[0].close()
+            with open(path) as f:
+                last = [json.loads(line)['msg'] for line in f]
+            self.assertEqual(last[-1], 'line 19')
+            with open(f'{path}.1') as f:
+                self.assertTrue(f.readline())
+
+    def test_restarts_after_fork_register_one_exit_hook(self):
+        with mock.patch('backend.logconfig.atexit.register') as register:
+            handler = AsyncQueueHandler(console=False)
+            logger = self.make_logger(handler)
+            for _ in range(3):
+                # As in a freshly forked worker: no listener thread, and the first record starts one
+                handler.stop_listener()
+                handler.pid = -1
+                logger.info("worker started")
+        self.assertEqual(register.call_count, 1)
+        handler.stop_listener()
+        handler.stop_listener()
+        self.assertFalse(handler.listening)
+
+
+class StartupTests(TestCase):
+    def test_settings_import_is_quiet_and_lazy_without_credentials(self):
+        env = {key: value for key, value in os.environ.items()
+               if not key.startswith(('CASHFREE_', 'CLOUDINARY_'))}
+        code = "import sys, backend.settings; print(sorted(m for m in sys.modules if m.startswith('cloudinary')))"
+        result = subprocess.run([sys.executable, '-c', code], cwd=settings.BASE_DIR, env=env,
+                                capture_output=True, text=True)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout, '[]\n')
+
+    def test_benchmark_enforces_budget(self):
+        out = StringIO()
+        call_command('benchmark_startup', repeat=1, top=3, budget_ms=500, stdout=out)
+        self.assertIn('Startup within budget.', out.getvalue())
+        with self.assertRaisesMessage(CommandError, 'backend.settings import took'):
+            call_command('benchmark_startup', repeat=1, budget_ms=0.01, stdout=StringIO())
+
+    def test_cashfree_base_url_resolves_on_first_use(self):
+        with override_settings(CASHFREE_BASE_URL='', CASHFREE_ENV=' Sandbox '):
+            self.assertEqual(resolve_base_url(), 'https://sandbox.cashfree.com')
+        with override_settings(CASHFREE_BASE_URL='', CASHFREE_ENV='production'):
+            self.assertEqual(resolve_base_url(), 'https://api.cashfree.com')
+        with override_settings(CASHFREE_BASE_URL='http://127.0.0.1:9000'):
+            self.assertEqual(resolve_base_url(), 'http://127.0.0.1:9000')
+
+    @override_settings(CLOUDINARY_STORAGE={'CLOUD_NAME': 'demo', 'API_KEY': '', 'API_SECRET': ''})
+    def test_missing_cloudinary_credentials_fail_the_upload_not_the_process(self):
+        with mock.patch('templates.uploads._configured', False):
+            results = upload_images([SimpleUploadedFile('hero.png', b'png')])
+        self.assertIn('Missing Cloudinary settings: API_KEY, API_SECRET', results[0][1])
+
+
+@override_settings(CLOUDINARY_CLOUD_NAME='demo')
+class BenchmarkSuiteTests(TestCase):
+    def seed(self, **kwargs):
+        options = {'categories': 2, 'templates': 12, 'reviews': 30, 'payments': 10, 'stdout': StringIO()}
+        call_command('seed_benchmark_data', **{**options, **kwargs})
+
+    def test_generator_bulk_creates_consistent_data(self):
+        self.seed()
+        self.assertEqual((Category.objects.count(), Template.objects.count(), Review.objects.count(),
+                          Payment.objects.count()), (2, 12, 30, 10))
+        template = Template.objects.filter(review_count__gt=0).first()
+        self.assertEqual(template.review_count, template.reviews.count())
+        self.assertTrue(template.image_urls['srcset'])
+
+        self.seed(clear=True, templates=3, reviews=0, payments=0)
+        self.assertEqual(Template.objects.count(), 3)
+
+    def test_driver_reports_latency_and_queries_per_endpoint(self):
+        self.seed()
+        scenarios = ['template-list', 'template-detail', 'initiate-payment', 'webhook', 'support-create', 'support-track',
+                     'outbox-deliver']
+        with tempfile.NamedTemporaryFile('r', suffix='.json') as output:
+            call_command('run_benchmarks', iterations=4, warmup=1, scenarios=scenarios, output=output.name,
+                         stdout=StringIO(), stderr=StringIO())
+            report = json.load(output)
+        self.assertEqual(list(report['endpoints']), scenarios)
+        for name, stats in report['endpoints'].items():
+            self.assertEqual(stats['errors'], 0, name)
+            self.assertEqual(stats['requests'], 4)
+            self.assertLessEqual(stats['p50_ms'], stats['p95_ms'])
+            self.assertLessEqual(stats['p95_ms'], stats['p99_ms'])
+        self.assertGreater(report['endpoints']['template-detail']['queries_mean'], 0)
+        self.assertEqual(OutboundEmail.objects.filter(status='SENT').count(), 5)
+
+    def test_cloudinary_and_smtp_stubs(self):
+        server = start_stub_server(CloudinaryStubHandler)
+        self.addCleanup(stop_stub_server, server)
+        storage = {'CLOUD_NAME': 'bench', 'API_KEY': 'key', 'API_SECRET': 'secret'}
+        with override_settings(CLOUDINARY_STORAGE=storage, CLOUDINARY_UPLOAD_PREFIX=server.url), \
+                mock.patch('templates.uploads._configured', False):
+            self.addCleanup(cloudinary.reset_config)
+            public_id = upload_to_cloudinary(SimpleUploadedFile('hero.png', b'png'), timeout=5)
+        self.assertTrue(public_id.startswith('templates/'))
+        self.assertEqual(server.requests[0][1], '/v1_1/bench/image/upload')
+
+        smtp = start_smtp_stub()
+        self.addCleanup(stop_stub_server, smtp)
+        with override_settings(EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend', EMAIL_HOST=smtp.host,
+                               EMAIL_PORT=smtp.port, EMAIL_USE_TLS=False, EMAIL_HOST_USER=''):
+            mail.send_mail('Hello', 'Body', 'shop@example.com', ['buyer@example.com'])
+        sender, recipients, data = smtp.messages[0]
+        self.assertEqual((sender, recipients), ('shop@example.com', ['buyer@example.com']))
+        self.assertIn(b'Subject: Hello', data)
+
+
+class RequestMetricsTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.template = make_template(Category.objects.create(name='Business'))
+        Review.objects.create(template=self.template, user='amy', rating=5, comment='Great')
+
+    def server_timing(self, response):
+        return dict(
+            (entry.split(';')[0], float(entry.split('dur=')[1].split(';')[0]))
+            for entry in response['Server-Timing'].split(', ')
+        )
+
+    def test_server_timing_header_and_log_line(self):
+        with self.assertLogs('templates.instrumentation', 'INFO') as logs:
+            response = self.client.get(f'/api/templates/{self.template.id}/')
+        timing = self.server_timing(response)
+        self.assertEqual(set(timing), {'db', 'serialize', 'render', 'http', 'total'})
+        self.assertGreater(timing['db'], 0)
+        self.assertGreater(timing['serialize'], 0)
+        self.assertGreaterEqual(timing['total'], timing['db'] + timing['serialize'])
+        record = logs.records[-1]
+        self.assertEqual((record.status, record.db_queries, record.http_calls), (200, 2, 0))
+        self.assertEqual(record.path, f'/api/templates/{self.template.id}/')
+
+    @override_settings(REQUEST_QUERY_WARNING_THRESHOLD=1)
+    def test_warns_over_query_threshold(self):
+        with self.assertLogs('templates.instrumentation', 'WARNING') as logs:
+            self.client.get(f'/api/templates/{self.template.id}/')
+        self.assertIn('ran 2 queries (threshold 1)', logs.output[0])
+
+    @override_settings(CASHFREE_APP_ID='app', CASHFREE_SECRET_KEY='secret')
+    def test_outbound_http_is_timed(self):
+        server = start_stub_server(CashfreeStubHandler, delay=0.05)
+        self.addCleanup(stop_stub_server, server)
+        client = CashfreeClient(server.url, 'app', 'secret')
+        with mock.patch('templates.views.get_cashfree_client', return_value=client), \
+                self.assertLogs('templates.instrumentation', 'INFO') as logs:
+            response = self.client.post(f'/api/templates/{self.template.id}/initiate-payment/',
+                                        {'email': 'buyer@example.com'}, content_type='application/json')
+        self.assertGreaterEqual(self.server_timing(response)['http'], 50)
+        self.assertEqual(logs.records[-1].http_calls, 1)
+
+    async def test_async_views_count_queries(self):
+        await Payment.objects.acreate(template=self.template, order_id='order_1', user_email='buyer@example.com',
+                                      amount=Decimal('499.00'))
+        response = await AsyncClient().get('/api/async/payments/order_1/')
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(self.server_timing(response)['db'], 0)
+
+    @override_settings(SERVER_TIMING_HEADER=False)
+    def test_header_can_be_disabled(self):
+        self.assertNotIn('Server-Timing', self.client.get('/api/categories/'))
+
+
+class PaymentStatusTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        self.payment = Payment.objects.create(
+            template=make_template(Category.objects.create(name='Business')), order_id='order_1',
+            user_email='buyer@example.com', amount=Decimal('499.00'),
+        )
+
+    def complete(self, status='SUCCESS'):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.payment.status = status
+            self.payment.save(update_fields=['status', 'updated_at'])
+
+    def test_status_is_served_from_cache(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/payments/order_1/status/')
+        self.assertEqual((response.data['order_id'], response.data['status']), ('order_1', 'PENDING'))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/payments/order_1/status/').data, response.data)
+        self.assertEqual(self.client.get('/api/payments/missing/status/').status_code, 404)
+
+    def test_committed_save_updates_the_cache(self):
+        get_payment_status('order_1')
+        self.complete()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_payment_status('order_1')['status'], 'SUCCESS')
+
+    def test_sync_endpoint_never_long_polls(self):
+        started = time.monotonic()
+        response = self.client.get('/api/payments/order_1/status/', {'wait': 30, 'known': 'PENDING'})
+        self.assertEqual(response.data['status'], 'PENDING')
+        self.assertLess(time.monotonic() - started, 1)
+
+    async def test_async_long_poll_returns_immediately_when_status_differs(self):
+        response = await AsyncClient().get('/api/async/payments/order_1/status/', {'wait': 30, 'known': 'ACTIVE'})
+        self.assertEqual(response.json()['status'], 'PENDING')
+
+    @override_settings(PAYMENT_STATUS_POLL_INTERVAL=10)
+    async def test_async_long_poll_wakes_on_status_change(self):
+        started = time.monotonic()
+        request = asyncio.ensure_future(
+            AsyncClient().get('/api/async/payments/order_1/status/', {'wait': 10, 'known': 'PENDING'})
+        )
+        await asyncio.sleep(0.1)
+        await sync_to_async(self.complete)('FAILED')
+        response = await request
+        self.assertEqual(response.json()['status'], 'FAILED')
+        self.assertLess(time.monotonic() - started, 2)
+
+    async def test_event_stream_ends_on_final_status(self):
+        response = await AsyncClient().get('/api/async/payments/order_1/events/')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = aiter(response.streaming_content)
+        self.assertIn(b'"status": "PENDING"', await anext(events))
+        await sync_to_async(self.complete)()
+        self.assertIn(b'"status": "SUCCESS"', await anext(events))
+        with self.assertRaises(StopAsyncIteration):
+            await anext(events)
+        missing = await AsyncClient().get('/api/async/payments/missing/events/')
+        self.assertEqual(missing.status_code, 404)
+
+
+def sequential_scans(plan):
+    """Plan lines that read a whole table: Postgres ``Seq Scan``, SQLite ``SCAN <table>`` without an index."""
+    return [
+        line for line in plan.splitlines()
+        if 'Seq Scan' in line or (re.search(r'\bSCAN\b', line) and 'USING' not in line)
+    ]
+
+
+class QueryPlanTests(TestCase):
+    """EXPLAIN every hot query; each must be answered from an index."""
+
+    def hot_queries(self):
+        since = timezone.now() - timezone.timedelta(hours=1)
+        return {
+            'support track': SupportInquiry.objects.filter(inquiry_id='SUPP-1', email='a@example.com'),
+            'support by order': SupportInquiry.objects.filter(order_id='order_1'),
+            'stale payments': Payment.objects.filter(status='PENDING', created_at__lt=since).order_by('created_at'),
+            'payments by email': Payment.objects.filter(user_email='a@example.com').order_by('-created_at'),
+            'template reviews': Review.objects.filter(template_id=1).order_by('-date', '-id'),
+            'category by price': Template.objects.filter(category_id=1, price__lte=500).order_by('price'),
+            'sales by day': DailySales.objects.filter(date__gte=since.date()).values('date', 'template_id')
+                            .annotate(Sum('amount')).order_by('date', 'template_id'),
+        }
+
+    def explain(self, queryset):
+        if connection.vendor == 'postgresql':
+            # Tiny test tables make a seq scan cheapest; ask whether an index *can* be used
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+    def test_hot_queries_use_indexes(self):
+        for name, queryset in self.hot_queries().items():
+            with self.subTest(name):
+                plan = self.explain(queryset)
+                self.assertEqual(sequential_scans(plan), [], plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_detects_sequential_scan(self):
+        plan = self.explain(Payment.objects.filter(user_phone='9999999999'))
+        self.assertTrue(sequential_scans(plan), plan)
+
+
+def generate_ids(count):
+    return [new_id() for _ in range(count)]
+
+
+class IdGeneratorTests(TestCase):
+    def test_ids_are_short_fixed_width_and_time_ordered(self):
+        ids = [new_order_id() for _ in range(1000)]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual({len(order_id) for order_id in ids}, {len('order_') + LENGTH})
+        self.assertLessEqual(len(new_inquiry_id()), SupportInquiry._meta.get_field('inquiry_id').max_length)
+
+    def test_threads_never_collide(self):
+        threads, per_thread = 8, 5000
+        with ThreadPoolExecutor(threads) as pool:
+            batches = list(pool.map(generate_ids, [per_thread] * threads))
+        ids = [value for batch in batches for value in batch]
+        self.assertEqual(len(set(ids)), threads * per_thread)
+        for batch in batches:
+            self.assertEqual(batch, sorted(batch))
+
+    def test_processes_never_collide(self):
+        # Forked workers keep the parent's generator object but must not repeat its IDs
+        generate_ids(100)
+        with multiprocessing.get_context('fork').Pool(4) as pool:
+            batches = pool.map(generate_ids, [2000] * 4)
+        ids = [value for batch in batches for value in batch]
+        self.assertEqual(len(set(ids)), len(ids))
+
+    def test_sequence_overflow_and_clock_step_back_stay_monotonic(self):
+        generator = IdGenerator(worker_id=7)
+        with mock.patch('templates.ids.time.time', return_value=1_800_000_000.0):
+            ids = [generator.next_id() for _ in range(10000)]
+        with mock.patch('templates.ids.time.time', return_value=1_799_999_999.0):
+            ids.append(generator.next_id())
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertEqual(ids, sorted(ids))
+
+    def test_default_worker_differs_across_hosts_with_the_same_pid(self):
+        # Containers commonly all run the app as PID 1
+        workers = set()
+        for host in ('web-1', 'web-2', 'web-3', 'web-4'):
+            with mock.patch('templates.ids.socket.gethostname', return_value=host), \
+                    mock.patch('templates.ids.os.getpid', return_value=1):
+                workers.add(IdGenerator().next_int() >> SEQUENCE_BITS & MAX_WORKER)
+        self.assertEqual(len(workers), 4)
+
+    @override_settings(ID_WORKER_ID=4096)
+    def test_rejects_out_of_range_worker(self):
+        with self.assertRaises(ValueError):
+            IdGenerator().next_id()
+
+    def test_inquiries_created_in_the_same_second(self):
+        for i in range(50):
+            SupportInquiry.objects.create(email=f'user{i}@example.com', inquiry_type='GENERAL', description='Help')
+        self.assertEqual(SupportInquiry.objects.values('inquiry_id').distinct().count(), 50)
+
+
+@override_settings(DATABASE_ROUTERS=['backend.routers.ReplicaRouter'], DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TransactionTestCase):
+    """Primary is the test database; the replica is a second SQLite file that never receives writes."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # The test runner only knows settings.DATABASES, so the replica alias is added here
+        cls.replica_dir = tempfile.TemporaryDirectory()
+        connections.settings['replica'] = connections.configure_settings({
+            'default': connections.settings['default'],
+            'replica': {'ENGINE': 'django.db.backends.sqlite3',
+                        'NAME': os.path.join(cls.replica_dir.name, 'replica.sqlite3')},
+        })['replica']
+        cls.databases = {'default', 'replica'}
+        call_command('migrate', database='replica', verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        cls.replica_dir.cleanup()
+        cls.databases = {'default'}
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        # Like a request: earlier writes on this thread must not pin these tests' reads
+        self.enterContext(unpinned())
+        # The same template on both sides, as replication would leave it. use_primary()
+        # keeps these writes from pinning the reads the tests make afterwards.
+        with use_primary():
+            self.category = Category.objects.create(name='Business')
+            self.template = make_template(self.category)
+            Category.objects.using('replica').bulk_create([self.category])
+            Template.objects.using('replica').bulk_create([self.template])
+    def test_catalog_reads_use_the_replica(self):
+        Category.objects.using('replica').create(name='Replica only')
+        names = [category['name'] for category in self.client.get('/api/categories/').data]
+        self.assertIn('Replica only', names)
+
+    def test_payments_stay_on_the_primary(self):
+        Payment.objects.create(template=self.template, order_id='order_1', user_email='buyer@example.com',
+                               amount=Decimal('499.00'))
+        self.assertEqual(self.client.get('/api/payments/order_1/status/').data['status'], 'PENDING')
+
+    def test_submit_review_reads_its_own_write(self):
+        response = self.client.post('/api/reviews/submit/', {
+            'template': self.template.id, 'user': 'amy', 'rating': 5, 'comment': 'Great',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['template']['review_count'], 1)
+        # The next request is unpinned again and reads the (unreplicated) replica
+        self.assertEqual(self.client.get(f'/api/templates/{self.template.id}/').data['review_count'], 0)
+
+    def test_worker_batches_do_not_pin_the_thread(self):
+        with use_primary():
+            enqueue_email('Hello', 'Body', ['buyer@example.com'])
+            Category.objects.using('replica').create(name='Replica only')
+        call_command('run_email_worker', once=True, stdout=StringIO())
+        self.assertEqual(OutboundEmail.objects.get().status, 'SENT')
+        # The worker wrote, but only inside its per-batch scope
+        self.assertEqual(Category.objects.count(), 2)
+
+    def test_reads_inside_a_transaction_use_the_primary(self):
+        with use_primary():
+            Category.objects.using('replica').create(name='Replica only')
+        self.assertEqual(Category.objects.count(), 2)
+        with transaction.atomic():
+            self.assertEqual(Category.objects.count(), 1)
+
+
+@override_settings(CLOUDINARY_CLOUD_NAME='demo')
+class CatalogImportExportTests(CatalogTestCase):
+    def setUp(self):
+        super().setUp()
+        business = Category.objects.create(name='Business')
+        Category.objects.create(name='Empty')
+        self.template = make_template(business, image='templates/hero', additional_images=['templates/a'],
+                                      features=['SEO'], tech_stack=['React'], zip_file_url='https://files.example.com/1.zip')
+
+    def export(self):
+        out = StringIO()
+        call_command('export_catalog', '-', stdout=out)
+        return [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def import_lines(self, rows, **options):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl') as stream:
+            stream.writelines(json.dumps(row) + '\n' for row in rows)
+            stream.flush()
+            out = StringIO()
+            call_command('import_catalog', stream.name, stdout=out, **options)
+        return out.getvalue()
+
+    def template_row(self, index, **fields):
+        return {'type': 'template', 'title': f'Imported {index}', 'description': 'Imported template',
+                'category': 'Portfolio', 'price': '299.00', 'image': f'templates/imported_{index}', **fields}
+
+    def test_round_trip_restores_the_catalog(self):
+        rows = self.export()
+        self.assertEqual([row['type'] for row in rows], ['category', 'category', 'template'])
+        self.assertEqual(rows[2]['category'], 'Business')
+        self.assertEqual((rows[2]['image'], rows[2]['price']), ('templates/hero', '499.00'))
+
+        Category.objects.all().delete()
+        self.assertIn('1 created, 0 updated', self.import_lines(rows))
+        template = Template.objects.get()
+        self.assertEqual((template.pk, template.category.name, template.features), (self.template.pk, 'Business', ['SEO']))
+        self.assertTrue(template.image_urls['srcset'])
+        self.assertEqual(len(template.additional_image_urls), 1)
+        self.assertEqual(set(Category.objects.values_list('name', flat=True)), {'Business', 'Empty'})
+        self.assertEqual(list(get_search_backend().search(Template.objects.all(), 'landing')), [template])
+
+    def test_updates_by_id_and_creates_the_rest_in_batches(self):
+        rows = [self.template_row(0, id=self.template.pk, title='Renamed')]
+        rows += [self.template_row(i) for i in range(1, 250)]
+        with CaptureQueriesContext(connection) as queries:
+            output = self.import_lines(rows, batch_size=100)
+        self.assertIn('249 created, 1 updated', output)
+        # Three batches and one new category, not a query per row
+        self.assertLess(len(queries), 25)
+        self.assertEqual(Template.objects.get(pk=self.template.pk).title, 'Renamed')
+        self.assertEqual(Category.objects.filter(name='Portfolio').count(), 1)
+        # Later inserts still get fresh ids
+        self.assertNotIn(make_template(Category.objects.first()).pk, [self.template.pk])
+
+    def test_invalid_line_aborts_the_whole_import(self):
+        rows = [self.template_row(1), self.template_row(2, price='-5')]
+        with self.assertRaisesMessage(CommandError, 'Line 2'):
+            self.import_lines(rows)
+        self.assertFalse(Template.objects.filter(title__startswith='Imported').exists())
+
+    def test_memory_stays_flat_as_the_catalog_grows(self):
+        def peak_kib(count):
+            with tempfile.NamedTemporaryFile('w', suffix='.jsonl') as stream:
+                stream.writelines(json.dumps(self.template_row(i)) + '\n' for i in range(count))
+                stream.flush()
+                tracemalloc.start()
+                call_command('import_catalog', stream.name, batch_size=200, stdout=StringIO())
+                call_command('export_catalog', os.devnull, chunk_size=200, stdout=StringIO())
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            Template.objects.filter(title__startswith='Imported').delete()
+            return peak / 1024
+
+        small, large = peak_kib(500), peak_kib(4000)
+        self.assertLess(large, small * 1.5, (small, large))
+
+
+@override_settings(CASHFREE_SECRET_KEY='test-secret', WEBHOOK_PROCESS_IN_BACKGROUND=False)
+class DailySalesTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.template = make_template(Category.objects.create(name='Business'))
+        self.payment = self.create_payment('order_1')
+
+    def create_payment(self, order_id, amount='499.00'):
+        return Payment.objects.create(template=self.template, order_id=order_id, user_email='buyer@example.com',
+                                      amount=Decimal(amount))
+
+    def rollups(self):
+        return {row.status: (row.count, row.amount) for row in DailySales.objects.filter(template=self.template)}
+
+    def test_webhook_moves_the_payment_between_statuses(self):
+        self.assertEqual(self.rollups(), {'PENDING': (1, Decimal('499.00'))})
+        post_webhook(self.client, 'PAYMENT_SUCCESS_WEBHOOK', 'order_1')
+        call_command('process_webhook_events', once=True, grace=0, stdout=StringIO())
+        self.assertEqual(self.rollups(), {'PENDING': (0, Decimal('0.00')), 'SUCCESS': (1, Decimal('499.00'))})
+
+    def test_saves_that_skip_status_leave_rollups_alone(self):
+        self.payment.status = 'FAILED'
+        self.payment.save(update_fields=['user_phone'])
+        self.assertEqual(self.rollups(), {'PENDING': (1, Decimal('499.00'))})
+
+    def test_rebuild_matches_incremental_rollups(self):
+        second = self.create_payment('order_2', '100.00')
+        with transaction.atomic():
+            apply_payment_status(self.payment, 'SUCCESS')
+            apply_payment_status(second, 'FAILED')
+        self.create_payment('order_3', '250.00').delete()
+        incremental = {status: totals for status, totals in self.rollups().items() if totals[0]}
+
+        out = StringIO()
+        call_command('rebuild_daily_sales', stdout=out)
+        self.assertIn('Rebuilt 2 daily sales rows', out.getvalue())
+        self.assertEqual(self.rollups(), incremental)
+
+    def test_analytics_reads_rollups_in_one_query(self):
+        apply_payment_status(self.payment, 'SUCCESS')
+        self.create_payment('order_2')
+        self.client.force_authenticate(get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pass'))
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/analytics/sales/', {'days': 90})
+        self.assertEqual(response.data['days'], 90)
+        row, = response.data['results']
+        self.assertEqual((row['template'], row['revenue'], row['orders'], row['attempts']),
+                         (self.template.id, Decimal('499.00'), 1, 2))
+        self.assertEqual(row['date'], timezone.localdate())
+
+    def test_analytics_is_admin_only(self):
+        self.assertIn(self.client.get('/api/analytics/sales/').status_code, (401, 403))
+
+
+@override_settings(CASHFREE_APP_ID='app', CASHFREE_SECRET_KEY='secret')
+class ReconcilePaymentsTests(TestCase):
+    def setUp(self):
+        self.server = start_stub_server(CashfreeStubHandler)
+        self.addCleanup(stop_stub_server, self.server)
+        self.template = make_template(Category.objects.create(name='Business'))
+
+    def create_payments(self, prefix, count, age):
+        Payment.objects.bulk_create([
+            Payment(template=self.template, order_id=f'{prefix}_{i}', user_email='buyer@example.com',
+                    amount=Decimal('499.00'))
+            for i in range(count)
+        ])
+        Payment.objects.filter(order_id__startswith=f'{prefix}_').update(created_at=timezone.now() - age)
+
+    def reconcile(self, **options):
+        out = StringIO()
+        with override_settings(CASHFREE_BASE_URL=self.server.url):
+            reset_clients()
+            self.addCleanup(reset_clients)
+            call_command('reconcile_payments', stdout=out, **options)
+        return out.getvalue()
+
+    def test_applies_paid_and_expired_orders(self):
+        self.create_payments('stale', 60, timezone.timedelta(hours=2))
+        self.create_payments('fresh', 5, timezone.timedelta(minutes=5))
+        self.create_payments('ancient', 5, timezone.timedelta(days=30))
+        self.server.order_statuses.update({f'stale_{i}': 'PAID' for i in range(0, 20)})
+        self.server.order_statuses.update({f'stale_{i}': 'EXPIRED' for i in range(20, 35)})
+        self.server.order_statuses.update({f'stale_{i}': None for i in range(35, 40)})
+
+        output = self.reconcile(workers=4, rate=0, batch_size=25)
+        self.assertIn('Checked 60 pending payments: 20 paid, 20 failed, 20 still pending, 0 errors', output)
+        self.assertEqual(Payment.objects.filter(status='SUCCESS').count(), 20)
+        self.assertEqual(Payment.objects.filter(status='FAILED', order_id__startswith='stale_').count(), 20)
+        # One purchase email per paid order, as the webhook would have sent
+        self.assertEqual(OutboundEmail.objects.count(), 20)
+        checked = {path.rsplit('/', 1)[-1] for _, path, _ in self.server.requests}
+        self.assertEqual(checked, {f'stale_{i}' for i in range(60)})
+
+    def test_requests_are_rate_limited(self):
+        self.create_payments('stale', 20, timezone.timedelta(hours=2))
+        started = time.monotonic()
+        self.reconcile(workers=8, rate=100)
+        self.assertGreaterEqual(time.monotonic() - started, 19 / 100)
+        self.assertEqual(len(self.server.requests), 20)
+
+    def test_stops_when_cashfree_is_unavailable(self):
+        self.create_payments('stale', 10, timezone.timedelta(hours=2))
+        with mock.patch.object(CashfreeClient, 'get_order', side_effect=CashfreeUnavailable('circuit open')):
+            output = self.reconcile(workers=1, rate=0)
+        self.assertIn('0 paid, 0 failed, 0 still pending, 1 errors, 9 skipped', output)
+        self.assertEqual(Payment.objects.filter(status='PENDING').count(), 10)
+
+    def test_rate_limiter_spaces_calls(self):
+        clock = [0.0]
+        sleeps = []
+        limiter = RateLimiter(4, clock=lambda: clock[0], sleep=sleeps.append)
+        for _ in range(3):
+            limiter.acquire()
+        self.assertEqual(sleeps, [0.25, 0.5])
+
+
+@override_settings(DOWNLOAD_SENDFILE_HEADER='', DOWNLOAD_CHUNK_SIZE=1024, BACKEND_URL='https://api.example.com')
+class TemplateDownloadTests(TestCase):
+    def setUp(self):
+        files = tempfile.TemporaryDirectory()
+        self.addCleanup(files.cleanup)
+        self.enterContext(override_settings(TEMPLATE_FILES_ROOT=files.name))
+        self.content = os.urandom(10_000)
+        with open(os.path.join(files.name, 'landing.zip'), 'wb') as f:
+            f.write(self.content)
+        template = make_template(Category.objects.create(name='Business'), zip_file='landing.zip')
+        self.payment = Payment.objects.create(template=template, order_id='order_1', user_email='buyer@example.com',
+                                              amount=Decimal('499.00'), status='SUCCESS')
+        self.url = download_url(self.payment).removeprefix('https://api.example.com')
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_streams_the_whole_file_with_validators(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.content)
+        self.assertEqual((response['Content-Length'], response['Accept-Ranges']), ('10000', 'bytes'))
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="landing.zip"')
+        self.assertEqual(self.client.get(self.url, headers={'If-None-Match': response['ETag']}).status_code, 304)
+
+    def test_byte_ranges_resume_a_download(self):
+        response = self.client.get(self.url, headers={'Range': 'bytes=4000-'})
+        self.assertEqual((response.status_code, response['Content-Range']), (206, 'bytes 4000-9999/10000'))
+        self.assertEqual(self.body(response), self.content[4000:])
+
+        response = self.client.get(self.url, headers={'Range': 'bytes=-100'})
+        self.assertEqual(self.body(response), self.content[-100:])
+        response = self.client.get(self.url, headers={'Range': 'bytes=10-19'})
+        self.assertEqual((response['Content-Length'], self.body(response)), ('10', self.content[10:20]))
+
+        self.assertEqual(self.client.get(self.url, headers={'Range': 'bytes=20000-'}).status_code, 416)
+        # A stale If-Range means the partial copy is from another version of the file
+        stale = self.client.get(self.url, headers={'Range': 'bytes=0-9', 'If-Range': '"old"'})
+        self.assertEqual((stale.status_code, len(self.body(stale))), (200, 10_000))
+
+    def test_rejects_tampered_expired_and_unpaid_tokens(self):
+        self.assertEqual(self.client.get(self.url.replace('order_1', 'order_2')).status_code, 403)
+        with override_settings(DOWNLOAD_TOKEN_MAX_AGE=-1):
+            self.assertEqual(self.client.get(self.url).status_code, 410)
+        self.payment.status = 'FAILED'
+        self.payment.save()
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_hands_off_to_the_proxy(self):
+        with override_settings(DOWNLOAD_SENDFILE_HEADER='X-Accel-Redirect', DOWNLOAD_ACCEL_PREFIX='/protected/'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/landing.zip')
+        self.assertEqual(response.content, b'')
+        with override_settings(DOWNLOAD_SENDFILE_HEADER='X-Sendfile'):
+            response = self.client.get(self.url)
+        self.assertTrue(response['X-Sendfile'].endswith(os.sep + 'landing.zip'))
+
+    def test_large_files_are_never_held_in_memory(self):
+        path = os.path.join(settings.TEMPLATE_FILES_ROOT, 'landing.zip')
+        with open(path, 'wb') as f:
+            f.truncate(20 * 1024 * 1024)
+        with override_settings(DOWNLOAD_CHUNK_SIZE=64 * 1024):
+            response = self.client.get(self.url)
+            tracemalloc.start()
+            total = sum(len(chunk) for chunk in response.streaming_content)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        self.assertEqual(total, 20 * 1024 * 1024)
+        self.assertLess(peak, 1024 * 1024)
+
+
+def make_zip(files):
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('landing/', '')
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+class TemplateManifestTests(TestCase):
+    def setUp(self):
+        files = tempfile.TemporaryDirectory()
+        self.addCleanup(files.cleanup)
+        self.enterContext(override_settings(TEMPLATE_FILES_ROOT=files.name))
+        self.path = os.path.join(files.name, 'landing.zip')
+        self.write({'landing/index.html': '<h1>Hi</h1>' * 100, 'landing/app.js': 'console.log(1)'})
+        self.template = make_template(Category.objects.create(name='Business'), zip_file='landing.zip')
+
+    def write(self, files, mtime=None):
+        with open(self.path, 'wb') as f:
+            f.write(make_zip(files))
+        if mtime is not None:
+            os.utime(self.path, ns=(mtime, mtime))
+
+    def build(self, *args):
+        out = StringIO()
+        call_command('build_manifests', *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_manifest_lists_entries_from_the_central_directory(self):
+        self.assertEqual(build_manifest(self.template), 'built')
+        manifest = self.template.manifest
+        with open(self.path, 'rb') as f:
+            content = f.read()
+        self.assertEqual((manifest.archive_hash, manifest.size), (hashlib.sha256(content).hexdigest(), len(content)))
+        with zipfile.ZipFile(self.path) as archive:
+            expected = {info.filename: (info.file_size, info.compress_size, f'{info.CRC:08x}')
+                        for info in archive.infolist() if not info.is_dir()}
+        self.assertEqual(
+            {e['name']: (e['size'], e['compressed_size'], e['crc']) for e in manifest.entries}, expected,
+        )
+
+    def test_endpoint_serves_the_stored_manifest(self):
+        response = self.client.get(f'/api/templates/{self.template.id}/manifest/')
+        self.assertEqual(response.status_code, 404)
+        build_manifest(self.template)
+        with open(self.path, 'wb') as f:
+            f.write(b'gone')  # the endpoint never touches the archive
+        response = self.client.get(f'/api/templates/{self.template.id}/manifest/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['entries']), 2)
+        self.assertEqual(response['ETag'], f'"{response.json()["archive_hash"]}"')
+        cached = self.client.get(f'/api/templates/{self.template.id}/manifest/',
+                                 headers={'If-None-Match': response['ETag']})
+        self.assertEqual(cached.status_code, 304)
+
+    def test_rebuild_is_incremental(self):
+        self.assertIn('1 built', self.build())
+        built_at = self.template.manifest.built_at
+        self.assertIn('0 built, 1 unchanged', self.build())
+
+        # Touched but byte-identical: rehashed, stored manifest kept
+        os.utime(self.path, ns=(1, 1))
+        self.assertEqual(build_manifest(self.template), 'rehashed')
+        self.assertEqual(build_manifest(self.template), 'unchanged')
+        self.template.manifest.refresh_from_db()
+        self.assertEqual(self.template.manifest.built_at, built_at)
+
+        self.write({'landing/index.html': 'changed'})
+        self.assertIn('1 built', self.build())
+        self.template.manifest.refresh_from_db()
+        self.assertEqual([e['name'] for e in self.template.manifest.entries], ['landing/index.html'])
+
+        self.template.zip_file = ''
+        self.template.save()
+        self.assertIn('1 removed', self.build())
+        self.assertFalse(TemplateManifest.objects.exists())
+
+    def test_unreadable_archive_does_not_stop_the_rebuild(self):
+        make_template(self.template.category, title='No archive', zip_file_url='')
+        second = make_template(self.template.category, title='Second', zip_file='landing.zip')
+        real_mmap = mmap.mmap
+        calls = []
+
+        def flaky_mmap(*args, **kwargs):
+            calls.append(args)
+            if len(calls) == 1:
+                raise PermissionError('Permission denied')
+            return real_mmap(*args, **kwargs)
+
+        err = StringIO()
+        with mock.patch('templates.manifests.mmap.mmap', side_effect=flaky_mmap):
+            out = StringIO()
+            call_command('build_manifests', stdout=out, stderr=err)
+        self.assertIn('1 built, 0 unchanged, 0 removed, 1 errors', out.getvalue())
+        self.assertIn('Permission denied', err.getvalue())
+        self.assertTrue(TemplateManifest.objects.filter(template=second).exists())
+
+    def test_remote_archives_are_fetched_once_per_change(self):
+        server = start_stub_server(FileStubHandler)
+        self.addCleanup(stop_stub_server, server)
+        server.files['/landing.zip'] = make_zip({'index.html': 'remote'})
+        self.template.zip_file, self.template.zip_file_url = '', f'{server.url}/landing.zip'
+        self.template.save()
+
+        self.assertEqual(build_manifest(self.template), 'built')
+        self.assertEqual(build_manifest(self.template), 'unchanged')
+        self.assertEqual([method for method, _, _ in server.requests], ['HEAD', 'GET', 'HEAD'])
+        self.assertEqual(self.template.manifest.entries[0]['name'], 'index.html')
+
+        server.files['/landing.zip'] = b'not a zip'
+        with self.assertRaises(ManifestError):
+            build_manifest(self.template)
+
+
+def throttle_rates(**rates):
+    return override_settings(REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        'DEFAULT_THROTTLE_RATES': {**settings.REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'], **rates},
+    })
+
+
+@override_settings(CASHFREE_APP_ID='', CASHFREE_SECRET_KEY='')
+class ThrottleTests(TestCase):
+    def setUp(self):
+        get_bucket_store().clear()
+        self.addCleanup(get_bucket_store().clear)
+        self.template = make_template(Category.objects.create(name='Business'))
+        self.url = f'/api/templates/{self.template.id}/initiate-payment/'
+
+    def initiate(self, email, ip='127.0.0.1', **headers):
+        return self.client.post(self.url, {'email': email}, content_type='application/json', REMOTE_ADDR=ip,
+                                headers=headers)
+
+    def test_bucket_bursts_then_refills_at_the_rate(self):
+        self.assertEqual(parse_rate('3/min'), (3, 60))
+        self.assertEqual([take_token('test', 'a', '3/min', now=1000) for _ in range(3)], [0.0] * 3)
+        self.assertAlmostEqual(take_token('test', 'a', '3/min', now=1000), 20.0)
+        self.assertEqual(take_token('test', 'b', '3/min', now=1000), 0.0)
+        self.assertAlmostEqual(take_token('test', 'a', '3/min', now=1010), 10.0)
+        self.assertEqual(take_token('test', 'a', '3/min', now=1020), 0.0)
+
+    @throttle_rates(payment_email='2/min', payment_ip='100/min')
+    def test_payment_email_limit_rejects_before_creating_payments(self):
+        self.assertEqual([self.initiate('buyer@example.com').status_code for _ in range(2)], [500, 500])
+        response = self.initiate(' Buyer@Example.com ')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertEqual(Payment.objects.count(), 2)
+        self.assertEqual(self.initiate('other@example.com').status_code, 500)
+
+    @throttle_rates(payment_email='100/min', payment_ip='1/min')
+    def test_spoofed_forwarded_for_shares_the_callers_bucket(self):
+        # The router appends the address it saw; anything before it comes from the client
+        self.assertEqual(self.initiate('a@example.com', **{'X-Forwarded-For': '1.1.1.1, 203.0.113.5'}).status_code, 500)
+        self.assertEqual(self.initiate('b@example.com', **{'X-Forwarded-For': '2.2.2.2, 203.0.113.5'}).status_code, 429)
+        self.assertEqual(self.initiate('c@example.com', **{'X-Forwarded-For': '203.0.113.6'}).status_code, 500)
+
+    @throttle_rates(payment_email='100/min', payment_ip='1/min')
+    def test_payment_ip_limit_spans_emails(self):
+        self.assertEqual(self.initiate('a@example.com').status_code, 500)
+        self.assertEqual(self.initiate('b@example.com').status_code, 429)
+        self.assertEqual(self.initiate('b@example.com', ip='10.0.0.2').status_code, 500)
+        self.assertEqual(Payment.objects.count(), 2)
+
+    @throttle_rates(payment_email='1/min')
+    async def test_async_initiate_payment_is_throttled(self):
+        client = AsyncClient()
+        url = f'/api/async/templates/{self.template.id}/initiate-payment/'
+        first = await client.post(url, {'email': 'buyer@example.com'}, content_type='application/json')
+        second = await client.post(url, {'email': 'buyer@example.com'}, content_type='application/json')
+        self.assertEqual((first.status_code, second.status_code), (500, 429))
+        self.assertEqual(second['Retry-After'], '60')
+        self.assertEqual(await Payment.objects.acount(), 1)
+
+    @throttle_rates(support_email='1/min', support_ip='100/min')
+    def test_support_inquiries_are_throttled_before_sending_email(self):
+        data = {'email': 'buyer@example.com', 'inquiry_type': 'GENERAL', 'description': 'Where is my download link?'}
+        self.assertEqual(self.client.post('/api/support/', data, content_type='application/json').status_code, 201)
+        response = self.client.post('/api/support/', data, content_type='application/json')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertEqual((SupportInquiry.objects.count(), OutboundEmail.objects.count()), (1, 2))
+
+        inquiry = SupportInquiry.objects.get()
+        track = {'inquiry_id': inquiry.inquiry_id, 'email': inquiry.email}
+        self.assertEqual(self.client.post('/api/support/track/', track, content_type='application/json').status_code, 200)
+
+    def test_local_store_evicts_least_recently_used(self):
+        store = LocalBuckets(max_keys=2)
+        store.take('active', 1, 60, now=0)
+        store.take('idle', 1, 60, now=0)
+        self.assertGreater(store.take('active', 1, 60, now=1), 0)
+        for i in range(5):
+            store.take(f'flood{i}', 1, 60, now=2)
+            # The throttled client keeps its empty bucket while new keys churn
+            self.assertGreater(store.take('active', 1, 60, now=2), 0)
+        self.assertNotIn('idle', store.buckets)
+
+    @override_settings(THROTTLE_CACHE_ALIAS='')
+    def test_local_store_throttles_views(self):
+        with throttle_rates(payment_email='1/min'):
+            self.assertEqual(self.initiate('buyer@example.com').status_code, 500)
+            self.assertEqual(self.initiate('buyer@example.com').status_code, 429)
+        get_bucket_store().clear()
+
+    def test_benchmark_reports_microseconds_per_check(self):
+        out = StringIO()
+        call_command('benchmark_throttle', iterations=200, clients=10, stdout=out)
+        self.assertRegex(out.getvalue(), r'admitted: +[\d.]+ us/request')
+        self.assertRegex(out.getvalue(), r'rejected: +[\d.]+ us/request')
@@ -0,0 +1,202 @@
+"""
+Token-bucket throttles for endpoints that cost a database write and an
+external call per request: payment initiation (Cashfree) and support
+inquiries (two emails).
+
+A rate of ``N/period`` is a bucket of N tokens refilled continuously at N per
+period: a client may burst N requests, then gets one every period/N. Buckets
+are keyed per client IP and per email address and kept in the
+THROTTLE_CACHE_ALIAS cache, so with a shared cache (e.g. Redis) the limits hold
+across workers. An empty alias keeps them in a dict in each process instead:
+a few microseconds per check, but every worker allows the full rate. A rate of
+None disables that throttle.
+"""
+import hashlib
+import math
+import threading
+import time
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+from rest_framework.throttling import BaseThrottle
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """'10/min' -> (10, 60): bucket size and the seconds it takes to refill."""
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+def refill(state, capacity, period, now):
+    """Tokens in a bucket last left at ``state`` = (tokens, timestamp); a missing bucket is full."""
+    if state is None:
+        return capacity
+    tokens, stamp = state
+    return min(capacity, tokens + max(now - stamp, 0.0) * capacity / period)
+
+
+class LocalBuckets:
+    """Buckets in this process: a dict behind a lock, nothing serialized."""
+
+    def __init__(self, max_keys=100_000):
+        self.max_keys = max_keys
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def take(self, key, capacity, period, now):
+        with self.lock:
+            # Popped and re-inserted, so the dict stays ordered by last use
+            state = self.buckets.pop(key, None)
+            tokens = refill(state, capacity, period, now)
+            if tokens < 1:
+                self.buckets[key] = state
+                return (1 - tokens) * period / capacity
+            while len(self.buckets) >= self.max_keys:
+                # Least recently used first: usually refilled already, and a flood
+                # of new keys can't reset the buckets of clients still sending
+                del self.buckets[next(iter(self.buckets))]
+            self.buckets[key] = (tokens - 1, now)
+            return 0.0
+
+    def clear(self):
+        with self.lock:
+            self.buckets = {}
+
+
+class CacheBuckets:
+    """
+    Buckets in a Django cache shared by all workers. The read-modify-write is
+    locked only within this process, so two workers may both take a last token.
+    """
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+        self.lock = threading.Lock()
+
+    def take(self, key, capacity, period, now):
+        with self.lock:
+            tokens = refill(self.cache.get(key), capacity, period, now)
+            if tokens < 1:
+                return (1 - tokens) * period / capacity
+            # An untouched bucket is full again after one period
+            self.cache.set(key, (tokens - 1, now), period)
+            return 0.0
+
+    def clear(self):
+        # Clears the whole cache: for tests, not a cache shared with live traffic
+        self.cache.clear()
+
+
+_stores = {}
+
+
+def get_bucket_store():
+    alias = settings.THROTTLE_CACHE_ALIAS
+    if alias not in _stores:
+        _stores[alias] = CacheBuckets(alias) if alias else LocalBuckets()
+    return _stores[alias]
+
+
+def take_token(scope, ident, rate, now=None):
+    """Takes a token from ``ident``'s bucket; returns 0.0, or the seconds until one is available."""
+    capacity, period = parse_rate(rate)
+    # Wall clock rather than monotonic: buckets in a shared cache outlive this process
+    now = time.time() if now is None else now
+    return get_bucket_store().take(f'throttle:{scope}:{ident}', capacity, period, now)
+
+
+class TokenBucketThrottle(BaseThrottle):
+    scope = None
+
+    def __init__(self):
+        self.wait_time = None
+
+    def get_rate(self):
+        return settings.REST_FRAMEWORK.get('DEFAULT_THROTTLE_RATES', {}).get(self.scope)
+
+    def get_cache_ident(self, request, data):
+        raise NotImplementedError
+
+    def check(self, request, data):
+        rate = self.get_rate()
+        ident = self.get_cache_ident(request, data) if rate else None
+        if ident is None:
+            return True
+        self.wait_time = take_token(self.scope, ident, rate)
+        return not self.wait_time
+
+    def allow_request(self, request, view):
+        return self.check(request, request.data)
+
+    def wait(self):
+        return self.wait_time
+
+
+class IPThrottle(TokenBucketThrottle):
+    def get_cache_ident(self, request, data):
+        # With NUM_PROXIES = n, DRF takes the nth address from the right of
+        # X-Forwarded-For, the one our own proxy appended; earlier entries are
+        # client-supplied and ignored
+        return self.get_ident(request)
+
+
+class EmailThrottle(TokenBucketThrottle):
+    def get_cache_ident(self, request, data):
+        email = data.get('email') if hasattr(data, 'get') else None
+        if not isinstance(email, str) or not email.strip():
+            # The view rejects the request without writing anything
+            return None
+        return hashlib.sha1(email.strip().lower().encode()).hexdigest()
+
+
+class PaymentIPThrottle(IPThrottle):
+    scope = 'payment_ip'
+
+
+class PaymentEmailThrottle(EmailThrottle):
+    scope = 'payment_email'
+
+
+class SupportIPThrottle(IPThrottle):
+    scope = 'support_ip'
+
+
+class SupportEmailThrottle(EmailThrottle):
+    scope = 'support_email'
+
+
+def load_test_rates():
+    """
+    REST_FRAMEWORK rates for load generators, which send everything from one IP:
+    never reached, but every request still pays for its throttle checks.
+    """
+    return {scope: '1000000/s' for scope in settings.REST_FRAMEWORK.get('DEFAULT_THROTTLE_RATES', {})}
+
+
+PAYMENT_THROTTLES = [PaymentIPThrottle, PaymentEmailThrottle]
+SUPPORT_THROTTLES = [SupportIPThrottle, SupportEmailThrottle]
+
+
+async def athrottled_response(request, data, throttle_classes):
+    """throttled_response for async views; cache-backed checks run in a thread, off the event loop."""
+    if isinstance(get_bucket_store(), LocalBuckets):
+        return throttled_response(request, data, throttle_classes)
+    return await sync_to_async(throttled_response, thread_sensitive=False)(request, data, throttle_classes)
+
+
+def throttled_response(request, data, throttle_classes):
+    """For plain Django views: a 429 JsonResponse like DRF's, or None if every throttle allows the request."""
+    waits = [throttle.wait() for throttle in (cls() for cls in throttle_classes) if not throttle.check(request, data)]
+    if not waits:
+        return None
+    wait = math.ceil(max(waits))
+    return JsonResponse(
+        {'detail': f'Request was throttled. Expected available in {wait} seconds.'},
+        status=429, headers={'Retry-After': str(wait)},
+    )
@@ -0,0 +1,106 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .instrumentation import record_http
+
+logger = logging.getLogger(__name__)
+
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def configure_cloudinary():
+    """Configures the Cloudinary SDK from settings.CLOUDINARY_STORAGE once per process."""
+    global _configured
+    if _configured:
+        return
+    with _configure_lock:
+        if _configured:
+            return
+        import cloudinary
+
+        credentials = settings.CLOUDINARY_STORAGE
+        missing = [key for key in ('CLOUD_NAME', 'API_KEY', 'API_SECRET') if not credentials.get(key)]
+        if missing:
+            raise ImproperlyConfigured(f"Missing Cloudinary settings: {', '.join(missing)}")
+        options = {}
+        if settings.CLOUDINARY_UPLOAD_PREFIX:
+            options['upload_prefix'] = settings.CLOUDINARY_UPLOAD_PREFIX
+        cloudinary.config(
+            cloud_name=credentials['CLOUD_NAME'],
+            api_key=credentials['API_KEY'],
+            api_secret=credentials['API_SECRET'],
+            secure=True,
+            **options,
+        )
+        _configured = True
+        logger.info("Cloudinary SDK initialized")
+
+
+def upload_to_cloudinary(file, timeout):
+    import cloudinary.uploader
+
+    configure_cloudinary()
+    result = cloudinary.uploader.upload(file, folder="templates/", resource_type="image", timeout=timeout)
+    return result['public_id']
+
+
+def destroy_from_cloudinary(public_id, timeout):
+    import cloudinary.uploader
+
+    configure_cloudinary()
+    cloudinary.uploader.destroy(public_id, resource_type="image", timeout=timeout)
+
+
+def delete_images(public_ids, destroy=None):
+    """Best-effort removal of uploaded images nothing will reference; failures are logged, not raised."""
+    destroy = destroy or destroy_from_cloudinary
+    for public_id in public_ids:
+        try:
+            destroy(public_id, settings.CLOUDINARY_UPLOAD_TIMEOUT)
+        except Exception as e:
+            logger.warning("Failed to delete unused Cloudinary image %s: %s", public_id, e)
+
+
+def upload_images(files, upload=None, max_workers=None, timeout=None):
+    """
+    Uploads ``files`` concurrently on a bounded thread pool and returns one
+    ``(public_id, error)`` pair per file, in input order. Each upload gets its
+    own ``timeout`` (seconds); one failure never cancels the others.
+    """
+    if not files:
+        return []
+    upload = upload or upload_to_cloudinary
+    max_workers = max_workers or settings.CLOUDINARY_UPLOAD_WORKERS
+    timeout = timeout or settings.CLOUDINARY_UPLOAD_TIMEOUT
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(files)), thread_name_prefix='cloudinary-upload')
+    started = time.perf_counter()
+    try:
+        futures = [executor.submit(upload, file, timeout) for file in files]
+        # Queued uploads wait for a free worker, so the overall deadline covers every wave
+        waves = -(-len(files) // max_workers)
+        wait(futures, timeout=timeout * waves)
+        results = []
+        for file, future in zip(files, futures):
+            name = getattr(file, 'name', str(file))
+            if not future.done():
+                future.cancel()
+                results.append((None, f"{name}: upload timed out after {timeout}s"))
+            elif future.exception() is not None:
+                results.append((None, f"{name}: {future.exception()}"))
+            else:
+                results.append((future.result(), None))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    elapsed = time.perf_counter() - started
+    record_http(elapsed * 1000, calls=len(files))
+    failed = sum(1 for _, error in results if error)
+    logger.info("Uploaded %s/%s images to Cloudinary in %.2fs", len(files) - failed, len(files), elapsed)
+    return results
@@ -1,7 +1,8 @@
 # backend/urls.py
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CategoryViewSet, TemplateViewSet, ReviewViewSet, PaymentViewSet, payment_webhook, SupportInquiryViewSet
+from . import async_views
+from .views import CategoryViewSet, TemplateViewSet, ReviewViewSet, PaymentViewSet, payment_webhook, SupportInquiryViewSet, catalog_cache_stats, sales_analytics, template_download
 
 router = DefaultRouter()
 router.register(r'templates', TemplateViewSet, basename='templates')
@@ -11,6 +12,15 @@ router.register(r'payments', PaymentViewSet,basename='payments')
 router.register(r'support', SupportInquiryViewSet, basename='support')
 
 urlpatterns = [
+    # Async twins of the gateway-bound endpoints, for ASGI deployments
+    path('async/templates/<int:pk>/initiate-payment/', async_views.initiate_payment, name='async-initiate-payment'),
+    path('async/payments/<str:order_id>/', async_views.payment_detail, name='async-payment-detail'),
+    path('async/payments/<str:order_id>/status/', async_views.payment_status, name='async-payment-status'),
+    path('async/payments/<str:order_id>/events/', async_views.payment_events, name='async-payment-events'),
+    path('async/webhook/', async_views.payment_webhook, name='async-payment-webhook'),
     path('', include(router.urls)),
-    path('webhook/', payment_webhook, name='payment-webhook')
+    path('webhook/', payment_webhook, name='payment-webhook'),
+    path('cache-stats/', catalog_cache_stats, name='catalog-cache-stats'),
+    path('analytics/sales/', sales_analytics, name='sales-analytics'),
+    path('downloads/<str:token>/', template_download, name='template-download'),
 ]
\ No newline at end of file
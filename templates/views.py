@@ -1,100 +1,132 @@
 # backend/views.py
-import requests
-import hmac
-import hashlib
-import base64
 import time
+from datetime import timedelta
 from django.utils import timezone
 from rest_framework import viewsets, status
-from rest_framework.decorators import action, api_view
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_POST
-from .models import Category, Template, Review, Payment, SupportInquiry
-from .serializers import CategorySerializer, TemplateSerializer, ReviewSerializer, PaymentSerializer, SupportInquirySerializer
-from django.db.models import Q
-import json
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods, require_POST
+from .models import Category, DailySales, Template, TemplateManifest, Review, Payment, SupportInquiry
+from .serializers import CategorySerializer, TemplateSerializer, TemplateListSerializer, ReviewSerializer, PaymentSerializer, SupportInquirySerializer, TemplateManifestSerializer, latest_reviews
+from .pagination import ReviewCursorPagination, TemplateCursorPagination
+from .search import get_search_backend
+from .emails import send_support_email, send_response_email
+from .cashfree import CashfreeAPIError, CashfreeUnavailable, get_cashfree_client
+from .webhooks import WebhookRejected, dispatch, parse_webhook, record_event
+from .cache import CATEGORY_LIST, TEMPLATE_DETAIL, TEMPLATE_LIST, cache_stats, cached_response, template_detail
+from .downloads import DownloadDenied, download_response
+from .ids import new_order_id
+from .throttling import PAYMENT_THROTTLES, SUPPORT_THROTTLES
+from .payment_status import get_payment_status
+from functools import partial
 import logging
-from django.core.mail import EmailMessage
-from django.template.loader import render_to_string
+from django.db import transaction
+from django.db.models import Q, Sum
 import os 
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-# Function to send email with Google Drive link
-def send_template_email(payment):
-    try:
-        template = payment.template
-        user_email = payment.user_email
-
-        # Prepare email content using a template
-        context = {
-            'user_email': user_email,
-            'template_title': template.title,
-            'amount': payment.amount,
-            'order_id': payment.order_id,
-            'company_name': 'TemplateHub',  # Replace with your company name
-            'support_email': 'support@templatehub.com',  # Replace with your support email
-            'download_url': template.zip_file_url if template.zip_file_url else None,
-        }
-        email_subject = f'Your Template Purchase - {template.title}'
-        email_body = render_to_string('email_template.html', context)
-
-        # Create email message
-        email = EmailMessage(
-            subject=email_subject,
-            body=email_body,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to=[user_email],
-        )
-        email.content_subtype = 'html'
 
-        # Send the email
-        email.send()
-        logger.info(f"Email sent to {user_email} with download link for template {template.title}")
+def order_payload(order_id, template, user_email, user_phone):
+    """The Cashfree create-order body; shared by the sync and async payment views."""
+    frontend_url = os.getenv('FRONTEND_URL', 'http://localhost:5173')
+    webhook_url = os.getenv('WEBHOOK_URL', 'https://template-backend-4i5o.onrender.com/api/webhook/')
+    # Ensure webhook_url starts with https://
+    if not webhook_url.startswith('https://'):
+        webhook_url = f"https://{webhook_url.lstrip('/')}"
+    return {
+        "order_id": order_id,
+        "order_amount": float(template.price),
+        "order_currency": "INR",
+        "customer_details": {
+            "customer_id": f"cust_{user_email.split('@')[0]}",
+            "customer_email": user_email,
+            "customer_phone": user_phone or "9999999999",
+        },
+        "order_meta": {
+            "return_url": f"{frontend_url}/payment-status?order_id={order_id}",
+            "notify_url": webhook_url,
+        }
+    }
 
-    except Exception as e:
-        logger.error(f"Failed to send email to {user_email}: {str(e)}")
 
 class TemplateViewSet(viewsets.ModelViewSet):
     queryset = Template.objects.all()
     serializer_class = TemplateSerializer
+    pagination_class = TemplateCursorPagination
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return TemplateListSerializer
+        return TemplateSerializer
+
+    def list(self, request, *args, **kwargs):
+        render = partial(super().list, request, *args, **kwargs)
+        return cached_response(request, TEMPLATE_LIST, [TEMPLATE_LIST], render)
+
+    def retrieve(self, request, *args, **kwargs):
+        render = partial(super().retrieve, request, *args, **kwargs)
+        if not str(kwargs['pk']).isdigit():
+            return render()
+        return cached_response(request, TEMPLATE_DETAIL, [TEMPLATE_DETAIL, template_detail(kwargs['pk'])], render)
 
     def get_queryset(self):
-        queryset = super().get_queryset().select_related('category').prefetch_related('reviews')
+        queryset = super().get_queryset().select_related('category')
+        if self.action != 'list':
+            queryset = queryset.prefetch_related(latest_reviews())
         category_id = self.request.query_params.get('category')
         search_query = self.request.query_params.get('search')
         if category_id:
             queryset = queryset.filter(category_id=category_id)
         if search_query:
-            queryset = queryset.filter(
-                Q(title__icontains=search_query) | Q(description__icontains=search_query)
-            )
+            queryset = get_search_backend().search(queryset, search_query)
         return queryset
 
-    @action(detail=True, methods=['post'], url_path='initiate-payment')
+    @action(detail=True, methods=['get'], url_path='reviews')
+    def reviews(self, request, pk=None):
+        if not Template.objects.filter(pk=pk).exists():
+            return Response({'error': 'Template not found'}, status=status.HTTP_404_NOT_FOUND)
+        paginator = ReviewCursorPagination()
+        page = paginator.paginate_queryset(Review.objects.filter(template_id=pk), request, view=self)
+        return paginator.get_paginated_response(ReviewSerializer(page, many=True).data)
+
+    @action(detail=True, methods=['get'], url_path='manifest')
+    def manifest(self, request, pk=None):
+        manifest = TemplateManifest.objects.filter(template_id=pk).first()
+        if manifest is None:
+            return Response({'error': 'No manifest for this template'}, status=status.HTTP_404_NOT_FOUND)
+        # The archive hash identifies the contents exactly
+        etag = f'"{manifest.archive_hash}"'
+        if request.headers.get('If-None-Match') == etag:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        return Response(TemplateManifestSerializer(manifest).data, headers={'ETag': etag})
+
+    @action(detail=True, methods=['post'], url_path='initiate-payment', throttle_classes=PAYMENT_THROTTLES)
     def initiate_payment(self, request, pk=None):
-        logger.info(f"Starting initiate_payment for pk={pk}")
+        logger.info("Starting initiate_payment for pk=%s", pk)
         try:
             template = self.get_object()
             user_email = request.data.get('email')
             user_phone = request.data.get('phone', '')
 
-            logger.info(f"Template: {template.id}, Email: {user_email}, Phone: {user_phone}")
+            logger.info("Template: %s, Email: %s, Phone: %s", template.id, user_email, user_phone)
 
             if not user_email or '@' not in user_email:
-                logger.warning(f"Invalid email provided: {user_email}")
+                logger.warning("Invalid email provided: %s", user_email)
                 return Response({'error': 'A valid email is required.'}, status=status.HTTP_400_BAD_REQUEST)
 
             # Validate template price
             if not template.price or template.price <= 0:
-                logger.error(f"Invalid template price for template_id={pk}: {template.price}")
+                logger.error("Invalid template price for template_id=%s: %s", pk, template.price)
                 return Response({'error': 'Template price is invalid.'}, status=status.HTTP_400_BAD_REQUEST)
 
             # Create payment record
-            order_id = f"order_{template.id}_{int(timezone.now().timestamp())}"
+            order_id = new_order_id()
             payment = Payment.objects.create(
                 template=template,
                 order_id=order_id,
@@ -103,7 +135,7 @@ class TemplateViewSet(viewsets.ModelViewSet):
                 amount=template.price,
                 status='PENDING'
             )
-            logger.info(f"Payment created: payment_id={payment.id}, order_id={order_id}, amount={template.price}")
+            logger.info("Payment created: payment_id=%s, order_id=%s, amount=%s", payment.id, order_id, template.price)
 
             # Validate Cashfree credentials
             if not settings.CASHFREE_APP_ID or not settings.CASHFREE_SECRET_KEY:
@@ -111,82 +143,58 @@ class TemplateViewSet(viewsets.ModelViewSet):
                 return Response({'error': 'Payment gateway misconfigured.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
             # Prepare Cashfree order payload
-            frontend_url = os.getenv('FRONTEND_URL', 'http://localhost:5173')
-            webhook_url = os.getenv('WEBHOOK_URL', 'https://template-backend-4i5o.onrender.com/api/webhook/')
-            # Ensure webhook_url starts with https://
-            if not webhook_url.startswith('https://'):
-                webhook_url = f"https://{webhook_url.lstrip('/')}"
-            payload = {
-                "order_id": order_id,
-                "order_amount": float(template.price),
-                "order_currency": "INR",
-                "customer_details": {
-                    "customer_id": f"cust_{user_email.split('@')[0]}",
-                    "customer_email": user_email,
-                    "customer_phone": user_phone or "9999999999",
-                },
-                "order_meta": {
-                    "return_url": f"{frontend_url}/payment-status?order_id={order_id}",
-                    "notify_url": webhook_url,
-                }
-            }
-            logger.info(f"Cashfree payload: {payload}")
-            logger.debug(f"Using FRONTEND_URL: {frontend_url}")  # Added for debugging
-
-            # Make API call to Cashfree
-            headers = {
-                "x-api-version": "2023-08-01",
-                "x-client-id": settings.CASHFREE_APP_ID,
-                "x-client-secret": settings.CASHFREE_SECRET_KEY,
-                "Content-Type": "application/json",
-            }
+            payload = order_payload(order_id, template, user_email, user_phone)
+            logger.debug("Cashfree payload: %s", payload)
 
-            response = requests.post(
-                f"{settings.CASHFREE_BASE_URL}/pg/orders",
-                json=payload,
-                headers=headers
-            )
-            logger.info(f"Cashfree response status: {response.status_code}")
-            logger.debug(f"Cashfree response body: {response.json()}")
-
-            if response.status_code == 200:
-                payment_data = response.json()
-                payment_session_id = payment_data.get("payment_session_id")
-                if not payment_session_id:
-                    logger.error(f"No payment_session_id in Cashfree response: {payment_data}")
-                    payment.status = 'FAILED'
-                    payment.save()
-                    return Response(
-                        {'error': 'Failed to generate payment session'},
-                        status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                    )
-                payment.order_id = order_id
-                payment.save()
-                logger.info(f"Payment session created: session_id={payment_session_id}")
-                return Response({
-                    'payment_session_id': payment_session_id,
-                    'order_id': order_id
-                }, status=status.HTTP_200_OK)
-            else:
+            # Make API call to Cashfree over the pooled, timeout-bounded client
+            try:
+                payment_data = get_cashfree_client().create_order(payload)
+            except CashfreeAPIError as e:
                 payment.status = 'FAILED'
                 payment.save()
-                logger.error(f"Cashfree API error: {response.json()}")
+                logger.error("Cashfree API error: %s", e.data)
                 return Response({
                     'error': 'Failed to initiate payment.',
-                    'cashfree_error': response.json().get('message', 'Unknown error')
-                }, status=response.status_code)
+                    'cashfree_error': e.data.get('message', 'Unknown error')
+                }, status=e.status_code)
+            except CashfreeUnavailable as e:
+                # The order may or may not exist at Cashfree; leave it PENDING
+                logger.error("Cashfree unavailable for order %s: %s", order_id, e)
+                return Response(
+                    {'error': 'Payment gateway is temporarily unavailable. Please try again.'},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE
+                )
+
+            payment_session_id = payment_data.get("payment_session_id")
+            if not payment_session_id:
+                logger.error("No payment_session_id in Cashfree response: %s", payment_data)
+                payment.status = 'FAILED'
+                payment.save()
+                return Response(
+                    {'error': 'Failed to generate payment session'},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                )
+            logger.info("Payment session created: session_id=%s", payment_session_id)
+            return Response({
+                'payment_session_id': payment_session_id,
+                'order_id': order_id
+            }, status=status.HTTP_200_OK)
 
         except Template.DoesNotExist:
-            logger.error(f"Template with id={pk} not found")
+            logger.error("Template with id=%s not found", pk)
             return Response({'error': 'Template not found.'}, status=status.HTTP_404_NOT_FOUND)
         except Exception as e:
-            logger.error(f"Unexpected error in initiate_payment: {str(e)}", exc_info=True)
+            logger.error("Unexpected error in initiate_payment: %s", e, exc_info=True)
             return Response({'error': f'Server error: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 class CategoryViewSet(viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
 
+    def list(self, request, *args, **kwargs):
+        render = partial(super().list, request, *args, **kwargs)
+        return cached_response(request, CATEGORY_LIST, [CATEGORY_LIST], render)
+
 class ReviewViewSet(viewsets.ModelViewSet):
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
@@ -216,6 +224,59 @@ class PaymentViewSet(viewsets.ModelViewSet):
         except Payment.DoesNotExist:
             return Response({'error': 'Payment not found'}, status=status.HTTP_404_NOT_FOUND)
 
+    @action(detail=True, methods=['get'], url_path='status')
+    def payment_status(self, request, pk=None):
+        # Checkout polls this. It always answers at once (any ?wait= is ignored): a
+        # long-poll would hold a sync worker, so waiting lives on /api/async/payments/
+        data = get_payment_status(pk)
+        if data is None:
+            return Response({'error': 'Payment not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(data, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def catalog_cache_stats(request):
+    return Response(cache_stats(), status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def sales_analytics(request):
+    """Revenue, paid orders and attempts per template per day, read from the DailySales rollups."""
+    try:
+        days = int(request.query_params.get('days', 90))
+    except ValueError:
+        return Response({'error': 'days must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    days = max(1, min(days, settings.SALES_ANALYTICS_MAX_DAYS))
+    since = timezone.localdate() - timedelta(days=days - 1)
+
+    rollups = DailySales.objects.filter(date__gte=since)
+    if request.query_params.get('template'):
+        rollups = rollups.filter(template_id=request.query_params['template'])
+    paid = Q(status='SUCCESS')
+    rows = (
+        rollups.values('date', 'template_id', 'template__title')
+        .annotate(revenue=Sum('amount', filter=paid, default=0), orders=Sum('count', filter=paid, default=0),
+                  attempts=Sum('count'))
+        .order_by('date', 'template_id')
+    )
+    return Response({
+        'since': since,
+        'days': days,
+        'results': [
+            {
+                'date': row['date'],
+                'template': row['template_id'],
+                'title': row['template__title'],
+                'revenue': row['revenue'],
+                'orders': row['orders'],
+                'attempts': row['attempts'],
+            }
+            for row in rows
+        ],
+    }, status=status.HTTP_200_OK)
+
 
 logger = logging.getLogger(__name__)
 
@@ -223,125 +284,37 @@ logger = logging.getLogger(__name__)
 @require_POST
 @api_view(['POST'])
 def payment_webhook(request):
-    logger.info("Webhook endpoint reached")
-    logger.info(f"Request method: {request.method}")
-    logger.info(f"Request headers: {dict(request.headers)}")
-    logger.info(f"Request body: {request.body}")
-
-    # Handle both 'event' and 'type' fields for compatibility
-    event = request.data.get('type') or request.data.get('event')
-    if not event:
-        logger.error("No event or type specified in webhook payload")
-        return Response({'error': 'No event or type specified'}, status=status.HTTP_400_BAD_REQUEST)
-
-    order_id = request.data.get('data', {}).get('order', {}).get('order_id')
-    if not order_id:
-        logger.error("No order_id found in webhook payload")
-        return Response({'error': 'No order_id found'}, status=status.HTTP_400_BAD_REQUEST)
-
+    # Verify, record, acknowledge; the status change and email happen off the request path
     try:
-        payment = Payment.objects.get(order_id=order_id)
-    except Payment.DoesNotExist:
-        logger.error(f"Payment with order_id {order_id} not found")
-        return Response({'error': 'Payment not found'}, status=status.HTTP_404_NOT_FOUND)
-
-    # Map Cashfree's webhook type to internal status
-    if event == 'PAYMENT_SUCCESS_WEBHOOK':
-        payment.status = 'SUCCESS'
-        payment.save()
-        logger.info(f"Updated payment status for order {order_id} to SUCCESS")
-        send_template_email(payment)
-    elif event in ['PAYMENT_FAILED_WEBHOOK', 'PAYMENT_CANCELLED_WEBHOOK']:
-        payment.status = 'FAILED'
-        payment.save()
-        logger.info(f"Updated payment status for order {order_id} to FAILED")
-    else:
-        logger.warning(f"Unknown event type: {event}")
-        return Response({'status': 'ignored'}, status=status.HTTP_200_OK)
+        event_id, event, order_id, payload = parse_webhook(request.body, request.headers)
+    except WebhookRejected as e:
+        return Response({'error': e.message}, status=e.status_code)
 
-    return Response({'status': 'success'}, status=status.HTTP_200_OK)
+    webhook_event, created = record_event(event_id, event, order_id, payload)
+    if not created:
+        logger.info("Duplicate webhook %s for order %s", event, order_id)
+        return Response({'status': 'duplicate'}, status=status.HTTP_200_OK)
 
+    dispatch(webhook_event.pk)
+    logger.info("Accepted webhook %s for order %s", event, order_id)
+    return Response({'status': 'received'}, status=status.HTTP_200_OK)
 
 
-
-def send_support_email(inquiry):
-    try:
-        # User confirmation email
-        user_context = {
-            'inquiry_id': inquiry.inquiry_id,
-            'email': inquiry.email,
-            'inquiry_type': inquiry.get_inquiry_type_display(),
-            'description': inquiry.description,
-            'order_id': inquiry.order_id or 'N/A',
-            'company_name': 'TemplateHub',
-            'support_email': 'support@templatehub.com',
-        }
-        user_email_body = render_to_string('support_confirmation.html', user_context)
-        user_email = EmailMessage(
-            subject=f'Your Support Inquiry - {inquiry.inquiry_id}',
-            body=user_email_body,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to=[inquiry.email],
-        )
-        user_email.content_subtype = 'html'
-        user_email.send()
-        logger.info(f"Confirmation email sent to {inquiry.email} for inquiry {inquiry.inquiry_id}")
-
-        # Support team alert
-        support_context = {
-            'inquiry_id': inquiry.inquiry_id,
-            'email': inquiry.email,
-            'inquiry_type': inquiry.get_inquiry_type_display(),
-            'description': inquiry.description,
-            'order_id': inquiry.order_id or 'N/A',
-            'company_name': 'TemplateHub',
-        }
-        support_email_body = render_to_string('support_alert.html', support_context)
-        support_email = EmailMessage(
-            subject=f'New Support Inquiry - {inquiry.inquiry_id}',
-            body=support_email_body,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to=['support@templatehub.com'],  # Configure in settings.py
-        )
-        support_email.content_subtype = 'html'
-        support_email.send()
-        logger.info(f"Support alert sent for inquiry {inquiry.inquiry_id}")
-
-    except Exception as e:
-        logger.error(f"Failed to send support emails for inquiry {inquiry.inquiry_id}: {str(e)}", exc_info=True)
-
-def send_response_email(inquiry):
-    try:
-        context = {
-            'inquiry_id': inquiry.inquiry_id,
-            'email': inquiry.email,
-            'inquiry_type': inquiry.get_inquiry_type_display(),
-            'response': inquiry.response,
-            'company_name': 'TemplateHub',
-            'support_email': 'support@templatehub.com',
-        }
-        email_body = render_to_string('support_response.html', context)
-        email = EmailMessage(
-            subject=f'Update on Your Support Inquiry - {inquiry.inquiry_id}',
-            body=email_body,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to=[inquiry.email],
-        )
-        email.content_subtype = 'html'
-        email.send()
-        logger.info(f"Response email sent to {inquiry.email} for inquiry {inquiry.inquiry_id}")
-    except Exception as e:
-        logger.error(f"Failed to send response email for inquiry {inquiry.inquiry_id}: {str(e)}", exc_info=True)
-
 class SupportInquiryViewSet(viewsets.ModelViewSet):
     queryset = SupportInquiry.objects.all()
     serializer_class = SupportInquirySerializer
 
+    def get_throttles(self):
+        if self.action == 'create':
+            return [throttle() for throttle in SUPPORT_THROTTLES]
+        return super().get_throttles()
+
     def create(self, request):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
-            inquiry = serializer.save()
-            send_support_email(inquiry)
+            with transaction.atomic():
+                inquiry = serializer.save()
+                send_support_email(inquiry)
             return Response({
                 'inquiry_id': inquiry.inquiry_id,
                 'message': 'Inquiry submitted successfully. You will receive a confirmation email.'
@@ -372,6 +345,15 @@ class SupportInquiryViewSet(viewsets.ModelViewSet):
             return Response({'error': 'Invalid status.'}, status=status.HTTP_400_BAD_REQUEST)
         inquiry.response = response_text
         inquiry.status = status_update
-        inquiry.save()
-        send_response_email(inquiry)
-        return Response({'message': 'Response saved and emailed to user.'}, status=status.HTTP_200_OK)
\ No newline at end of file
+        with transaction.atomic():
+            inquiry.save()
+            send_response_email(inquiry)
+        return Response({'message': 'Response saved and emailed to user.'}, status=status.HTTP_200_OK)
+
+@require_http_methods(['GET', 'HEAD'])
+def template_download(request, token):
+    # Plain Django view: the body is a file stream, not something DRF should render
+    try:
+        return download_response(request, token)
+    except DownloadDenied as e:
+        return JsonResponse({'error': e.message}, status=e.status_code)
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.utils import timezone
+
+from backend.routers import unpinned
+
+from .cashfree import verify_webhook_signature
+from .emails import send_template_email
+from .models import Payment, WebhookEvent
+from .outbox import retry_delay
+
+logger = logging.getLogger(__name__)
+
+# Cashfree webhook type -> internal Payment.status
+EVENT_STATUSES = {
+    'PAYMENT_SUCCESS_WEBHOOK': 'SUCCESS',
+    'PAYMENT_FAILED_WEBHOOK': 'FAILED',
+    'PAYMENT_CANCELLED_WEBHOOK': 'FAILED',
+}
+
+
+class WebhookRejected(Exception):
+    def __init__(self, message, status_code):
+        self.message = message
+        self.status_code = status_code
+        super().__init__(message)
+
+
+def parse_webhook(raw_body, headers):
+    """
+    Verifies the signature and extracts ``(event_id, event_type, order_id,
+    payload)`` from a delivery; raises WebhookRejected (401/400) otherwise.
+    """
+    if not verify_webhook_signature(
+        raw_body,
+        headers.get('x-webhook-timestamp'),
+        headers.get('x-webhook-signature'),
+        settings.CASHFREE_SECRET_KEY,
+        tolerance=settings.CASHFREE_WEBHOOK_TOLERANCE,
+    ):
+        logger.warning("Rejected webhook with missing or invalid signature")
+        raise WebhookRejected('Invalid signature', 401)
+
+    try:
+        payload = json.loads(raw_body)
+    except ValueError:
+        logger.error("Webhook body is not valid JSON")
+        raise WebhookRejected('Invalid JSON', 400)
+
+    # Handle both 'event' and 'type' fields for compatibility
+    event = payload.get('type') or payload.get('event')
+    if not event:
+        logger.error("No event or type specified in webhook payload")
+        raise WebhookRejected('No event or type specified', 400)
+
+    order_id = ((payload.get('data') or {}).get('order') or {}).get('order_id')
+    if not order_id:
+        logger.error("No order_id found in webhook payload")
+        raise WebhookRejected('No order_id found', 400)
+    return event_id_for(headers, payload, raw_body), event, order_id, payload
+
+
+def event_id_for(headers, payload, raw_body):
+    """
+    Cashfree's idempotency key when sent, else event type + cf_payment_id,
+    else a hash of the body (identical for redeliveries of one event).
+    """
+    key = headers.get('x-idempotency-key')
+    if key:
+        return key[:128]
+    event_type = payload.get('type') or payload.get('event')
+    cf_payment_id = ((payload.get('data') or {}).get('payment') or {}).get('cf_payment_id')
+    if cf_payment_id:
+        return f'{event_type}:{cf_payment_id}'
+    return hashlib.sha256(raw_body).hexdigest()
+
+
+def record_event(event_id, event_type, order_id, payload):
+    """Inserts the delivery; returns ``(event, created)``. Redeliveries cost one failed insert."""
+    try:
+        with transaction.atomic():
+            return WebhookEvent.objects.create(
+                event_id=event_id, event_type=event_type, order_id=order_id or '', payload=payload
+            ), True
+    except IntegrityError:
+        return None, False
+
+
+def apply_payment_status(payment, new_status):
+    """
+    Moves ``payment`` to ``new_status`` and queues the purchase email on
+    success. A SUCCESS payment is never downgraded. Call inside a transaction.
+    """
+    if payment.status == new_status or payment.status == 'SUCCESS':
+        return False
+    payment.status = new_status
+    payment.save(update_fields=['status', 'updated_at'])
+    if new_status == 'SUCCESS':
+        send_template_email(payment)
+    logger.info("Updated payment status for order %s to %s", payment.order_id, new_status)
+    return True
+
+
+def process_event(event_pk):
+    try:
+        with transaction.atomic():
+            event = WebhookEvent.objects.select_for_update().filter(pk=event_pk, status='RECEIVED').first()
+            if event is None:
+                return
+            new_status = EVENT_STATUSES.get(event.event_type)
+            payment = None
+            if new_status:
+                payment = (Payment.objects.select_for_update().select_related('template')
+                           .filter(order_id=event.order_id).first())
+            if new_status is None:
+                logger.warning("Ignoring webhook event type %s", event.event_type)
+                event.status = 'IGNORED'
+            elif payment is None:
+                logger.error("Payment with order_id %s not found for webhook %s", event.order_id, event.event_id)
+                event.status = 'FAILED'
+                event.last_error = 'Payment not found'
+            else:
+                apply_payment_status(payment, new_status)
+                event.status = 'PROCESSED'
+            event.attempts += 1
+            event.processed_at = timezone.now()
+            event.save(update_fields=['status', 'attempts', 'last_error', 'processed_at'])
+    except Exception as e:
+        record_failure(event_pk, e)
+
+
+def record_failure(event_pk, error):
+    """Schedules a retry with exponential backoff, or gives up after WEBHOOK_MAX_ATTEMPTS."""
+    attempts = WebhookEvent.objects.filter(pk=event_pk).values_list('attempts', flat=True).first()
+    if attempts is None:
+        return
+    attempts += 1
+    now = timezone.now()
+    fields = {'attempts': attempts, 'last_error': str(error)}
+    if attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+        logger.error("Giving up on webhook event %s after %d attempts: %s", event_pk, attempts, error, exc_info=error)
+        fields.update(status='FAILED', processed_at=now)
+    else:
+        # Left RECEIVED so the process_webhook_events sweep retries it once due
+        logger.error("Failed to process webhook event %s (attempt %d): %s", event_pk, attempts, error, exc_info=error)
+        fields['next_attempt_at'] = now + retry_delay(
+            attempts, settings.WEBHOOK_RETRY_BASE_DELAY, settings.WEBHOOK_RETRY_MAX_DELAY,
+        )
+    WebhookEvent.objects.filter(pk=event_pk, status='RECEIVED').update(**fields)
+
+
+def process_pending_events(older_than, limit=100):
+    now = timezone.now()
+    pending = list(
+        WebhookEvent.objects.filter(status='RECEIVED', received_at__lte=now - older_than, next_attempt_at__lte=now)
+        .order_by('next_attempt_at').values_list('pk', flat=True)[:limit]
+    )
+    for event_pk in pending:
+        process_event(event_pk)
+    return len(pending)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _process_in_thread(event_pk):
+    try:
+        # Pool threads are reused; don't let one event's writes pin the next one's reads
+        with unpinned():
+            process_event(event_pk)
+    finally:
+        connections.close_all()
+
+
+def dispatch(event_pk):
+    """Processes the event off the request path once the insert has committed."""
+    global _executor
+    if not settings.WEBHOOK_PROCESS_IN_BACKGROUND:
+        return
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='webhook')
+    transaction.on_commit(lambda: _executor.submit(_process_in_thread, event_pk))